@@ -0,0 +1,101 @@
+"""
+Benchmark de backends de extracción sobre un corpus de páginas guardadas.
+
+Uso:
+    python benchmarks/bench_extract.py carpeta_con_html/ [--repeat 5]
+
+Compara el tiempo de cada backend y verifica que ambos produzcan
+exactamente el mismo dict que el backend de referencia (bs4), sobre el
+corpus y sobre los casos borde de PARITY_SAMPLES.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.extractors import EXTRACTORS, get_extractor
+
+# Casos borde donde los parsers difieren (libxml2 vs html.parser): siempre se verifican
+PARITY_SAMPLES = {
+    "title_con_etiqueta": "<html><head><title>a<b>c</b></title></head><body><p>texto</p></body></html>",
+    "title_solo_etiqueta": "<html><head><title><b>c</b></title></head><body><p>texto</p></body></html>",
+    "title_con_comentario": "<html><head><title>a<!-- x -->c</title></head><body><p>texto</p></body></html>",
+    "title_escapado": "<html><head><title>a &lt;b&gt; c</title></head><body><p>texto</p></body></html>",
+    "title_vacio": "<html><head><title></title></head><body><p>texto</p></body></html>",
+    "sin_title": "<html><head></head><body><h1>Uno</h1><h2>Dos</h2><p>texto</p></body></html>",
+    "textarea_con_etiqueta": "<html><body><p>a</p><textarea><b>x</b> y</textarea> z</body></html>",
+    "textarea_con_h1": "<html><body><textarea><h1>x</h1></textarea><p>z</p></body></html>",
+    "xmp_con_etiqueta": "<html><body><xmp><b>x</b></xmp><p>z</p></body></html>",
+    "body_en_script": ('<html><head><title>t</title><script>var s="<body>";</script></head>'
+                       '<div>hola mundo texto</div> fuera</html>'),
+    "body_en_comentario": "<html><head><title>t</title><!-- <body> --></head><div>hola</div></html>",
+    "body_en_style": "<html><head><title>t</title><style>/* <body> */</style></head><div>hola</div></html>",
+    "body_tras_script": "<html><head><script>var s='x';</script></head><body><div>hola</div></body></html>",
+}
+
+
+def load_corpus(folder):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(folder, "**", "*.htm*"), recursive=True)):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages[path] = f.read()
+    return pages
+
+
+def bench(extractor, pages, repeat):
+    best = float('inf')
+    results = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path, html in pages.items():
+            results[path] = extractor.extract(html)
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de extracción HTML")
+    parser.add_argument("corpus", help="Carpeta con páginas .html guardadas")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por backend (se reporta la mejor)")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"[Error] No se encontraron archivos .html en {args.corpus}")
+        return 1
+    pages.update({f"<{name}>": html for name, html in PARITY_SAMPLES.items()})
+    total_mb = sum(len(h) for h in pages.values()) / 1e6
+    print(f"Corpus: {len(pages)} páginas ({total_mb:.1f} MB)\n")
+
+    timings = {}
+    outputs = {}
+    for name in EXTRACTORS:
+        extractor = get_extractor(name)
+        if extractor.name != name:
+            continue  # Backend no disponible en este entorno
+        timings[name], outputs[name] = bench(extractor, pages, args.repeat)
+
+    reference = timings['bs4']
+    print(f"{'BACKEND':<8} {'TOTAL (s)':>10} {'ms/página':>10} {'SPEEDUP':>8}")
+    for name, elapsed in timings.items():
+        print(f"{name:<8} {elapsed:>10.3f} {1000 * elapsed / len(pages):>10.2f} {reference / elapsed:>7.1f}x")
+
+    mismatches = 0
+    for name, results in outputs.items():
+        if name == 'bs4':
+            continue
+        for path, data in results.items():
+            expected = outputs['bs4'][path]
+            diff = [k for k in expected if expected[k] != data.get(k)]
+            if diff:
+                mismatches += 1
+                print(f"   [!] {name} difiere en {os.path.basename(path)}: {', '.join(diff)}")
+    print(f"\nEquivalencia: {'OK' if not mismatches else f'{mismatches} páginas con diferencias'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Benchmark de punta a punta del pipeline sobre un corpus sintético servido
+por un servidor HTTP local (sin red externa).
+
+Uso:
+    python benchmarks/bench_pipeline.py --pages 1000 --keywords 2000 --out baseline.json
+    python benchmarks/bench_pipeline.py --pages 1000 --keywords 2000 --compare baseline.json
+
+Etapas: fetch, extract, suggest, vectorize, similarity, classify, heatmap y
+pdf. Por etapa se mide el tiempo de pared y el pico de memoria residente
+(RSS): en Linux el pico se reinicia antes de cada etapa vía
+/proc/self/clear_refs; en otros sistemas se usa ru_maxrss, que sólo crece.
+Con --memory tracemalloc se mide en cambio el pico de memoria asignada por Python y
+NumPy, a costa de inflar los tiempos de las etapas con muchas asignaciones.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.metrics import current_rss_bytes, peak_rss_bytes, reset_peak_rss
+from stand_in import LocalSite
+from synthetic import SyntheticCorpus
+
+STAGES = ["fetch", "extract", "suggest", "vectorize", "similarity", "classify", "heatmap", "pdf"]
+
+
+class StageTimer:
+    """
+    Mide tiempo y pico de memoria de un bloque; el resultado queda en
+    results[name]. memory: 'rss', 'tracemalloc' o None.
+    """
+    def __init__(self, results, name, memory):
+        self.results = results
+        self.name = name
+        self.memory = memory
+        self.info = {}
+
+    def __enter__(self):
+        if self.memory == "tracemalloc":
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        elif self.memory == "rss":
+            reset_peak_rss()
+            self._base = current_rss_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        entry = {'seconds': round(elapsed, 4), **self.info}
+        if self.memory == "tracemalloc":
+            entry['peak_mb'] = round((tracemalloc.get_traced_memory()[1] - self._base) / 1e6, 2)
+        elif self.memory == "rss" and self._base is not None:
+            entry['peak_mb'] = round(max(0, peak_rss_bytes() - self._base) / 1e6, 2)
+        self.results[self.name] = entry
+        print(f"   [Bench] {self.name:<10} {elapsed:>9.3f} s" + (f" | pico {entry['peak_mb']:.1f} MB" if 'peak_mb' in entry else ""))
+
+
+def run_pipeline(corpus, site, args, workdir):
+    # Importaciones fuera de las etapas: no medimos el costo de cargar sklearn/matplotlib/fpdf
+    from modules.analyzer import SEOAnalyzer
+    from modules.exporters import page_columns
+    from modules.market_data import MarketData
+    from modules.rendering import render_heatmap
+    from modules.reporter import StrategicReport
+    from modules.scraper import SiteScraper
+
+    wanted = set(args.stages)
+    results = {}
+    stage = lambda name: StageTimer(results, name, args.memory)
+
+    scraper = SiteScraper("", max_concurrency=args.concurrency, per_host=args.concurrency, extractor=args.extractor)
+    site_paths = corpus.page_paths()
+    comp_paths = corpus.competitor_paths()
+    try:
+        if "fetch" in wanted:
+            with stage("fetch") as s:
+                ok = errors = size = 0
+                for _, status, html, error, _ in scraper.engine.iter_fetch(site.base_url + p for p in site_paths + comp_paths):
+                    if error is None and status == 200:
+                        ok += 1
+                        size += len(html)
+                    else:
+                        errors += 1
+                s.info.update(ok=ok, errors=errors, mb=round(size / 1e6, 2))
+
+        # El HTML se regenera desde la semilla: extract no depende de haber retenido las descargas
+        with stage("extract") as s:
+            site_corpus = {}
+            for p in site_paths:
+                site_corpus[p] = scraper.extractor.extract(corpus.html(p))['content_sample']
+            competitor_corpus = {site.base_url + p: scraper.extractor.extract(corpus.html(p))['content_sample'] for p in comp_paths}
+            s.info.update(pages=len(site_corpus) + len(competitor_corpus), backend=scraper.extractor.name)
+    finally:
+        scraper.close()
+
+    keywords = corpus.keywords()
+    if "suggest" in wanted:
+        market = MarketData(suggest_url=site.base_url + "/suggest", rate=10000.0)
+        with stage("suggest") as s:
+            expanded = market.get_suggestions(corpus.seeds(args.seeds), depth=2)
+            s.info.update(keywords=len(expanded))
+
+    analyzer = SEOAnalyzer(site_corpus, keywords)
+    with stage("vectorize") as s:
+        if not analyzer.vectorize():
+            print("   [Bench] El vectorizador no encontró vocabulario: se omiten las etapas siguientes.")
+            return results
+        s.info.update(pages=analyzer.page_vectors.shape[0], keywords=analyzer.keyword_vectors.shape[0],
+                      features=analyzer.page_vectors.shape[1],
+                      nnz=int(analyzer.page_vectors.nnz + analyzer.keyword_vectors.nnz))
+
+    with stage("similarity"):
+        analyzer.compute_similarity()
+
+    if "classify" in wanted:
+        with stage("classify") as s:
+            intents = analyzer.intents.classify_many(keywords)
+            s.info.update(keywords=len(intents))
+
+    df_top = analyzer.top_results()
+    chart = os.path.join(workdir, "heatmap.png")
+    if "heatmap" in wanted or "pdf" in wanted:
+        with stage("heatmap"):
+            render_heatmap(df_top[page_columns(df_top)], chart)
+
+    if "pdf" in wanted:
+        comp_keywords = analyzer.analyze_competitors(competitor_corpus)
+        with stage("pdf"):
+            StrategicReport().generate(df_top, chart, comp_keywords, os.path.join(workdir, "reporte.pdf"))
+    return results
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current, baseline, tolerance, min_seconds=0.05):
+    """Imprime la comparación por etapa; retorna el número de regresiones de tiempo."""
+    if current['settings'] != baseline['settings']:
+        print("   [!] La línea base se tomó con otros parámetros: la comparación es orientativa.")
+        for key in sorted(set(current['settings']) | set(baseline['settings'])):
+            old, new = baseline['settings'].get(key), current['settings'].get(key)
+            if old != new:
+                print(f"       {key}: {old} -> {new}")
+
+    print(f"\n{'ETAPA':<11} {'BASE (s)':>9} {'ACTUAL (s)':>10} {'RATIO':>7} {'Δ MEM (MB)':>11}")
+    regressions = 0
+    for name in STAGES:
+        old, new = baseline['stages'].get(name), current['stages'].get(name)
+        if not old or not new:
+            continue
+        ratio = new['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        mem = ""
+        if 'peak_mb' in old and 'peak_mb' in new:
+            mem = f"{new['peak_mb'] - old['peak_mb']:+.1f}"
+        flag = ""
+        if max(old['seconds'], new['seconds']) < min_seconds:
+            pass  # Etapas de milisegundos: el ruido supera a la tolerancia
+        elif ratio > 1 + tolerance:
+            flag = "  REGRESIÓN"
+            regressions += 1
+        elif ratio < 1 - tolerance:
+            flag = "  MEJORA"
+        print(f"{name:<11} {old['seconds']:>9.3f} {new['seconds']:>10.3f} {ratio:>6.2f}x {mem:>11}{flag}")
+    print(f"\nBase: {baseline['meta'].get('commit')} | Actual: {current['meta'].get('commit')} | tolerancia ±{tolerance:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline con corpus sintético y servidor local")
+    parser.add_argument("--pages", type=int, default=200, help="Páginas del sitio (10 a 100k)")
+    parser.add_argument("--keywords", type=int, default=1000, help="Keywords objetivo")
+    parser.add_argument("--competitors", type=int, default=10, help="Páginas de competencia")
+    parser.add_argument("--seeds", type=int, default=10, help="Semillas consultadas en el stub de Suggest")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latencia media del servidor local")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Fracción de páginas que responden 503")
+    parser.add_argument("--concurrency", type=int, default=20, help="Descargas simultáneas")
+    parser.add_argument("--extractor", default="auto", help="Backend de extracción (auto, lxml, bs4)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="Etapas a medir (extract, vectorize y similarity siempre corren: alimentan a las demás)")
+    parser.add_argument("--memory", choices=["rss", "tracemalloc", "none"], default="rss",
+                        help="Cómo medir el pico de memoria por etapa (tracemalloc infla los tiempos)")
+    parser.add_argument("--out", metavar="JSON", help="Guardar los resultados como línea base")
+    parser.add_argument("--compare", metavar="JSON", help="Comparar contra una línea base guardada")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Variación relativa tolerada antes de marcar regresión")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Etapas más rápidas que esto no se marcan como regresión")
+    args = parser.parse_args()
+    if args.memory == "none":
+        args.memory = None
+
+    corpus = SyntheticCorpus(args.pages, args.keywords, args.competitors, seed=args.seed)
+    settings = {
+        'pages': args.pages, 'keywords': args.keywords, 'competitors': args.competitors, 'seeds': args.seeds,
+        'seed': args.seed, 'latency_ms': args.latency_ms, 'error_rate': args.error_rate,
+        'concurrency': args.concurrency, 'extractor': args.extractor, 'memory': args.memory,
+    }
+    print(f"Corpus sintético: {args.pages} páginas | {args.keywords} keywords | {args.competitors} competidores (semilla {args.seed})\n")
+
+    if args.memory == "tracemalloc":
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as workdir, LocalSite(corpus, args.latency_ms, error_rate=args.error_rate) as site:
+        start = time.perf_counter()
+        stages = run_pipeline(corpus, site, args, workdir)
+        total = time.perf_counter() - start
+    if args.memory == "tracemalloc":
+        tracemalloc.stop()
+
+    current = {
+        'meta': {
+            'commit': git_commit(), 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(), 'total_seconds': round(total, 3),
+        },
+        'settings': settings,
+        'stages': stages,
+    }
+    print(f"\nTotal: {total:.2f} s")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        return 1 if compare(current, baseline, args.tolerance, args.min_seconds) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
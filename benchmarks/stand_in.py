@@ -0,0 +1,97 @@
+"""
+Servidor HTTP local que sirve un SyntheticCorpus con latencia y tasa de
+error configurables, más un stub del endpoint de Google Suggest.
+
+    /site/...    páginas del sitio        /comp/...    competencia
+    /suggest?q=  [q, [sugerencias]]       (mismo formato que client=firefox)
+
+Los errores (503) se asignan por ruta de forma determinista: la misma
+semilla falla siempre en las mismas URLs, así las corridas son comparables.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como un servidor real
+
+    def do_GET(self):
+        site = self.server.site
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)  # Las secciones llevan tildes: el cliente las envía codificadas
+        site.delay()
+        if path == "/suggest":
+            query = parse_qs(parts.query).get('q', [''])[0]
+            self._send(200, json.dumps([query, site.corpus.suggestions(query)]), "application/json")
+            return
+        if site.fails(path):
+            self._send(503, "Servicio no disponible", "text/plain")
+            return
+        html = site.corpus.html(path)
+        if html is None:
+            self._send(404, "No encontrado", "text/plain")
+        else:
+            self._send(200, html, "text/html; charset=utf-8")
+
+    def _send(self, status, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # El motor abre muchas conexiones a la vez
+
+
+class LocalSite:
+    """
+    Stand-in local del sitio, la competencia y Suggest.
+    latency_ms: demora media por respuesta (±jitter relativo).
+    error_rate: fracción de páginas que responden 503.
+    """
+    def __init__(self, corpus, latency_ms=0.0, jitter=0.5, error_rate=0.0, host="127.0.0.1", port=0):
+        self.corpus = corpus
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._server = _Server((host, port), _Handler)
+        self._server.site = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        if self.latency > 0:
+            time.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def fails(self, path):
+        return self.error_rate > 0 and random.Random(f"{self.corpus.seed}:error:{path}").random() < self.error_rate
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,147 @@
+"""
+Generador sintético y determinista (semilla) de páginas en español,
+keywords y sitios de competencia para los benchmarks.
+
+Cada página se genera a demanda a partir de (semilla, tipo, índice): un
+corpus de 100k páginas no necesita vivir en memoria y dos corridas con la
+misma semilla producen exactamente el mismo HTML.
+"""
+import random
+
+TOPICS = [
+    "colegio", "escuela", "bachillerato", "inicial", "primaria", "secundaria", "pensión", "matrícula",
+    "admisiones", "becas", "uniforme", "transporte", "robótica", "programación", "inglés", "bilingüe",
+    "deportes", "natación", "música", "arte", "laboratorio", "biblioteca", "psicología", "inclusión",
+    "valores", "tecnología", "ciencias", "matemáticas", "lectura", "idiomas", "francés", "campamento",
+    "excursiones", "alimentación", "horario", "vacaciones", "docentes", "tutorías", "evaluación", "proyecto",
+]
+PLACES = ["quito", "cumbayá", "tumbaco", "valle de los chillos", "norte de quito", "sur de quito", "conocoto", "pomasqui"]
+MODIFIERS = [
+    "precios", "costo", "mejores", "requisitos", "cómo elegir", "opiniones", "cerca de mí", "horarios",
+    "inscripciones", "ranking", "qué es", "guía", "comparativa", "contacto", "dirección", "2025",
+]
+FILLER = [
+    "nuestro", "estudiantes", "familias", "formación", "integral", "comunidad", "educativa", "calidad",
+    "aprendizaje", "desarrollo", "niños", "jóvenes", "programa", "académico", "excelencia", "ambiente",
+    "seguro", "acompañamiento", "personalizado", "metodología", "innovadora", "espacios", "modernos",
+    "actividades", "extracurriculares", "proceso", "año", "lectivo", "niveles", "oferta", "curricular",
+    "institución", "trayectoria", "padres", "compromiso", "futuro", "habilidades", "competencias", "siglo",
+    "mundo", "global", "pensamiento", "crítico", "creatividad", "liderazgo", "respeto", "responsabilidad",
+]
+STOP = ["de", "la", "que", "el", "en", "y", "a", "los", "del", "se", "las", "por", "un", "para", "con", "una", "su"]
+
+
+class SyntheticCorpus:
+    """
+    Corpus sintético: n_pages páginas del sitio, n_competitors páginas de
+    competencia y n_keywords keywords. Las palabras se eligen con una
+    distribución tipo Zipf para que el TF-IDF se parezca al de sitios reales.
+    """
+    def __init__(self, n_pages=100, n_keywords=500, n_competitors=10, seed=42, words_per_page=(150, 600)):
+        self.n_pages = n_pages
+        self.n_keywords = n_keywords
+        self.n_competitors = n_competitors
+        self.seed = seed
+        self.words_per_page = words_per_page
+        self.vocabulary = TOPICS + PLACES[:4] + FILLER
+        # Pesos Zipf (1/rango) sobre un orden del vocabulario fijado por la semilla
+        order = random.Random(f"{seed}:vocab").sample(self.vocabulary, len(self.vocabulary))
+        self._words = order
+        self._weights = [1.0 / (rank + 1) for rank in range(len(order))]
+
+    def _rng(self, kind, index):
+        return random.Random(f"{self.seed}:{kind}:{index}")
+
+    def _sentence(self, rng, n):
+        words = rng.choices(self._words, weights=self._weights, k=n)
+        for i in range(1, n, 3):
+            words[i] = rng.choice(STOP)
+        return " ".join(words).capitalize() + "."
+
+    def _paragraphs(self, rng):
+        remaining = rng.randint(*self.words_per_page)
+        paragraphs = []
+        while remaining > 0:
+            n = min(remaining, rng.randint(12, 40))
+            paragraphs.append(self._sentence(rng, n))
+            remaining -= n
+        return paragraphs
+
+    # --- SITIO ---
+    def page_path(self, index):
+        section = TOPICS[index % len(TOPICS)]
+        return f"/site/{section}/p{index}.html"
+
+    def page_paths(self):
+        return [self.page_path(i) for i in range(self.n_pages)]
+
+    def competitor_path(self, index):
+        return f"/comp/c{index}.html"
+
+    def competitor_paths(self):
+        return [self.competitor_path(i) for i in range(self.n_competitors)]
+
+    def html(self, path):
+        """HTML de una ruta del corpus (None si la ruta no existe)."""
+        try:
+            name = path.rsplit('/', 1)[-1]
+            index = int(name[1:].split('.')[0])
+        except (ValueError, IndexError):
+            return None
+        if path.startswith("/site/") and 0 <= index < self.n_pages and path == self.page_path(index):
+            return self._render(self._rng("page", index), f"Página {index}")
+        if path.startswith("/comp/") and 0 <= index < self.n_competitors:
+            return self._render(self._rng("comp", index), f"Competidor {index}")
+        return None
+
+    def _render(self, rng, label):
+        topic = rng.choice(TOPICS)
+        place = rng.choice(PLACES)
+        h2s = [f"{rng.choice(TOPICS).capitalize()} en {rng.choice(PLACES)}" for _ in range(rng.randint(1, 4))]
+        body = "".join(f"<p>{p}</p>" for p in self._paragraphs(rng))
+        nav = "".join(f"<li><a href='/site/{t}/'>{t}</a></li>" for t in TOPICS[:8])
+        return (
+            "<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'>"
+            f"<title>{label}: {topic} en {place}</title>"
+            f"<meta name='description' content='{topic.capitalize()} en {place}: {rng.choice(MODIFIERS)}'>"
+            "<script>window.dataLayer=window.dataLayer||[];</script><style>body{margin:0}</style></head><body>"
+            f"<header><nav><ul>{nav}</ul></nav></header>"
+            f"<main><h1>{topic.capitalize()} {place}</h1>"
+            + "".join(f"<h2>{h}</h2>" for h in h2s) + body +
+            "</main><footer>Derechos reservados. Contáctanos: teléfono, email, dirección.</footer>"
+            "</body></html>"
+        )
+
+    # --- KEYWORDS ---
+    def keywords(self):
+        """Keywords únicas de 2-4 términos (tema + lugar/modificador), en orden determinista."""
+        rng = self._rng("keywords", 0)
+        seen = set()
+        result = []
+        attempts = 0
+        while len(result) < self.n_keywords and attempts < self.n_keywords * 20:
+            attempts += 1
+            parts = [rng.choice(TOPICS)]
+            if rng.random() < 0.2:
+                parts.insert(0, rng.choice(MODIFIERS))
+            elif rng.random() < 0.5:
+                parts.append(rng.choice(MODIFIERS))
+            if rng.random() < 0.7:
+                parts.append(rng.choice(PLACES))
+            if rng.random() < 0.2:
+                parts.append(rng.choice(TOPICS))
+            kw = " ".join(parts)
+            if kw not in seen:
+                seen.add(kw)
+                result.append(kw)
+        return result
+
+    def seeds(self, n=10):
+        return self.keywords()[:n]
+
+    def suggestions(self, query, limit=8):
+        """Respuesta del stub de Suggest: extensiones deterministas de la consulta."""
+        if len(query) > 60:
+            return []
+        rng = random.Random(f"{self.seed}:suggest:{query}")
+        return [f"{query} {m}" for m in rng.sample(MODIFIERS + PLACES, min(limit, len(MODIFIERS)))]
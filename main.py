@@ -1,9 +1,14 @@
+import argparse
+import contextlib
+import hashlib
+import json
 import os
 import sys
-from modules.scraper import SiteScraper
-from modules.market_data import MarketData
-from modules.analyzer import SEOAnalyzer
-from modules.reporter import StrategicReport
+import time
+import traceback
+
+# Sólo librerías estándar aquí: cada subcomando importa lo pesado que necesita (ver modules/__init__.py)
+DEFAULT_CONFIG = "config/audit.json"
 
 def load_seeds(filepath="seeds.txt"):
     """Carga semillas evitando líneas vacías."""
@@ -13,96 +18,589 @@ def load_seeds(filepath="seeds.txt"):
     with open(filepath, 'r', encoding='utf-8') as f:
         return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
 
-def main():
-    print("\n=================================================")
-    print("   AUDITORÍA SEO 360° | REY SABIO SALOMÓN")
-    print("   Protocolo: Scraping Quirúrgico + Análisis de Densidad")
-    print("=================================================\n")
-    
-    # 1. OBJETIVOS (Tus URLs Reales)
-    TARGETS = {
-        "Inicio (Home)": "https://www.reysabiosalomon.org/",
-        "Básica (Elemental)": "https://www.reysabiosalomon.org/basicaelemental",
-        "Bachillerato": "https://www.reysabiosalomon.org/basicamediaysuperior",
-        "Nosotros": "https://www.reysabiosalomon.org/about-us"
+def load_config(path=DEFAULT_CONFIG):
+    """Objetivos, competencia, semillas y carpetas de salida desde un JSON (o un dict ya leído, p.ej. del servicio)."""
+    if isinstance(path, dict):
+        config = dict(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    config.setdefault("client", "")
+    config.setdefault("brand_stop_words", [])  # Nombre del cliente: se excluye del análisis para ver gaps reales
+    config.setdefault("targets", {})
+    config.setdefault("competitors", [])
+    config.setdefault("seeds_file", "seeds.txt")
+    config.setdefault("output_dir", "output")
+    config.setdefault("cache_dir", ".cache")
+    config.setdefault("max_page_bytes", 5 * 1024 * 1024)  # Tope por descarga: lo que exceda se descarta
+    return config
+
+# --- ARTEFACTOS ENTRE FASES (directorio de corrida versionado) ---
+def open_run(config, args, create=False, create_if_missing=False):
+    """Corrida indicada con --run (por defecto la última; create=True abre una nueva)."""
+    from modules import RunStore
+
+    run_id = getattr(args, "run", None)
+    if create_if_missing and run_id is None and RunStore.latest(config["output_dir"]) is None:
+        create = True
+    try:
+        store = RunStore(config["output_dir"], run_id=run_id, create=create and run_id is None)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"   [FATAL] {e}")
+        return None
+    print(f"   [Checkpoint] Corrida {store.run_id}: {store.path}")
+    configure_metrics(store, args)
+    return store
+
+def configure_metrics(store, args):
+    """Métricas de la corrida: eventos en <run>/metrics.jsonl y resumen Prometheus en <run>/metrics.prom."""
+    from modules import metrics
+
+    metrics.configure(
+        jsonl_path=store.file("metrics.jsonl"),
+        textfile_path=args.metrics_textfile or store.file("metrics.prom"),
+        profile_phase=args.profile, profiler=args.profiler, profile_dir=store.path,
+        run=store.run_id, command=args.command,
+    )
+
+def run_phase(name, fn, *args):
+    """Ejecuta una fase midiendo duración y pico de RSS (y perfilándola si se pidió con --profile)."""
+    from modules import metrics
+
+    with metrics.phase(name):
+        return fn(*args)
+
+def require_phase(store, phase):
+    if store.is_done(phase):
+        return True
+    print(f"   [FATAL] La corrida {store.run_id} no tiene la fase '{phase}'. Ejecuta antes: python main.py {phase}")
+    return False
+
+def load_market(store):
+    keywords = store.read_table("keywords.parquet")
+    interest = keywords.dropna(subset=["trend_interest"])
+    return {
+        'seeds': keywords.loc[keywords["is_seed"], "keyword"].tolist(),
+        'keywords': keywords["keyword"].tolist(),
+        'trend_data': dict(zip(interest["keyword"], interest["trend_interest"].astype(float))),
+    }
+
+def load_corpus(store):
+    pages = store.read_table("pages.parquet")
+    site = pages[pages["kind"] == "site"]
+    competitors = pages[pages["kind"] == "competitor"]
+    return {
+        'site': dict(zip(site["name"], site["content"])),
+        'competitors': dict(zip(competitors["name"], competitors["content"])),
+    }
+
+def load_results(store):
+    """Resultados del análisis leídos con memory-map desde la corrida."""
+    info = store.info("analyze")
+    df_results = store.read_table("results.parquet") if info.get("has_matrix") else None
+    comp_keywords = store.read_table("competitors.parquet")
+    comp_keywords.attrs['n_competitors'] = info.get("n_competitors", 0)
+    cannibalization = store.read_table("cannibalization.parquet")
+    return df_results, comp_keywords, cannibalization, info.get("chart_path")
+
+def open_docstore(config, stop_words=None):
+    """Análisis y extracciones por hash de contenido, compartidos entre corridas en la caché."""
+    from modules import AnalyzedDocStore
+
+    return AnalyzedDocStore(os.path.join(config["cache_dir"], "docstore"), stop_words=stop_words)
+
+def open_delta(config, args, store, signature):
+    """DeltaAudit contra la corrida de --delta (o la anterior analizada); None si no hay con qué comparar."""
+    from modules import DeltaAudit, RunStore
+
+    run_id = None if args.delta == "previous" else args.delta
+    if run_id is None:
+        run_id = RunStore.previous(config["output_dir"], store.run_id, "analyze")
+    if run_id is None or run_id == store.run_id:
+        print("   [Delta] No hay una corrida anterior analizada: análisis completo.")
+        return None
+    try:
+        previous = RunStore(config["output_dir"], run_id=run_id)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"   [Delta] {e}: análisis completo.")
+        return None
+    if not previous.info("analyze").get("has_matrix"):
+        print(f"   [Delta] La corrida {run_id} no tiene matriz analizada: análisis completo.")
+        return None
+    return DeltaAudit(previous, signature, drift_threshold=args.drift_threshold)
+
+def _page_record(kind, name, url, data=None, content=None):
+    data = data or {}
+    content = data.get('content_sample', '') if content is None else content
+    return {
+        'kind': kind, 'name': name, 'url': url,
+        'title': data.get('title'), 'h1': data.get('h1'), 'h2': data.get('h2'),
+        'meta_desc': data.get('meta_desc'), 'word_count': data.get('word_count', len(content.split())),
+        'content': content, 'content_hash': hashlib.sha1(content.encode('utf-8')).hexdigest(),
+        'truncated': bool(data.get('truncated', False)),
     }
 
-    # 2. COMPETENCIA (URLs Profundas para obtener texto real)
-    COMPETITORS = [
-        "https://www.ism.edu.ec/admisiones/",
-        "https://www.jkepler.edu.ec/admisiones/",
-        "https://www.einstein.k12.ec/admisiones/"
-    ]
-    
-    # 3. CARGA DE DATOS
-    seeds = load_seeds("seeds.txt")
-    if not seeds: return
+# --- FASES ---
+def phase_expand(config, args, store):
+    import pandas as pd
+    from modules import KeywordNormalizer, MarketData, SuggestCache, TrendStore
+    from modules.market_data import SUGGEST_URL
+
+    seeds = load_seeds(config["seeds_file"])
+    if not seeds: return None
 
     print(f"> FASE 1: Inteligencia de Mercado")
-    market = MarketData()
+    suggest_cache = SuggestCache(os.path.join(config["cache_dir"], "suggest_cache.sqlite"))
+    warm = getattr(args, "warm", None)
+    market = MarketData(
+        suggest_url=config.get("suggest_url", SUGGEST_URL), cache=suggest_cache,
+        trend_store=TrendStore(os.path.join(config["cache_dir"], "trends.sqlite")),
+        follow_redirects=not (warm is not None and warm.public_only)
+    )
     # Usamos sugerencias para ampliar el vocabulario semántico
-    all_keywords = market.get_suggestions(seeds)
+    all_keywords = market.get_suggestions(seeds, depth=args.suggest_depth, alphabet=args.suggest_alphabet)
+    print(f"   [Cache] Suggest: {suggest_cache.hits} aciertos | {suggest_cache.misses} fallos")
     # Aseguramos que las semillas originales estén incluidas con prioridad
     final_keyword_list = list(set(seeds + all_keywords))
     print(f"   Vocabulario objetivo expandido a {len(final_keyword_list)} términos.")
+    # Demanda real: las semillas se miden en Trends (escala común vía ancla); el resto recibe el default del analizador
+    trend_data = market.get_real_trends(seeds)
+
+    if args.no_keyword_merge:
+        seed_set = set(seeds)
+        keywords = pd.DataFrame({
+            'keyword': final_keyword_list,
+            'is_seed': [k in seed_set for k in final_keyword_list],
+            'trend_interest': pd.Series([trend_data.get(k) for k in final_keyword_list], dtype=float),
+        })
+    else:
+        # Variantes (tildes, plurales, orden, typos) colapsan en un representante: menos filas en la matriz
+        keywords = KeywordNormalizer(threshold=args.keyword_threshold).collapse(final_keyword_list, trend_data, seeds)
+        print(f"   [Keywords] {len(final_keyword_list)} términos -> {len(keywords)} grupos "
+              f"({keywords.attrs['n_stems_merged']} raíces con typos fusionadas)")
+        interest = keywords.dropna(subset=["trend_interest"])
+        trend_data = dict(zip(interest["keyword"], interest["trend_interest"]))
+
+    store.write_table("keywords.parquet", keywords)
+    store.mark_done("expand", n_keywords=len(keywords), n_raw_keywords=len(final_keyword_list), n_seeds=len(seeds))
+    return {'seeds': keywords.loc[keywords["is_seed"], "keyword"].tolist(), 'keywords': keywords["keyword"].tolist(),
+            'trend_data': trend_data}
+
+def phase_scrape(config, args, store):
+    import pandas as pd
+    from modules import SiteScraper, ResponseCache, SiteCrawler
 
-    scraper = SiteScraper("") # Instancia genérica
-    
-    # 4. AUDITORÍA INTERNA (Scraping Limpio)
+    warm = getattr(args, "warm", None)
+    if warm is not None:
+        # Servicio: caché, análisis y pool de conexiones siguen abiertos para el próximo trabajo
+        http_cache, docstore, scraper = warm.http_cache, warm.docstore, warm.scraper
+    else:
+        # Caché en disco: las re-auditorías semanales sólo revalidan (If-None-Match / If-Modified-Since)
+        http_cache = ResponseCache(os.path.join(config["cache_dir"], "http_cache.sqlite"))
+        docstore = open_docstore(config)
+        scraper = SiteScraper("", cache=http_cache, max_bytes=config["max_page_bytes"], docstore=docstore) # Instancia genérica (pool de conexiones compartido)
+
+    # AUDITORÍA INTERNA (Scraping Limpio)
     print(f"\n> FASE 2: Escaneo Quirúrgico Interno")
     site_corpus = {}
-    for name, url in TARGETS.items():
-        print(f"   Analizando: {name}")
-        scraper.url = url
-        data = scraper.audit()
-        # Solo agregamos si hay contenido real detectado
-        if data and data.get('content_sample') and len(data['content_sample']) > 50:
+    records = []
+    if args.crawl:
+        crawler = SiteCrawler(scraper, args.crawl, max_pages=args.max_pages, max_depth=args.max_depth,
+                              max_bytes=config["max_page_bytes"])
+        for name, data in crawler.crawl().items():
             site_corpus[name] = data['content_sample']
-        else:
-            print(f"      [!] Advertencia: {name} parece vacía o protegida.")
+            records.append(_page_record("site", name, data['url'], data))
+    else:
+        targets = config["targets"]
+        names_by_url = {url: name for name, url in targets.items()}
+        for url, data in scraper.audit_many(targets.values(), max_bytes=config["max_page_bytes"]):
+            name = names_by_url[url]
+            print(f"   Analizando: {name}")
+            # Solo agregamos si hay contenido real detectado
+            if data and data.get('content_sample') and len(data['content_sample']) > 50:
+                site_corpus[name] = data['content_sample']
+                records.append(_page_record("site", name, url, data))
+            else:
+                print(f"      [!] Advertencia: {name} parece vacía o protegida.")
+    http_cache.report("Fase 2")
 
     if not site_corpus:
         print("   [FATAL] No se pudo extraer contenido válido. Revisa el Scraper.")
-        return
+        if warm is None:
+            scraper.close()
+        docstore.save()
+        return None
 
-    # 5. ANÁLISIS COMPETENCIA
+    # ANÁLISIS COMPETENCIA
     print(f"\n> FASE 3: Deconstrucción de Competencia")
     competitor_corpus = {}
-    for url in COMPETITORS:
-        scraper.url = url
-        try:
-            data = scraper.audit()
-            if data and data.get('content_sample'):
-                competitor_corpus[url] = data['content_sample']
-        except:
+    for url, data in scraper.audit_many(config["competitors"], max_bytes=config["max_page_bytes"]):
+        if data and data.get('content_sample'):
+            competitor_corpus[url] = data['content_sample']
+            records.append(_page_record("competitor", url, url, data))
+        else:
             print(f"   [X] Fallo al leer {url}")
+    if warm is None:
+        scraper.close()
+    http_cache.report("Fase 3")
+    docstore.report()
+    docstore.save()
     print(f"   Datos extraídos de {len(competitor_corpus)} competidores.")
 
-    # 6. PROCESAMIENTO MATEMÁTICO
+    store.write_table("pages.parquet", pd.DataFrame(records))
+    store.mark_done("scrape", n_site=len(site_corpus), n_competitors=len(competitor_corpus))
+    return {'site': site_corpus, 'competitors': competitor_corpus}
+
+def phase_analyze(config, args, store, market_state, corpus_state):
+    import numpy as np
+    from modules import SEOAnalyzer, IncrementalTfidfModel, export_matrix
+
     print("\n> FASE 4: Cálculo de Matrices de Relevancia")
-    analyzer = SEOAnalyzer(site_corpus, final_keyword_list)
-    
+    analyzer = SEOAnalyzer(corpus_state['site'], market_state['keywords'], trend_data=market_state['trend_data'],
+                           brand_stop_words=config["brand_stop_words"])
+    analyzer.chart_path = store.file("heatmap_estrategico.png")
+    warm = getattr(args, "warm", None)
+    if warm is not None:
+        analyzer.docstore, analyzer.intents = warm.docstore_for(analyzer.stop_words), warm.intents
+    else:
+        analyzer.docstore = open_docstore(config, analyzer.stop_words)
+    analyzer.similarity_workers = args.similarity_workers
+    if args.model_dir:
+        analyzer.model = IncrementalTfidfModel(
+            args.model_dir, analyzer.stop_words,
+            drift_threshold=args.drift_threshold, hashing=args.hashing
+        )
+
+    delta = open_delta(config, args, store, analyzer.docstore.signature) if args.delta else None
+
     # A) Matriz Interna
-    df_results = analyzer.run_matrix_analysis()
-    
+    df_results = analyzer.run_matrix_analysis(delta)
+
     # B) Matriz Competencia
-    comp_keywords = analyzer.analyze_competitors(competitor_corpus)
+    comp_keywords = analyzer.analyze_competitors(corpus_state['competitors'])
 
-    # 7. GENERACIÓN DEL ENTREGABLE
-    print("\n> FASE 5: Generación de Reporte Ejecutivo")
+    # C) Canibalización entre páginas propias (en delta, las páginas intactas reutilizan su firma MinHash)
+    signatures = None
+    if delta is not None and os.path.exists(delta.previous.file("minhash.npz")):
+        signatures = analyzer.cannibalization.signatures_from_arrays(delta.previous.read_arrays("minhash.npz"))
+    cannibalization = analyzer.analyze_cannibalization(signatures)
+    analyzer.docstore.report()
+    analyzer.docstore.save()
+
+    if df_results is not None and args.export_matrix:
+        export_matrix(
+            args.export_matrix, analyzer.keyword_vectors, analyzer.page_vectors,
+            analyzer.keywords, analyzer.page_names, analyzer.similarity
+        )
+
+    # Checkpoint: matrices dispersas y resumen de similitud en .npz; tablas en Parquet
     if df_results is not None:
-        reporter = StrategicReport()
-        reporter.generate(
-            df_results, 
-            "output/heatmap_estrategico.png", 
-            comp_keywords, 
-            "output/Auditoria_SEO_Final.pdf"
+        similarity = analyzer.similarity
+        store.write_sparse("tfidf_pages.npz", analyzer.page_vectors)
+        store.write_sparse("tfidf_keywords.npz", analyzer.keyword_vectors)
+        store.write_arrays(
+            "similarity.npz", max_coverage=similarity.max_coverage, action_priority=similarity.action_priority,
+            top_pages=similarity.top_pages, top_scores=similarity.top_scores,
+            keywords=np.asarray(analyzer.keywords, dtype=str), page_names=np.asarray(analyzer.page_names, dtype=str)
         )
-    
+        store.write_table("results.parquet", df_results, index=True)
+    # Espacio TF-IDF (términos + IDF) y deriva acumulada: la próxima corrida con --delta transforma ahí lo que cambie
+    # (con --model-dir es el del modelo persistido; con --hashing no hay vocabulario que guardar)
+    space = {}
+    if df_results is not None and analyzer.idf is not None:
+        store.write_arrays("tfidf_space.npz", terms=np.asarray(analyzer.terms, dtype=str), idf=analyzer.idf,
+                           signature=np.array([analyzer.docstore.signature]),
+                           stop_words=np.asarray(analyzer.stop_words, dtype=str))
+        if delta is not None and delta.applied:
+            space = delta.info
+        elif analyzer.model is not None:
+            space = {'fit_docs': analyzer.model.fit_docs, 'delta_changes': analyzer.model.changes}
+        else:
+            space = {'fit_docs': len(analyzer.page_names) + len(analyzer.keywords), 'delta_changes': 0}
+    if df_results is not None and delta is not None:
+        store.write_table("moved.parquet", delta.moved(analyzer))
+        space['delta_from'] = delta.previous.run_id
+    store.write_table("competitors.parquet", comp_keywords)
+    store.write_table("cannibalization.parquet", cannibalization)
+    store.write_arrays("minhash.npz", **analyzer.cannibalization.signature_arrays())
+    store.mark_done(
+        "analyze", has_matrix=df_results is not None, chart_path=analyzer.chart_path,
+        n_competitors=comp_keywords.attrs.get('n_competitors', 0), **space
+    )
+    return analyzer, df_results, comp_keywords, cannibalization
+
+def phase_report(config, args, store, df_results, comp_keywords, cannibalization, chart):
+    from modules import StrategicReport, HTMLReportWriter
+
+    print("\n> FASE 5: Generación de Reporte Ejecutivo")
+    if df_results is None:
+        print("   [!] Sin matriz de resultados: no se genera el reporte.")
+        return
+    if isinstance(chart, str) and not os.path.exists(chart):
+        # El heatmap no llegó a escribirse (p.ej. la corrida cayó durante el render): se redibuja desde results.parquet
+        from modules.exporters import page_columns
+        from modules.rendering import HeatmapJob
+        chart = HeatmapJob(df_results[page_columns(df_results)], chart, background=False)
+    moved = None
+    if store.info("analyze").get("delta_from"):
+        # Corrida con --delta: sección "qué se movió" frente a la corrida de referencia
+        moved = store.read_table("moved.parquet")
+        moved.attrs['previous_run'] = store.info("analyze")["delta_from"]
+    pdf_path = os.path.join(config["output_dir"], "Auditoria_SEO_Final.pdf")
+    reporter = StrategicReport(client=config["client"])
+    reporter.generate(df_results, chart, comp_keywords, pdf_path, cannibalization=cannibalization, moved=moved)
+    if args.html:
+        HTMLReportWriter(os.path.join(config["output_dir"], "Auditoria_SEO_Final.html")).generate(
+            df_results, comp_keywords, chart, cannibalization=cannibalization, moved=moved
+        )
+    store.mark_done("report", pdf=pdf_path)
+
+# --- SUBCOMANDOS ---
+def cmd_expand(config, args):
+    store = open_run(config, args, create=True)
+    return store is not None and run_phase("expand", phase_expand, config, args, store) is not None
+
+def cmd_scrape(config, args):
+    store = open_run(config, args, create_if_missing=True)
+    return store is not None and run_phase("scrape", phase_scrape, config, args, store) is not None
+
+def cmd_analyze(config, args):
+    from modules import rendering
+
+    store = open_run(config, args)
+    if store is None or not (require_phase(store, "expand") and require_phase(store, "scrape")): return False
+    analyzer, df_results, _, _ = run_phase("analyze", phase_analyze, config, args, store, load_market(store), load_corpus(store))
+    if analyzer.heatmap_job is not None:
+        analyzer.heatmap_job.result()  # El subcomando termina con el gráfico ya escrito
+    rendering.shutdown()
+    return df_results is not None
+
+def cmd_report(config, args):
+    store = open_run(config, args)
+    if store is None or not require_phase(store, "analyze"): return False
+    df_results, comp_keywords, cannibalization, chart_path = load_results(store)
+    run_phase("report", phase_report, config, args, store, df_results, comp_keywords, cannibalization, chart_path)
+    return df_results is not None
+
+def cmd_all(config, args):
+    from modules import rendering
+    from modules.checkpoint import PHASES
+
+    # --resume / --from-phase retoman la corrida indicada (o la última) en lugar de abrir una nueva
+    resuming = args.resume or args.from_phase is not None
+    store = open_run(config, args, create=not resuming)
+    if store is None: return False
+    start = args.from_phase or store.first_pending()
+    if start is None:
+        print(f"   [Checkpoint] La corrida {store.run_id} ya está completa. Usa --from-phase para rehacer una fase.")
+        return True
+    for phase in PHASES[:PHASES.index(start)]:
+        if not require_phase(store, phase): return False
+    if resuming:
+        print(f"   [Checkpoint] Reanudando desde la fase '{start}'")
+    run = lambda phase: PHASES.index(phase) >= PHASES.index(start)
+
+    market_state = run_phase("expand", phase_expand, config, args, store) if run("expand") else load_market(store)
+    if market_state is None: return False
+    corpus_state = run_phase("scrape", phase_scrape, config, args, store) if run("scrape") else load_corpus(store)
+    if corpus_state is None: return False
+    if run("analyze"):
+        analyzer, df_results, comp_keywords, cannibalization = run_phase("analyze", phase_analyze, config, args, store, market_state, corpus_state)
+        # El heatmap se sigue dibujando en paralelo; el reporte lo espera al incrustarlo
+        chart = analyzer.heatmap_job or analyzer.chart_path
+    else:
+        df_results, comp_keywords, cannibalization, chart = load_results(store)
+    run_phase("report", phase_report, config, args, store, df_results, comp_keywords, cannibalization, chart)
+    if getattr(args, "warm", None) is None:
+        rendering.shutdown()  # En el servicio el proceso de renderizado queda para el próximo trabajo
+    return df_results is not None
+
+def _batch_worker(config, args):
+    """Pipeline completo de un cliente en un proceso del lote; su salida va a <output_dir>/batch.log."""
+    os.makedirs(config["output_dir"], exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(config["output_dir"], "batch.log"), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            ok = execute(config, args)
+        except Exception:
+            traceback.print_exc()
+            raise
+    return ok, time.perf_counter() - start
+
+def cmd_batch(args):
+    from modules import batch
+
+    configs = [(path, load_config(path)) for path in args.configs]
+    batch.assign_output_dirs(configs)
+    cache_dir = args.cache_dir or configs[0][1]["cache_dir"]
+    seeds_by_client = []
+    jobs = []
+    base_args = parse_args(["all"])
+    for path, config in configs:
+        config["cache_dir"] = cache_dir # Cachés compartidas: lo que un cliente ya descargó, los demás lo leen
+        seeds_by_client.append(load_seeds(config["seeds_file"]))
+        client_args = argparse.Namespace(**vars(base_args))
+        for key, value in vars(args).items():
+            if hasattr(client_args, key):
+                setattr(client_args, key, value)
+        client_args.command, client_args.config = "all", path
+        # Rutas por cliente: el modelo incremental y la matriz exportada no se comparten
+        if args.model_dir:
+            client_args.model_dir = os.path.join(args.model_dir, batch.client_slug(config, path))
+        if args.export_matrix:
+            client_args.export_matrix = os.path.join(config["output_dir"], os.path.basename(args.export_matrix))
+        jobs.append((config["client"] or path, config, client_args))
+
+    start = time.perf_counter()
+    print("> Precarga compartida (competencia y semillas comunes)")
+    batch.prefetch_shared(configs, cache_dir, seeds_by_client, args.suggest_depth, args.suggest_alphabet)
+    print("\n> Auditorías por cliente")
+    results = batch.run_clients(jobs, _batch_worker, workers=args.workers)
+    batch.print_summary(results, time.perf_counter() - start)
+    for name, config, _ in jobs:
+        print(f"   {name}: {config['output_dir']} (log: batch.log)")
+    return all(ok for _, ok, _, _ in results)
+
+def cmd_serve(args):
+    from modules import AuditService
+    from modules.service import AccessPolicy, serve
+
+    base_args = parse_args(["all"])
+    for key, value in vars(args).items():
+        if hasattr(base_args, key) and key != "command":
+            setattr(base_args, key, value)  # Los flags de serve son las opciones por defecto de cada trabajo
+
+    def job_args(options):
+        job = argparse.Namespace(**vars(base_args))
+        for key, value in options.items():
+            key = key.replace('-', '_')
+            if not hasattr(job, key) or key in ("command", "config"):
+                raise ValueError(f"Opción desconocida: {key}")
+            setattr(job, key, value)
+        return job
+
+    service = AuditService(execute, job_args, load_config, cache_dir=args.cache_dir, workers=args.workers,
+                           max_queue=args.max_queue, max_audits_queued=args.max_audits,
+                           policy=AccessPolicy(args.config_root, args.output_root, args.allow_private_targets))
+    serve(service, host=args.host, port=args.port, page_timeout=args.page_timeout)
+    return True
+
+def parse_args(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", default=DEFAULT_CONFIG, help="Archivo JSON con objetivos, competencia, semillas y salida")
+    common.add_argument("--import-profile", action="store_true", help="Imprimir el desglose del tiempo de importación")
+    common.add_argument("--metrics-textfile", metavar="RUTA", help="Resumen de métricas en formato Prometheus (por defecto <corrida>/metrics.prom)")
+    common.add_argument("--profile", choices=["expand", "scrape", "analyze", "report"], help="Perfilar esta fase (se guarda en la corrida)")
+    common.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile", help="Perfilador de --profile")
+    common.add_argument("--run", metavar="RUN_ID", help="Corrida en <output_dir>/runs a usar (por defecto la última; expand/all abren una nueva)")
+
+    expand = argparse.ArgumentParser(add_help=False)
+    expand.add_argument("--suggest-depth", type=int, default=1, help="Niveles de expansión recursiva de Google Suggest")
+    expand.add_argument("--suggest-alphabet", action="store_true", help="Expandir cada consulta con sufijos a..z")
+    expand.add_argument("--keyword-threshold", type=float, default=0.65, help="Similitud de n-gramas a partir de la cual dos raíces se consideran la misma (typos)")
+    expand.add_argument("--no-keyword-merge", action="store_true", help="No colapsar variantes de keywords (tildes, plurales, orden)")
+
+    scrape = argparse.ArgumentParser(add_help=False)
+    scrape.add_argument("--crawl", metavar="URL", help="Rastrear el sitio desde esta URL (sitemap + enlaces) en lugar de usar los targets")
+    scrape.add_argument("--max-pages", type=int, default=500, help="Presupuesto máximo de páginas del rastreo")
+    scrape.add_argument("--max-depth", type=int, default=3, help="Profundidad máxima de enlaces del rastreo")
+
+    analyze = argparse.ArgumentParser(add_help=False)
+    analyze.add_argument("--model-dir", help="Persistir el modelo TF-IDF aquí y vectorizar sólo lo nuevo/modificado")
+    analyze.add_argument("--drift-threshold", type=float, default=0.2, help="Deriva a partir de la cual se reajusta el TF-IDF completo")
+    analyze.add_argument("--hashing", action="store_true", help="Usar HashingVectorizer (memoria acotada) en el modo incremental")
+    analyze.add_argument("--export-matrix", metavar="RUTA", help="Exportar la matriz keyword×página completa (.parquet o .csv)")
+    analyze.add_argument("--similarity-workers", type=int, default=1, help="Procesos para la similitud por bloques (1 = en proceso)")
+    analyze.add_argument("--delta", nargs="?", const="previous", metavar="RUN_ID", help="Recalcular sólo páginas y keywords que cambiaron respecto de la corrida anterior analizada (o RUN_ID) y reportar qué se movió")
+
+    report = argparse.ArgumentParser(add_help=False)
+    report.add_argument("--html", action="store_true", help="Generar también el reporte HTML en streaming")
+
+    resume = argparse.ArgumentParser(add_help=False)
+    resume.add_argument("--resume", action="store_true", help="Retomar la corrida (--run o la última) saltando las fases ya guardadas")
+    resume.add_argument("--from-phase", choices=["expand", "scrape", "analyze", "report"], help="Rehacer desde esta fase cargando las anteriores de la corrida")
+
+    parser = argparse.ArgumentParser(description="Auditoría SEO 360°")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("expand", parents=[common, expand], help="Fase 1: expandir keywords (Suggest + Trends)")
+    commands.add_parser("scrape", parents=[common, scrape], help="Fases 2-3: extraer sitio y competencia")
+    commands.add_parser("analyze", parents=[common, analyze], help="Fase 4: matrices de relevancia y heatmap")
+    commands.add_parser("report", parents=[common, report], help="Fase 5: reporte PDF (y HTML)")
+    commands.add_parser("all", parents=[common, expand, scrape, analyze, report, resume], help="Pipeline completo")
+    batch = commands.add_parser("batch", parents=[expand, analyze, report], help="Auditar varios clientes en paralelo")
+    batch.add_argument("configs", nargs="+", metavar="CONFIG", help="Archivos JSON de cada cliente")
+    batch.add_argument("--workers", type=int, help="Procesos en paralelo (por defecto, núcleos disponibles)")
+    batch.add_argument("--cache-dir", help="Carpeta de cachés compartida (por defecto la del primer cliente)")
+    serve = commands.add_parser("serve", parents=[expand, scrape, analyze, report], help="Servicio HTTP local: auditorías en cola y re-análisis de páginas con estado caliente")
+    serve.add_argument("--host", default="127.0.0.1", help="Interfaz de escucha (por defecto sólo local)")
+    serve.add_argument("--port", type=int, default=8600, help="Puerto de la API")
+    serve.add_argument("--workers", type=int, default=4, help="Hilos para re-análisis de páginas")
+    serve.add_argument("--max-queue", type=int, default=16, help="Re-análisis en espera antes de responder 429")
+    serve.add_argument("--max-audits", type=int, default=4, help="Auditorías en espera antes de responder 429 (se ejecutan de a una)")
+    serve.add_argument("--page-timeout", type=float, default=10.0, help="Segundos que POST /pages/analyze espera antes de responder 202")
+    serve.add_argument("--cache-dir", default=".cache", help="Cachés del servicio (compartidas por todos los trabajos)")
+    serve.add_argument("--config-root", default=".", help="Única carpeta de la que los pedidos pueden leer configuraciones y semillas")
+    serve.add_argument("--output-root", default=".", help="Única carpeta en la que los pedidos pueden escribir corridas y reportes")
+    serve.add_argument("--allow-private-targets", action="store_true", help="Permitir URLs hacia direcciones privadas o locales (por defecto sólo públicas)")
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0].startswith('-') and argv[0] not in ('-h', '--help'):
+        argv = ["all"] + list(argv) # Sin subcomando: pipeline completo, como antes
+    args = parser.parse_args(argv)
+    if getattr(args, "hashing", False) and args.model_dir and (args.delta or args.command == "serve"):
+        # Sin vocabulario no se guarda el espacio TF-IDF: ni --delta ni el servicio podrían partir de estas corridas
+        parser.error("--hashing con --model-dir no guarda el espacio TF-IDF: no se combina con --delta ni con serve")
+    return args
+
+COMMANDS = {
+    "expand": cmd_expand,
+    "scrape": cmd_scrape,
+    "analyze": cmd_analyze,
+    "report": cmd_report,
+    "all": cmd_all,
+}
+
+def execute(config, args):
+    """Ejecuta un subcomando sobre una configuración ya cargada; retorna True si terminó bien."""
     print("\n=================================================")
-    print("   ¡AUDITORÍA COMPLETADA!")
-    print("   Abre el archivo: output/Auditoria_SEO_Final.pdf")
-    print("=================================================")
+    print(f"   AUDITORÍA SEO 360° | {config['client']}")
+    print("   Protocolo: Scraping Quirúrgico + Análisis de Densidad")
+    print("=================================================\n")
+
+    from modules import metrics
+
+    try:
+        if args.import_profile:
+            from modules.import_profile import ImportProfiler
+            with ImportProfiler() as profiler:
+                ok = COMMANDS[args.command](config, args)
+            profiler.report()
+        else:
+            ok = COMMANDS[args.command](config, args)
+    finally:
+        # También si una fase cae: el JSONL y el resumen muestran hasta dónde llegó
+        textfile = metrics.flush()
+        metrics.current().close()
+        if textfile:
+            print(f"   [Metrics] Resumen: {textfile}")
+
+    if ok and args.command in ("report", "all"):
+        print("\n=================================================")
+        print("   ¡AUDITORÍA COMPLETADA!")
+        print(f"   Abre el archivo: {os.path.join(config['output_dir'], 'Auditoria_SEO_Final.pdf')}")
+        print("=================================================")
+    return ok
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "batch":
+        ok = cmd_batch(args)
+    elif args.command == "serve":
+        ok = cmd_serve(args)
+    else:
+        ok = execute(load_config(args.config), args)
+    return 0 if ok else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
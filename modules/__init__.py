@@ -0,0 +1,40 @@
+"""
+Paquete de la auditoría. Las clases públicas se cargan de forma perezosa
+(PEP 562): `from modules import SiteScraper` importa sólo modules.scraper y
+sus dependencias, no pandas/sklearn/seaborn/fpdf.
+"""
+import importlib
+
+_LAZY = {
+    'SiteScraper': 'modules.scraper',
+    'ResponseCache': 'modules.scraper',
+    'SiteCrawler': 'modules.crawler',
+    'MarketData': 'modules.market_data',
+    'SuggestCache': 'modules.market_data',
+    'TrendStore': 'modules.trends',
+    'SEOAnalyzer': 'modules.analyzer',
+    'IncrementalTfidfModel': 'modules.tfidf_model',
+    'StrategicReport': 'modules.reporter',
+    'HTMLReportWriter': 'modules.exporters',
+    'export_matrix': 'modules.exporters',
+    'RunStore': 'modules.checkpoint',
+    'CannibalizationDetector': 'modules.dedup',
+    'KeywordNormalizer': 'modules.keywords',
+    'AnalyzedDocStore': 'modules.docstore',
+    'AuditService': 'modules.service',
+    'DeltaAudit': 'modules.delta',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+        globals()[name] = value  # Las siguientes búsquedas no pasan por aquí
+        return value
+    raise AttributeError(f"module 'modules' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
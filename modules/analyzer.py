@@ -1,16 +1,29 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import os
+from sklearn.preprocessing import normalize
+from modules.similarity import chunked_similarity, top_n_indices
+from modules.intent import IntentClassifier
+from modules.dedup import CannibalizationDetector
+from modules.docstore import AnalyzedDocStore
+from modules.rendering import HeatmapJob
+from modules import metrics
 import numpy as np
 
 class SEOAnalyzer:
-    def __init__(self, site_corpus_dict, keywords, trend_data={}):
+    def __init__(self, site_corpus_dict, keywords, trend_data={}, model=None, brand_stop_words=()):
         self.corpus = site_corpus_dict
         self.keywords = keywords
         self.trend_data = trend_data # Diccionario {keyword: interest_score}
+        self.model = model # IncrementalTfidfModel opcional (modo incremental persistido)
+        self.top_k = 5 # Páginas más cercanas que se conservan por keyword
+        self.similarity_workers = 1 # >1 reparte los bloques de similitud en un pool de procesos
+        self.similarity = None # SimilarityResult de la última corrida
+        self.page_names = self.page_vectors = self.keyword_vectors = None
+        self.terms = self.idf = None # Espacio TF-IDF del ajuste completo (el modo delta transforma ahí lo que cambió)
+        self.intents = IntentClassifier() # Léxicos compilados desde config/intents.json
+        self.chart_path = 'output/heatmap_estrategico.png'
+        self.background_render = True # Heatmap en un proceso aparte
+        self.heatmap_job = None
+        self.cannibalization = CannibalizationDetector() # Casi duplicados entre páginas del sitio (MinHash + LSH)
         
         self.stop_words = [
             'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un', 'para', 
@@ -21,85 +34,145 @@ class SEOAnalyzer:
             'ellos', 'e', 'esto', 'mi', 'antes', 'algunos', 'que', 'unos', 'yo', 'otro', 'otras', 
             'otra', 'el', 'cual', 'poco', 'ella', 'estar', 'estos', 'algunas', 'algo', 'nosotros', 
             'mi', 'mis', 'tu', 'tus', 'te', 'ti', 'web', 'sitio', 'pagina', 'inicio', 'menu', 
-            'derechos', 'reservados', 'copyright', 'contactanos', 'telefono', 'email', 'direccion',
-            'rey', 'sabio', 'salomon', 'unidad', 'educativa' # Stopwords de marca para ver gaps reales
-        ]
+            'derechos', 'reservados', 'copyright', 'contactanos', 'telefono', 'email', 'direccion'
+        ] + list(brand_stop_words) # Stopwords de marca del cliente (config['brand_stop_words']) para ver gaps reales
+        # n-gramas por hash de contenido: cada texto se analiza una vez (main la persiste en la caché)
+        self.docstore = AnalyzedDocStore(stop_words=self.stop_words)
 
     def classify_intent(self, keyword):
-        kw = keyword.lower()
-        if any(t in kw for t in ['precio', 'costo', 'pension', 'matricula', 'inscripcion', 'admision', 'cupo']):
-            return "TRANSACCIONAL"
-        if any(t in kw for t in ['mejor', 'ranking', 'top', 'comparativa', 'vs', 'lista']):
-            return "COMERCIAL"
-        return "INFORMACIONAL"
-
-    def analyze_competitors(self, competitor_corpus):
-        # (Mantén la lógica de competencia igual que antes, es sólida)
-        # ... [copiar código anterior de analyze_competitors] ...
-        # Si prefieres, te lo repito abajo completo.
+        return self.intents.classify(keyword)
+
+    def analyze_competitors(self, competitor_corpus, top_n=40, min_score=0.03):
+        """
+        Un documento por competidor: el IDF vuelve a tener sentido y los pesos
+        se calculan con operaciones dispersas, sin densificar la matriz.
+        Retorna un DataFrame ordenado por score agregado con columnas
+        term, score (peso medio), doc_freq (competidores que usan el término),
+        top_competitor, top_score, intent y un peso por competidor.
+        """
         print("      ... [IA] Deconstruyendo competencia...")
-        if not competitor_corpus: return []
-        full_text = " ".join(competitor_corpus.values()).lower()
+        columns = ['term', 'score', 'doc_freq', 'top_competitor', 'top_score', 'intent']
+        if not competitor_corpus: return pd.DataFrame(columns=columns)
+        urls = list(competitor_corpus.keys())
         try:
-            vectorizer = TfidfVectorizer(stop_words=self.stop_words, max_features=500, ngram_range=(1,3))
-            tfidf_matrix = vectorizer.fit_transform([full_text])
-            feature_names = vectorizer.get_feature_names_out()
-            scores = tfidf_matrix.toarray()[0]
-            scored = []
-            for w, s in zip(feature_names, scores):
-                if s > 0.03 and len(w) > 3 and not w.isdigit():
-                    scored.append((w, s, self.classify_intent(w)))
-            scored.sort(key=lambda x: x[1], reverse=True)
-            return scored[:40]
-        except: return []
-
-    def run_matrix_analysis(self):
+            with metrics.timer("vectorizer_fit", matrix="competitors"):
+                tfidf_matrix, terms, _ = self.docstore.tfidf(list(competitor_corpus.values()), max_features=500)
+        except ValueError:
+            return pd.DataFrame(columns=columns)
+        tfidf_matrix = tfidf_matrix.tocsc()  # (competidores × términos), disperso
+        metrics.record_matrix("tfidf", tfidf_matrix, matrix="competitors")
+
+        aggregate = np.asarray(tfidf_matrix.mean(axis=0)).ravel()
+        peak = tfidf_matrix.max(axis=0).toarray().ravel()
+        peak_doc = np.asarray(tfidf_matrix.argmax(axis=0)).ravel()
+        doc_freq = np.diff(tfidf_matrix.indptr)  # nnz por columna en CSC = documentos que contienen el término
+
+        # Filtros vectorizados: peso relevante en algún competidor, términos de más de 3 letras, no numéricos
+        keep = (peak > min_score) & (np.char.str_len(terms) > 3) & ~np.char.isdigit(terms)
+        candidates = np.flatnonzero(keep)
+        order = candidates[np.argsort(-aggregate[candidates], kind='stable')][:top_n]
+
+        result = pd.DataFrame({
+            'term': terms[order],
+            'score': aggregate[order],
+            'doc_freq': doc_freq[order],
+            'top_competitor': [urls[i] for i in peak_doc[order]],
+            'top_score': peak[order],
+        })
+        result['intent'] = self.intents.classify_many(result['term']).to_numpy()
+        # Peso de cada término en cada competidor (sólo las columnas seleccionadas se densifican)
+        per_competitor = tfidf_matrix[:, order].T.toarray()
+        for j, url in enumerate(urls):
+            result[url] = per_competitor[:, j]
+        result.attrs['n_competitors'] = len(urls)
+        return result
+
+    def analyze_cannibalization(self, signatures=None):
+        """Clusters de páginas del sitio con contenido casi duplicado (ver CannibalizationDetector)."""
+        print("      ... [IA] Buscando canibalización entre páginas...")
+        with metrics.timer("cannibalization"):
+            clusters = self.cannibalization.detect(self.corpus, signatures=signatures)
+        metrics.gauge("cannibalization_candidates", clusters.attrs['n_candidates'])
+        metrics.gauge("cannibalization_pairs", clusters.attrs['n_pairs'])
+        print(f"      > {len(clusters)} clusters ({clusters.attrs['n_pairs']} pares verificados de {clusters.attrs['n_candidates']} candidatos LSH)")
+        return clusters
+
+    def run_matrix_analysis(self, delta=None):
         print("      ... [IA] Cruzando Cobertura vs Demanda Real (Trends)")
+        # delta (DeltaAudit): sólo lo que cambió desde la corrida anterior; si no aplica, análisis completo
+        if delta is None or not delta.apply(self):
+            if not self.vectorize(): return None
+            self.compute_similarity()
+        df_top = self.top_results()
         
+        # Generar gráfico
+        self._generate_heatmap(df_top.drop(columns=['market_interest', 'intent', 'max_coverage', 'action_priority']))
+        
+        return df_top
+
+    def vectorize(self):
+        """TF-IDF de páginas y keywords. Retorna False si no hay vocabulario utilizable."""
         page_names = list(self.corpus.keys())
         page_texts = list(self.corpus.values())
-        if not page_texts or not self.keywords: return None
+        if not page_texts or not self.keywords: return False
 
-        all_content = page_texts + self.keywords
-        
-        try:
-            vectorizer = TfidfVectorizer(stop_words=self.stop_words, ngram_range=(1,3))
-            tfidf_matrix = vectorizer.fit_transform(all_content)
-        except ValueError:
-            return None
+        if self.model is not None:
+            # Modo incremental: sólo se vectoriza lo nuevo o modificado desde la última corrida
+            try:
+                with metrics.timer("vectorizer_fit", matrix="site", mode="incremental"):
+                    page_vectors, keyword_vectors = self.model.transform(page_names, page_texts, self.keywords)
+            except ValueError:
+                return False
+            self.terms, self.idf = self.model.terms, self.model.idf
+        else:
+            all_content = page_texts + self.keywords
 
-        page_vectors = tfidf_matrix[:len(page_names)]     
-        keyword_vectors = tfidf_matrix[len(page_names):]  
-        
-        similarity_matrix = cosine_similarity(keyword_vectors, page_vectors)
-        df = pd.DataFrame(similarity_matrix, columns=page_names, index=self.keywords)
+            try:
+                with metrics.timer("vectorizer_fit", matrix="site", mode="full"):
+                    tfidf_matrix, self.terms, self.idf = self.docstore.tfidf(all_content)
+            except ValueError:
+                return False
+
+            page_vectors = tfidf_matrix[:len(page_names)]
+            keyword_vectors = tfidf_matrix[len(page_names):]
         
+        # Guardamos las matrices para exportaciones posteriores (matriz completa en streaming)
+        self.page_names, self.page_vectors, self.keyword_vectors = page_names, page_vectors, keyword_vectors
+        metrics.record_matrix("tfidf", page_vectors, matrix="pages")
+        metrics.record_matrix("tfidf", keyword_vectors, matrix="keywords")
+        return True
+
+    def market_interest(self):
+        # Si la keyword no tiene dato de Trends (porque vino de suggest), le damos un valor bajo por defecto
+        return np.array([self.trend_data.get(k, 10) for k in self.keywords], dtype=float)
+
+    def compute_similarity(self):
+        # Similitud por bloques: nunca materializamos la matriz densa keyword×página completa
+        with metrics.timer("similarity", workers=str(self.similarity_workers)):
+            self.similarity = chunked_similarity(
+                self.keyword_vectors, self.page_vectors, self.market_interest(),
+                top_k=self.top_k, workers=self.similarity_workers
+            )
+        return self.similarity
+
+    def top_results(self, n=50):
+        """DataFrame de las n keywords con mayor prioridad de acción (cobertura por página + metadatos)."""
+        # Ordenamos por Prioridad de Acción (Gaps Dolorosos primero) y sólo expandimos las n filas finales
+        top = top_n_indices(self.similarity.action_priority, n)
+        coverage = normalize(self.keyword_vectors[top]) @ normalize(self.page_vectors).T
+        df_top = pd.DataFrame(coverage.toarray(), columns=self.page_names, index=[self.keywords[i] for i in top])
+
         # --- AQUÍ ESTÁ LA MAGIA REAL ---
         # 1. Inyectamos el dato de Google Trends al DataFrame
-        # Si la keyword no tiene dato (porque vino de suggest), le damos un valor bajo por defecto
-        df['market_interest'] = [self.trend_data.get(k, 10) for k in df.index]
-        
+        df_top['market_interest'] = self.market_interest()[top]
         # 2. Inyectamos la Intención
-        df['intent'] = [self.classify_intent(k) for k in df.index]
-        
-        # 3. Calculamos la PRIORIDAD DE ACCIÓN (Action Priority Score)
-        # Fórmula: (Interés de Mercado) * (1 - Cobertura Actual)
+        df_top['intent'] = self.intents.classify_many(df_top.index.to_series()).to_numpy()
+        # 3. PRIORIDAD DE ACCIÓN (Action Priority Score)
         # Si el interés es alto (100) y tu cobertura es baja (0.01), la Prioridad se dispara.
-        df['max_coverage'] = df.drop(columns=['market_interest', 'intent']).max(axis=1)
-        df['action_priority'] = df['market_interest'] * (1 - df['max_coverage'])
-        
-        # Ordenamos por Prioridad de Acción (Gaps Dolorosos primero)
-        df_top = df.sort_values(by='action_priority', ascending=False).head(50)
-        
-        # Generar gráfico
-        self._generate_heatmap(df_top.drop(columns=['market_interest', 'intent', 'max_coverage', 'action_priority']))
-        
+        df_top['max_coverage'] = self.similarity.max_coverage[top]
+        df_top['action_priority'] = self.similarity.action_priority[top]
         return df_top
 
     def _generate_heatmap(self, df):
-        plt.figure(figsize=(16, 14))
-        sns.heatmap(df, annot=True, fmt=".2f", cmap="RdYlGn", cbar_kws={'label': 'Cobertura Semántica'})
-        plt.title('Mapa de Calor: Oportunidades vs Contenido')
-        plt.tight_layout()
-        plt.savefig('output/heatmap_estrategico.png')
-        plt.close()
\ No newline at end of file
+        # Se dibuja en otro proceso; el reporte sólo espera al momento de incrustar la imagen
+        self.heatmap_job = HeatmapJob(df, self.chart_path, background=self.background_render)
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def client_slug(config, path):
+    """Nombre de carpeta para un cliente: su nombre en config o el del archivo."""
+    name = config.get("client") or os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or "cliente"
+
+
+def assign_output_dirs(configs):
+    """
+    Si varios clientes comparten output_dir (p.ej. el 'output' por defecto),
+    cada uno pasa a <output_dir>/<cliente>: reportes y corridas no se pisan.
+    """
+    counts = Counter(os.path.normpath(c["output_dir"]) for _, c in configs)
+    for path, config in configs:
+        if counts[os.path.normpath(config["output_dir"])] > 1:
+            config["output_dir"] = os.path.join(config["output_dir"], client_slug(config, path))
+
+
+def prefetch_shared(configs, cache_dir, seeds_by_client, suggest_depth=1, suggest_alphabet=False):
+    """
+    Descarga una sola vez, en el proceso padre, lo que los clientes tienen en
+    común: las páginas de competencia (a la caché HTTP) y la expansión de
+    semillas en Suggest/Trends (a sus cachés). Los procesos hijos encuentran
+    todo en las cachés compartidas y sólo salen a la red por lo propio.
+    """
+    from modules.market_data import MarketData, SUGGEST_URL, SuggestCache
+    from modules.scraper import ResponseCache, SiteScraper
+    from modules.trends import TrendStore
+
+    competitor_use = Counter(url for _, c in configs for url in dict.fromkeys(c["competitors"]))
+    shared = sum(1 for n in competitor_use.values() if n > 1)
+    print(f"   [Batch] Competencia: {len(competitor_use)} URLs únicas ({shared} compartidas entre clientes)")
+    if competitor_use:
+        http_cache = ResponseCache(os.path.join(cache_dir, "http_cache.sqlite"))
+        scraper = SiteScraper("", cache=http_cache, max_bytes=max(c["max_page_bytes"] for _, c in configs))
+        failed = 0
+        try:
+            for _, status, _, error, _ in scraper.engine.iter_fetch(competitor_use):
+                failed += error is not None or status != 200
+        finally:
+            scraper.close()
+            http_cache.report("Batch")
+            http_cache.close()
+        if failed:
+            print(f"      [!] {failed} URLs de competencia fallaron; cada cliente las reintentará.")
+
+    seeds = list(dict.fromkeys(s for client_seeds in seeds_by_client for s in client_seeds))
+    seed_use = Counter(s for client_seeds in seeds_by_client for s in set(client_seeds))
+    print(f"   [Batch] Semillas: {len(seeds)} únicas ({sum(1 for n in seed_use.values() if n > 1)} compartidas)")
+    if seeds:
+        # Todos los clientes usan el mismo endpoint salvo que lo sobreescriban: el primero manda
+        suggest_url = next((c["suggest_url"] for _, c in configs if c.get("suggest_url")), SUGGEST_URL)
+        suggest_cache = SuggestCache(os.path.join(cache_dir, "suggest_cache.sqlite"))
+        market = MarketData(suggest_url=suggest_url, cache=suggest_cache,
+                            trend_store=TrendStore(os.path.join(cache_dir, "trends.sqlite")))
+        market.get_suggestions(seeds, depth=suggest_depth, alphabet=suggest_alphabet)
+        market.get_real_trends(seeds)
+        print(f"   [Cache] Suggest: {suggest_cache.hits} aciertos | {suggest_cache.misses} fallos")
+        suggest_cache.close()
+
+
+def _timed(worker, config, args):
+    """Corre en el hijo: el tiempo de un cliente que falla se mide desde que empezó, no desde que arrancó el pool."""
+    start = time.perf_counter()
+    try:
+        ok, seconds = worker(config, args)
+        return ok, seconds, None
+    except Exception as e:
+        return False, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+def run_clients(jobs, worker, workers=None):
+    """
+    Ejecuta worker(config, args) por cliente en un pool de procesos ('spawn':
+    los hijos no heredan los hilos del padre). jobs: [(nombre, config, args)].
+    Retorna [(nombre, ok, segundos, error)] en el orden de los jobs.
+    """
+    if not workers:
+        # Núcleos realmente asignados al proceso (cgroups/taskset), no los de la máquina
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    print(f"   [Batch] {len(jobs)} clientes en {workers} procesos")
+    results = {}
+    submitted = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {}
+        for i, (_, config, args) in enumerate(jobs):
+            submitted[i] = time.perf_counter()
+            futures[pool.submit(_timed, worker, config, args)] = i
+        for future in as_completed(futures):
+            i = futures[future]
+            name = jobs[i][0]
+            try:
+                results[i] = (name, *future.result())
+            except Exception as e:
+                # El hijo murió sin responder (p.ej. sin memoria): sólo queda el tiempo desde que se encoló
+                results[i] = (name, False, time.perf_counter() - submitted[i], f"{type(e).__name__}: {e}")
+            print(f"   [Batch] {name}: {'OK' if results[i][1] else 'FALLÓ'} ({results[i][2]:.1f} s)")
+    return [results[i] for i in range(len(jobs))]
+
+
+def print_summary(results, wall_seconds):
+    print("\n=================================================")
+    print("   RESUMEN DEL LOTE")
+    print("=================================================")
+    width = max([len(r[0]) for r in results] + [7])
+    print(f"   {'CLIENTE':<{width}} {'ESTADO':<7} {'TIEMPO (s)':>10}")
+    for name, ok, seconds, error in results:
+        print(f"   {name:<{width}} {'OK' if ok else 'FALLÓ':<7} {seconds:>10.1f}")
+        if error:
+            print(f"      [!] {error}")
+    failed = sum(1 for r in results if not r[1])
+    print(f"\n   {len(results) - failed}/{len(results)} clientes completados | {failed} fallos | tiempo total {wall_seconds:.1f} s")
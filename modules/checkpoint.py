@@ -0,0 +1,185 @@
+import datetime
+import json
+import os
+import zipfile
+
+import numpy as np
+
+FORMAT_VERSION = 1
+PHASES = ["expand", "scrape", "analyze", "report"]
+
+
+# --- MATRICES EN .npz MAPEABLES ---
+def save_arrays(path, **arrays):
+    """np.savez sin compresión: cada miembro queda contiguo en el zip y se puede mapear a memoria."""
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load_arrays(path, mmap=True):
+    """
+    Carga un .npz. Con mmap=True cada arreglo es un np.memmap sobre el
+    propio archivo (sin copiar a RAM); los miembros comprimidos u objetos
+    se leen de forma normal.
+    """
+    if not mmap:
+        with np.load(path, allow_pickle=False) as data:
+            return {k: data[k] for k in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as raw:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            # Cabecera local del zip: 30 bytes fijos + nombre + campo extra
+            raw.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(raw.read(4), dtype='<u2')
+            raw.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(raw)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = read_header(raw)
+            offset = raw.tell()
+            if dtype.hasobject:
+                raise ValueError(f"{path}: {name} contiene objetos Python (no mapeable)")
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)  # mmap no admite regiones vacías
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape,
+                                     order='F' if fortran else 'C', offset=offset)
+    return arrays
+
+
+def save_sparse(path, matrix):
+    matrix = matrix.tocsr()
+    save_arrays(path, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                shape=np.asarray(matrix.shape, dtype=np.int64))
+
+
+def load_sparse(path, mmap=True):
+    """CSR cuyos buffers (data/indices/indptr) apuntan al archivo mapeado."""
+    import scipy.sparse as sp
+
+    arrays = load_arrays(path, mmap=mmap)
+    shape = tuple(int(x) for x in arrays['shape'])
+    return sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape, copy=False)
+
+
+# --- DIRECTORIO DE CORRIDA ---
+class RunStore:
+    """
+    Directorio versionado de una corrida (<base>/runs/<run_id>/) con un
+    manifest.json que registra qué fases terminaron y qué artefactos
+    produjeron. Tablas en Parquet, matrices dispersas en .npz sin comprimir;
+    ambas se leen con memory-map para que las fases posteriores no copien
+    ni recalculen lo anterior.
+    """
+    def __init__(self, base_dir, run_id=None, create=False):
+        # create=True abre una corrida nueva; si no, se usa run_id o la última (runs/LATEST)
+        self.runs_dir = os.path.join(base_dir, "runs")
+        if run_id in (None, "latest"):
+            run_id = None if create else self.latest(base_dir)
+            if run_id is None and not create:
+                raise FileNotFoundError(f"No hay corridas en {self.runs_dir}")
+        if run_id is None:
+            stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            run_id, n = stamp, 1
+            while os.path.exists(os.path.join(self.runs_dir, run_id)):
+                run_id, n = f"{stamp}-{n}", n + 1
+        self.run_id = run_id
+        self.path = os.path.join(self.runs_dir, run_id)
+
+        if create:
+            os.makedirs(self.path, exist_ok=True)
+            if not os.path.exists(self._manifest_path()):
+                self.manifest = {'format_version': FORMAT_VERSION, 'run_id': run_id,
+                                 'created': datetime.datetime.now().isoformat(timespec='seconds'), 'phases': {}}
+                self._write_manifest()
+            with open(os.path.join(self.runs_dir, "LATEST"), 'w') as f:
+                f.write(run_id)
+        if not os.path.exists(self._manifest_path()):
+            raise FileNotFoundError(f"No existe la corrida {self.path}")
+        with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Corrida {run_id} con formato {self.manifest.get('format_version')} (se espera {FORMAT_VERSION})")
+
+    @staticmethod
+    def latest(base_dir):
+        pointer = os.path.join(base_dir, "runs", "LATEST")
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                return f.read().strip() or None
+        return None
+
+    @staticmethod
+    def previous(base_dir, before, phase="analyze"):
+        """Corrida más reciente anterior a `before` que terminó `phase` (None si no hay)."""
+        runs_dir = os.path.join(base_dir, "runs")
+        if not os.path.isdir(runs_dir):
+            return None
+        # Los run_id son marcas de tiempo: el orden alfabético es el cronológico
+        for run_id in sorted((r for r in os.listdir(runs_dir) if r < before), reverse=True):
+            try:
+                if RunStore(base_dir, run_id=run_id).is_done(phase):
+                    return run_id
+            except (FileNotFoundError, ValueError):
+                continue
+        return None
+
+    def _manifest_path(self):
+        return os.path.join(self.path, "manifest.json")
+
+    def _write_manifest(self):
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._manifest_path())
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    # --- ESTADO DE FASES ---
+    def is_done(self, phase):
+        return self.manifest['phases'].get(phase, {}).get('done', False)
+
+    def info(self, phase):
+        return self.manifest['phases'].get(phase, {})
+
+    def mark_done(self, phase, **info):
+        """Registra la fase como terminada e invalida las posteriores (sus artefactos quedan obsoletos)."""
+        self.manifest['phases'][phase] = {'done': True, 'at': datetime.datetime.now().isoformat(timespec='seconds'), **info}
+        for later in PHASES[PHASES.index(phase) + 1:]:
+            self.manifest['phases'].pop(later, None)
+        self._write_manifest()
+
+    def first_pending(self):
+        return next((p for p in PHASES if not self.is_done(p)), None)
+
+    # --- TABLAS (Parquet) ---
+    def write_table(self, name, df, index=False):
+        path = self.file(name)
+        df.to_parquet(path + ".tmp", index=index)
+        os.replace(path + ".tmp", path)
+
+    def read_table(self, name):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(self.file(name), memory_map=True).to_pandas()
+
+    # --- MATRICES (.npz) ---
+    def write_sparse(self, name, matrix):
+        save_sparse(self.file(name), matrix)
+
+    def read_sparse(self, name):
+        return load_sparse(self.file(name), mmap=True)
+
+    def write_arrays(self, name, **arrays):
+        save_arrays(self.file(name), **arrays)
+
+    def read_arrays(self, name):
+        return load_arrays(self.file(name), mmap=True)
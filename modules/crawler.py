@@ -0,0 +1,261 @@
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+import zlib
+from collections import deque
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+# Extensiones que nunca son páginas HTML auditables
+SKIP_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.css', '.js',
+    '.zip', '.rar', '.mp4', '.mp3', '.avi', '.mov', '.doc', '.docx', '.xls', '.xlsx',
+    '.ppt', '.pptx', '.xml', '.gz', '.json'
+)
+# El protocolo de sitemaps admite hasta 50 MB sin comprimir: mucho más que el tope de una página
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+HREF_RE = re.compile(r'''<a\s[^>]*?href\s*=\s*["']([^"'#>]+)''', re.IGNORECASE)
+
+
+def normalize_url(url):
+    """Forma canónica: esquema/host en minúsculas, sin fragmento, puerto por defecto ni parámetros de tracking."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+    if path != '/' and path.endswith('/'):
+        path = path[:-1]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in ('fbclid', 'gclid')
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class HashedUrlSet:
+    """
+    Conjunto de URLs vistas guardado como huellas de 64 bits en lugar de
+    cadenas completas. Con 10k+ URLs la memoria baja varias veces; la
+    probabilidad de colisión es despreciable para este volumen.
+    """
+    def __init__(self):
+        self._hashes = set()
+
+    @staticmethod
+    def _fingerprint(url):
+        return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def add(self, url):
+        """Agrega la URL; retorna False si ya estaba."""
+        h = self._fingerprint(url)
+        if h in self._hashes:
+            return False
+        self._hashes.add(h)
+        return True
+
+    def __contains__(self, url):
+        return self._fingerprint(url) in self._hashes
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+class SiteCrawler:
+    """
+    Rastreador BFS sobre SiteScraper: siembra desde sitemap.xml (incluye
+    índices de sitemaps) y sigue enlaces del mismo dominio, respetando
+    robots.txt, un límite de peticiones por host y un presupuesto de
+    páginas/profundidad.
+    """
+    def __init__(self, scraper, start_url, max_pages=500, max_depth=3, rate_per_host=2.0, batch_size=100, max_bytes=None,
+                 sitemap_max_bytes=SITEMAP_MAX_BYTES):
+        self.scraper = scraper
+        self.start_url = normalize_url(start_url)
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.rate_per_host = rate_per_host
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes  # Límite por página (None = el del motor)
+        self.sitemap_max_bytes = sitemap_max_bytes  # Límite por sitemap, descargado y descomprimido
+
+        parts = urlsplit(self.start_url)
+        self.root = f"{parts.scheme}://{parts.netloc}"
+        self.host = parts.netloc
+        self.robots = None
+        self.seen = HashedUrlSet()
+        self.frontier = deque()
+
+    # --- ROBOTS Y SITEMAPS ---
+    def _fetch_text(self, urls):
+        """Descarga documentos auxiliares (robots, sitemaps) en paralelo."""
+        found = {}
+        for url, status, body, error, _ in self.scraper.engine.iter_fetch(urls, accept=None, rate_per_host=self.rate_per_host):
+            if error is None and status == 200 and body:
+                found[url] = body
+        return found
+
+    def _load_robots(self):
+        robots_url = self.root + "/robots.txt"
+        self.robots = RobotFileParser(robots_url)
+        body = self._fetch_text([robots_url]).get(robots_url)
+        # Sin robots.txt accesible, todo está permitido
+        self.robots.parse(body.splitlines() if body else [])
+
+        delay = self.robots.crawl_delay(self.scraper.headers['User-Agent'])
+        if delay:
+            self.rate_per_host = min(self.rate_per_host or float('inf'), 1.0 / float(delay))
+        return self.robots.site_maps() or []
+
+    def _allowed(self, url):
+        return self.robots is None or self.robots.can_fetch(self.scraper.headers['User-Agent'], url)
+
+    def _fetch_sitemaps(self, urls):
+        """
+        Descarga sitemaps en bytes con su propio tope y descomprime los .gz
+        (por extensión o por la firma gzip). Retorna {url: (xml, truncado)}.
+        """
+        found = {}
+        for url, status, body, error, truncated in self.scraper.engine.iter_fetch(
+                urls, accept=None, max_bytes=self.sitemap_max_bytes, rate_per_host=self.rate_per_host, raw=True):
+            if error is not None or status != 200 or not body:
+                print(f"      [!] Sitemap no disponible: {url} ({error or status})")
+                continue
+            if urlsplit(url).path.lower().endswith('.gz') or body[:2] == GZIP_MAGIC:
+                # Descompresión acotada: un .gz pequeño no puede inflarse más allá del tope
+                inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                try:
+                    body = inflater.decompress(body, self.sitemap_max_bytes)
+                except zlib.error:
+                    if body[:2] == GZIP_MAGIC:
+                        print(f"      [!] Sitemap gzip corrupto: {url}")
+                        continue
+                    # .gz ya descomprimido por el servidor (Content-Encoding): se usa tal cual
+                else:
+                    truncated = truncated or bool(inflater.unconsumed_tail)
+            found[url] = (body, truncated)
+        return found
+
+    @staticmethod
+    def _parse_sitemap(body):
+        """
+        (es_indice, locs, completo) de un sitemap. Se parsea de forma
+        incremental: si el XML se corta (p.ej. por el tope) se conservan los
+        <loc> completos hasta ahí y completo es False. None si no hay XML.
+        """
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        root_tag, locs, complete = None, [], True
+        try:
+            parser.feed(body)
+            parser.close()
+        except ET.ParseError:
+            complete = False
+        try:
+            # El error de sintaxis queda en la cola de eventos: se leen los anteriores a él
+            for event, element in parser.read_events():
+                if event == 'start':
+                    root_tag = root_tag or element.tag
+                elif element.tag.endswith('loc') and element.text:
+                    locs.append(element.text.strip())
+        except ET.ParseError:
+            complete = False
+        if root_tag is None:
+            return None
+        return root_tag.endswith('sitemapindex'), locs, complete
+
+    def _sitemap_urls(self, sitemap_urls):
+        """Recorre sitemaps e índices de sitemaps y retorna las URLs de página encontradas."""
+        pages = []
+        pending = list(dict.fromkeys(sitemap_urls))
+        visited = set()
+        while pending and len(pages) < self.max_pages:
+            batch = [u for u in pending if u not in visited]
+            visited.update(batch)
+            pending = []
+            for url, (body, truncated) in self._fetch_sitemaps(batch).items():
+                parsed = self._parse_sitemap(body)
+                if parsed is None or not (parsed[2] or truncated):
+                    print(f"      [!] Sitemap inválido: {url}")
+                    continue
+                is_index, locs, _ = parsed
+                if truncated:
+                    print(f"      [!] Sitemap {url} supera {self.sitemap_max_bytes} bytes: se usan sus primeras {len(locs)} URLs")
+                if is_index:
+                    pending.extend(locs)
+                else:
+                    pages.extend(locs)
+        return pages
+
+    # --- FRONTERA ---
+    def _in_scope(self, url):
+        parts = urlsplit(url)
+        return (
+            parts.scheme in ('http', 'https')
+            and parts.netloc == self.host
+            and not parts.path.lower().endswith(SKIP_EXTENSIONS)
+        )
+
+    def _enqueue(self, url, depth):
+        url = normalize_url(url)
+        if depth > self.max_depth or not self._in_scope(url):
+            return
+        if self.seen.add(url) and self._allowed(url):
+            self.frontier.append((url, depth))
+
+    def extract_links(self, base_url, html):
+        """Enlaces absolutos presentes en el HTML (antes de limpiar menús, que son la mejor fuente de enlaces)."""
+        return [urljoin(base_url, href) for href in HREF_RE.findall(html)]
+
+    def _page_name(self, url):
+        parts = urlsplit(url)
+        return parts.path + (f"?{parts.query}" if parts.query else "")
+
+    def crawl(self):
+        """
+        Ejecuta el rastreo y retorna {nombre_pagina: datos}, con los datos que
+        extrae SiteScraper.parse (título, h1/h2, meta, content_sample...) más
+        'url' y 'truncated', igual que en el modo de URLs fijas.
+        """
+        print(f"   [Crawler] Rastreando {self.root} (máx. {self.max_pages} páginas, profundidad {self.max_depth})")
+        sitemaps = self._load_robots() or [self.root + "/sitemap.xml"]
+        return self._crawl_frontier(sitemaps)
+
+    def _crawl_frontier(self, sitemaps):
+        """Bucle BFS por lotes sobre la frontera deduplicada."""
+        self._enqueue(self.start_url, 0)
+        seeded = self._sitemap_urls(sitemaps)
+        for url in seeded:
+            self._enqueue(url, 0)
+        print(f"   [Crawler] Sitemap aportó {len(seeded)} URLs. robots.txt respetado.")
+
+        corpus = {}
+        fetched = 0
+        while self.frontier and fetched < self.max_pages:
+            # Procesamos un lote de la frontera (mismo nivel BFS primero, por orden de la cola)
+            take = min(self.batch_size, self.max_pages - fetched, len(self.frontier))
+            batch = [self.frontier.popleft() for _ in range(take)]
+            depths = dict(batch)
+            fetched += len(batch)
+
+            for url, status, html, error, truncated in self.scraper.engine.iter_fetch(depths, max_bytes=self.max_bytes,
+                                                                                      rate_per_host=self.rate_per_host):
+                if error is not None or status != 200 or not html:
+                    continue
+                depth = depths[url]
+                if depth < self.max_depth:
+                    for link in self.extract_links(url, html):
+                        self._enqueue(link, depth + 1)
+                try:
+                    data = self.scraper.parse(html)
+                except Exception as e:
+                    print(f"      [!] Falló el parsing de {url}: {e}")
+                    continue
+                if data.get('content_sample') and len(data['content_sample']) > 50:
+                    data['url'], data['truncated'] = url, truncated
+                    corpus[self._page_name(url)] = data
+
+            print(f"   [Crawler] {fetched} páginas visitadas | {len(corpus)} con contenido | frontera: {len(self.frontier)}")
+
+        return corpus
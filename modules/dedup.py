@@ -0,0 +1,191 @@
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from modules.docstore import content_hash
+from modules.intent import fold_accents
+
+MERSENNE_PRIME = (1 << 31) - 1  # a*x + b cabe en 64 bits con x, a < 2^31
+TOKEN_RE = re.compile(r"\w+")
+COLUMNS = ['cluster', 'pages', 'size', 'max_similarity', 'mean_similarity', 'recommendation']
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]  # Compresión de camino a la mitad
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def lsh_params(num_perm, threshold):
+    """(bandas, filas) con b*r == num_perm cuyo umbral (1/b)^(1/r) queda más cerca del pedido."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - threshold))
+
+
+class CannibalizationDetector:
+    """
+    Detección de páginas casi duplicadas (canibalización) en tiempo ~lineal:
+    cada página se reduce a su conjunto de k-shingles de palabras, luego a
+    una firma MinHash de num_perm valores; el banding LSH agrupa las firmas
+    en cubetas y sólo las páginas que comparten alguna cubeta se comparan
+    con el Jaccard exacto de sus shingles. Los pares que superan el umbral
+    se unen en clusters (union-find).
+
+    Las firmas dependen sólo del texto: detect() acepta las de una corrida
+    anterior por hash de contenido y sólo firma las páginas nuevas o
+    modificadas (los shingles se calculan únicamente para los candidatos).
+    """
+    def __init__(self, k=3, num_perm=128, threshold=0.4, seed=1):
+        self.k = k
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.seed = seed
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.n_candidates = 0
+        self.n_signed = 0
+        self.pairs = []
+        self.signatures = {}  # {hash de contenido: firma} de la última detección
+
+    def shingles(self, text):
+        """Hashes (ordenados, únicos) de los k-shingles de palabras del texto."""
+        tokens = TOKEN_RE.findall(fold_accents(text))
+        if len(tokens) < self.k:
+            return np.zeros(0, dtype=np.uint64)
+        token_ids = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens))
+        # Huella del shingle: combinación polinómica de los k tokens (aritmética uint64 con desborde)
+        h = np.zeros(len(tokens) - self.k + 1, dtype=np.uint64)
+        for j in range(self.k):
+            h = h * np.uint64(1_000_003) + token_ids[j:len(tokens) - self.k + 1 + j]
+        return np.unique(h % np.uint64(MERSENNE_PRIME))
+
+    def signature(self, shingle_set, chunk=4096):
+        """Firma MinHash: mínimo de (a*x + b) mod p por permutación."""
+        sig = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(shingle_set), chunk):
+            x = shingle_set[start:start + chunk]
+            hashed = (self._a[:, None] * x[None, :] + self._b[:, None]) % np.uint64(MERSENNE_PRIME)
+            np.minimum(sig, hashed.min(axis=1), out=sig)
+        return sig
+
+    @staticmethod
+    def jaccard(a, b):
+        if not len(a) or not len(b):
+            return 0.0
+        inter = len(np.intersect1d(a, b, assume_unique=True))
+        return inter / (len(a) + len(b) - inter)
+
+    def candidates(self, signatures):
+        """Pares (i, j) que coinciden en al menos una banda."""
+        pairs = set()
+        for band in range(self.bands):
+            buckets = {}
+            lo, hi = band * self.rows, (band + 1) * self.rows
+            for i, sig in enumerate(signatures):
+                if sig is not None:
+                    buckets.setdefault(sig[lo:hi].tobytes(), []).append(i)
+            for members in buckets.values():
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        pairs.add((members[x], members[y]))
+        return pairs
+
+    def detect(self, corpus, signatures=None):
+        """
+        corpus: {página: texto}; signatures: {hash de contenido: firma} ya
+        calculadas (ver signature_arrays). Retorna un DataFrame con un
+        cluster por fila (páginas, tamaño, similitud máxima y media de sus
+        pares, recomendación), ordenado por similitud máxima.
+        """
+        names = list(corpus.keys())
+        texts = list(corpus.values())
+        hashes = [content_hash(text) for text in texts]
+        known = signatures or {}
+        cache = {}
+
+        def shingle_set(i):
+            if i not in cache:
+                cache[i] = self.shingles(texts[i])
+            return cache[i]
+
+        signature_list = []
+        for i, key in enumerate(hashes):
+            sig = known.get(key)
+            if sig is None:
+                shingle_hashes = shingle_set(i)
+                sig = self.signature(shingle_hashes) if len(shingle_hashes) else None
+            signature_list.append(sig)
+        self.n_signed = len(cache)
+        self.signatures = {key: sig for key, sig in zip(hashes, signature_list) if sig is not None}
+        candidates = self.candidates(signature_list)
+        self.n_candidates = len(candidates)
+
+        # Verificación exacta sólo de los candidatos
+        self.pairs = []
+        for i, j in sorted(candidates):
+            score = self.jaccard(shingle_set(i), shingle_set(j))
+            if score >= self.threshold:
+                self.pairs.append((names[i], names[j], score))
+        uf = _UnionFind(len(names))
+        index = {name: i for i, name in enumerate(names)}
+        for a, b, _ in self.pairs:
+            uf.union(index[a], index[b])
+
+        groups = {}
+        for a, b, score in self.pairs:
+            groups.setdefault(uf.find(index[a]), []).append((a, b, score))
+        rows = []
+        for root, edges in groups.items():
+            members = sorted({p for a, b, _ in edges for p in (a, b)}, key=index.get)
+            scores = [s for _, _, s in edges]
+            rows.append({
+                'pages': members,
+                'size': len(members),
+                'max_similarity': max(scores),
+                'mean_similarity': float(np.mean(scores)),
+                'recommendation': self.recommendation(max(scores)),
+            })
+        result = pd.DataFrame(rows, columns=COLUMNS[1:])
+        if len(result):
+            result = result.sort_values(['max_similarity', 'size'], ascending=False, kind='stable').reset_index(drop=True)
+        result.insert(0, 'cluster', np.arange(1, len(result) + 1))
+        result.attrs['n_pages'] = len(names)
+        result.attrs['n_candidates'] = self.n_candidates
+        result.attrs['n_pairs'] = len(self.pairs)
+        return result
+
+    def signature_arrays(self):
+        """Firmas de la última detección como arreglos, para guardarlas en la corrida."""
+        return {
+            'hashes': np.array(list(self.signatures), dtype='S40'),
+            'signatures': np.array(list(self.signatures.values()), dtype=np.uint64).reshape(-1, self.num_perm),
+            'params': np.array([self.k, self.num_perm, self.seed]),
+        }
+
+    def signatures_from_arrays(self, arrays):
+        """Inverso de signature_arrays; {} si se calcularon con otros k, num_perm o semilla."""
+        if [int(v) for v in arrays['params']] != [self.k, self.num_perm, self.seed]:
+            return {}
+        return {key.decode('ascii'): sig for key, sig in zip(arrays['hashes'], arrays['signatures'])}
+
+    @staticmethod
+    def recommendation(similarity):
+        if similarity >= 0.9:
+            return "Duplicado: canonical o redirección 301"
+        if similarity >= 0.6:
+            return "Fusionar en una sola página"
+        return "Diferenciar enfoque y keywords"
@@ -0,0 +1,267 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from modules import metrics
+from modules.docstore import content_hash
+from modules.similarity import SimilarityResult, chunked_similarity
+
+# Columnas extra de los vectores: masa de n-gramas fuera del espacio congelado, de keywords en la primera
+# y de páginas en la segunda. No suman al producto keyword×página pero sí a la norma, así la cobertura no
+# se infla aunque similarity/top_results vuelvan a normalizar las filas.
+RESIDUAL_COLUMNS = 2
+MOVED_COLUMNS = [
+    'keyword', 'status', 'coverage_before', 'coverage_after', 'coverage_change',
+    'priority_before', 'priority_after', 'priority_change', 'best_page_before', 'best_page_after',
+]
+
+
+class DeltaAudit:
+    """
+    Análisis de matriz incremental contra una corrida anterior ya analizada.
+
+    Las páginas se comparan por hash de contenido y las keywords por
+    conjunto. Sólo se vectorizan las páginas nuevas/modificadas y las
+    keywords nuevas, en el espacio TF-IDF guardado de la corrida anterior
+    (vocabulario + IDF congelados, como el modelo incremental), y sólo se
+    calculan sus filas y columnas de similitud:
+
+    - columnas: todas las keywords contra las páginas cambiadas;
+    - filas: keywords nuevas contra todas las páginas.
+
+    Eso se fusiona con el top-k guardado por keyword. Si una página
+    cambiada o eliminada estaba en el top-k guardado de una keyword y lo que
+    queda no alcanza para certificar su nuevo top-k (una página intacta
+    fuera del top guardado podría haber subido), esa fila se recalcula
+    completa. El resultado es el mismo que un análisis completo en el
+    espacio congelado.
+
+    Como el IDF no se reajusta, los cambios acumulados desde el último
+    ajuste completo y los n-gramas nuevos fuera del vocabulario (ponderados
+    por la fracción del sitio que cambió) cuentan como deriva: sobre
+    drift_threshold, apply() no hace nada y el analizador hace el ajuste
+    completo.
+    """
+    def __init__(self, previous, signature, drift_threshold=0.2):
+        self.previous = previous  # RunStore de la corrida de referencia
+        self.signature = signature  # Del AnalyzedDocStore: el espacio sólo sirve con el mismo análisis
+        self.drift_threshold = drift_threshold
+        self.applied = False
+        self.info = {'delta_from': previous.run_id}
+        self._summary = None
+
+    def _load(self):
+        try:
+            space = self.previous.read_arrays("tfidf_space.npz")
+        except FileNotFoundError:
+            return "la corrida anterior no guardó su espacio TF-IDF (¿--model-dir con --hashing?)"
+        if str(space['signature'][0]) != self.signature:
+            return "la corrida anterior usó otras stop words o n-gramas"
+        self.terms, self.idf = space['terms'], space['idf']
+        return None
+
+    def summary(self):
+        """Resumen de similitud guardado de la corrida anterior (keywords, páginas, cobertura, prioridad, top-k)."""
+        if self._summary is None:
+            self._summary = self.previous.read_arrays("similarity.npz")
+        return self._summary
+
+    def apply(self, analyzer):
+        """
+        Deja en el analizador page_names, page_vectors, keyword_vectors,
+        similarity, terms e idf como si hubiera hecho vectorize() +
+        compute_similarity(). Retorna False si hay que hacer el análisis
+        completo (sin datos previos utilizables o deriva sobre el umbral).
+        """
+        reason = self._load()
+        if reason is not None:
+            print(f"   [Delta] {reason.capitalize()}: análisis completo.")
+            return False
+        summary = self.summary()
+        previous_info = self.previous.info("analyze")
+        old_pages = [str(p) for p in summary['page_names']]
+        old_keywords = [str(k) for k in summary['keywords']]
+        old_page_index = {name: i for i, name in enumerate(old_pages)}
+        old_keyword_index = {kw: i for i, kw in enumerate(old_keywords)}
+        pages = self.previous.read_table("pages.parquet")
+        site = pages[pages["kind"] == "site"]
+        old_hashes = dict(zip(site["name"], site["content_hash"]))
+
+        page_names = list(analyzer.corpus.keys())
+        page_texts = list(analyzer.corpus.values())
+        keywords = list(analyzer.keywords)
+        if not page_texts or not keywords:
+            return False
+        changed = [i for i, (name, text) in enumerate(zip(page_names, page_texts))
+                   if name not in old_page_index or old_hashes.get(name) != content_hash(text)]
+        new_keywords = [i for i, kw in enumerate(keywords) if kw not in old_keyword_index]
+        removed_pages = len(set(old_pages) - set(page_names))
+        removed_keywords = len(set(old_keywords) - set(keywords))
+
+        # Deriva acumulada desde el último ajuste completo del espacio
+        fit_docs = previous_info.get("fit_docs") or len(old_pages) + len(old_keywords)
+        changes = previous_info.get("delta_changes", 0) + len(changed) + len(new_keywords) + removed_pages + removed_keywords
+        with metrics.timer("delta_vectorize"):
+            fresh_pages, page_residual, page_oov = analyzer.docstore.transform([page_texts[i] for i in changed], self.terms, self.idf)
+            fresh_keywords, keyword_residual, _ = analyzer.docstore.transform([keywords[i] for i in new_keywords], self.terms, self.idf)
+        # Los n-gramas nuevos de una keyword nueva no están en ninguna página intacta: sólo cuenta el vocabulario
+        # nuevo de las páginas, que es el que un reajuste podría hacer coincidir con las keywords. La fracción
+        # desconocida de las páginas cambiadas se pondera por su peso en el sitio (aprox. la del corpus entero)
+        drift_terms = {
+            'cambios acumulados': changes / max(fit_docs, 1),
+            'vocabulario nuevo': page_oov * len(changed) / len(page_texts),
+        }
+        cause, drift = max(drift_terms.items(), key=lambda item: item[1])
+        print(f"   [Delta] vs corrida {self.previous.run_id}: {len(changed)} páginas nuevas/cambiadas, {removed_pages} eliminadas | "
+              f"{len(new_keywords)} keywords nuevas, {removed_keywords} eliminadas | deriva {drift:.2f} "
+              f"({', '.join(f'{name} {value:.2f}' for name, value in drift_terms.items())})")
+        if drift > self.drift_threshold:
+            print(f"   [Delta] Deriva por {cause} sobre el umbral ({self.drift_threshold}): reajuste completo del TF-IDF.")
+            return False
+
+        # Vectores: filas guardadas para lo intacto, las recién transformadas para lo demás
+        changed_set = set(changed)
+        old_page_rows = np.array([-1 if i in changed_set else old_page_index[name] for i, name in enumerate(page_names)])
+        old_keyword_rows = np.array([old_keyword_index.get(kw, -1) for kw in keywords])
+        fresh_pages = self._widen(fresh_pages, page_residual, 1)
+        page_vectors = self._assemble(self._widen(self.previous.read_sparse("tfidf_pages.npz")), old_page_rows, fresh_pages, changed)
+        keyword_vectors = self._assemble(self._widen(self.previous.read_sparse("tfidf_keywords.npz")), old_keyword_rows,
+                                         self._widen(fresh_keywords, keyword_residual, 0), new_keywords)
+
+        interest = analyzer.market_interest()
+        with metrics.timer("similarity", workers=str(analyzer.similarity_workers), mode="delta"):
+            top_pages, top_scores, repaired = self._merge(
+                summary, old_pages, page_names, changed, old_keyword_rows, keyword_vectors, page_vectors,
+                fresh_pages, analyzer.top_k, analyzer.similarity_workers
+            )
+        max_coverage = top_scores[:, 0] if top_scores.shape[1] else np.zeros(len(keywords))
+        analyzer.page_names, analyzer.page_vectors, analyzer.keyword_vectors = page_names, page_vectors, keyword_vectors
+        analyzer.similarity = SimilarityResult(max_coverage, interest * (1 - max_coverage), top_pages, top_scores)
+        analyzer.terms, analyzer.idf = self.terms, self.idf
+        metrics.record_matrix("tfidf", page_vectors, matrix="pages")
+        metrics.record_matrix("tfidf", keyword_vectors, matrix="keywords")
+        metrics.gauge("delta_changed_pages", len(changed))
+        metrics.gauge("delta_new_keywords", len(new_keywords))
+        metrics.gauge("delta_repaired_rows", repaired)
+        print(f"   [Delta] Similitud: {len(changed)} columnas y {len(new_keywords) + repaired} filas recalculadas "
+              f"({repaired} por cambios en su top-{analyzer.top_k}) de {len(keywords)}×{len(page_names)}")
+        self.applied = True
+        self.info.update(fit_docs=fit_docs, delta_changes=changes)
+        return True
+
+    def _widen(self, matrix, residual=None, column=0):
+        """Lleva la matriz al ancho términos + RESIDUAL_COLUMNS (las de un ajuste completo no las traen)."""
+        matrix = sp.csr_matrix(matrix)
+        width = len(self.terms) + RESIDUAL_COLUMNS
+        if matrix.shape[1] == width:
+            return matrix
+        matrix = sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], width))
+        if residual is not None and residual.any():
+            rows = np.flatnonzero(residual)
+            matrix = matrix + sp.csr_matrix((residual[rows], (rows, np.full(len(rows), len(self.terms) + column))),
+                                            shape=matrix.shape)
+        return matrix
+
+    @staticmethod
+    def _assemble(stored, stored_rows, fresh, fresh_positions):
+        """Matriz final en el orden pedido: stored_rows[i] >= 0 toma la fila guardada, si no la de fresh."""
+        fresh_at = np.full(len(stored_rows), -1)
+        fresh_at[fresh_positions] = np.arange(len(fresh_positions))
+        combined = sp.vstack([stored, fresh], format='csr')
+        return combined[np.where(stored_rows >= 0, stored_rows, stored.shape[0] + fresh_at)]
+
+    @staticmethod
+    def _merge(summary, old_pages, page_names, changed, old_keyword_rows, keyword_vectors, page_vectors,
+               fresh_pages, top_k, workers):
+        """Top-k por keyword: el guardado (sin las páginas cambiadas/eliminadas) fusionado con las columnas nuevas."""
+        n_keywords, n_pages = len(old_keyword_rows), len(page_names)
+        k = min(top_k, n_pages)
+        new_index = {name: i for i, name in enumerate(page_names)}
+        changed_set = set(changed)
+        # Página guardada -> índice nuevo (-1 si se eliminó o cambió: su score guardado ya no vale)
+        remap = np.array([-1 if new_index.get(name, -1) in changed_set else new_index.get(name, -1) for name in old_pages])
+
+        kept = old_keyword_rows >= 0
+        stored_k = summary['top_pages'].shape[1]
+        stored_pages = np.full((n_keywords, stored_k), -1, dtype=np.int64)
+        stored_scores = np.full((n_keywords, stored_k), -np.inf)
+        stored_pages[kept] = remap[np.asarray(summary['top_pages'])[old_keyword_rows[kept]]]
+        stored_scores[kept] = np.asarray(summary['top_scores'])[old_keyword_rows[kept]]
+        invalid = stored_pages < 0
+        stored_scores[invalid] = -np.inf
+
+        # Columnas: todas las keywords contra las páginas cambiadas
+        if len(changed):
+            columns = chunked_similarity(keyword_vectors, fresh_pages, np.zeros(n_keywords), top_k=top_k, workers=workers)
+            fresh_top = np.asarray(changed)[columns.top_pages]
+            fresh_scores = columns.top_scores
+        else:
+            fresh_top = np.zeros((n_keywords, 0), dtype=np.int64)
+            fresh_scores = np.zeros((n_keywords, 0))
+        candidates = np.hstack([stored_pages, fresh_top])
+        scores = np.hstack([stored_scores, fresh_scores])
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        top_pages = np.take_along_axis(candidates, order, axis=1)
+        top_scores = np.take_along_axis(scores, order, axis=1)
+
+        # Filas a recalcular: keywords nuevas y aquellas cuyo top guardado perdió páginas y estaba lleno
+        # (una página intacta por debajo del k-ésimo guardado podría entrar); lo que supera ese k-ésimo es seguro
+        full = stored_k >= top_k and len(old_pages) > stored_k
+        uncertain = np.zeros(n_keywords, dtype=bool)
+        if full and k:
+            threshold = np.asarray(summary['top_scores'])[old_keyword_rows[kept], -1]
+            certain = (top_scores[kept] >= threshold[:, None]).sum(axis=1)
+            uncertain[kept] = invalid[kept].any(axis=1) & (certain < k)
+        rows = np.flatnonzero(~kept | uncertain)
+        if len(rows):
+            recomputed = chunked_similarity(keyword_vectors[rows], page_vectors, np.zeros(len(rows)), top_k=top_k, workers=workers)
+            top_pages[rows], top_scores[rows] = recomputed.top_pages, recomputed.top_scores
+        return top_pages, top_scores, int(uncertain.sum())
+
+    def moved(self, analyzer, min_change=1e-6):
+        """
+        Qué se movió frente a la corrida anterior, una fila por keyword con
+        cambios: cobertura y prioridad antes/después, mejor página antes/
+        después y estado (cambio, nueva o eliminada). Ordenado por estado y
+        magnitud del cambio de prioridad.
+        """
+        summary = self.summary()
+        old_keywords = [str(k) for k in summary['keywords']]
+        old_pages = np.asarray([str(p) for p in summary['page_names']] + [None], dtype=object)
+        new_pages = np.asarray(list(analyzer.page_names) + [None], dtype=object)
+
+        def best(top_pages):
+            return np.asarray(top_pages)[:, 0] if np.asarray(top_pages).shape[1] else np.full(len(top_pages), -1)
+
+        before = pd.DataFrame({
+            'keyword': old_keywords,
+            'coverage_before': np.asarray(summary['max_coverage'], dtype=float),
+            'priority_before': np.asarray(summary['action_priority'], dtype=float),
+            'best_page_before': old_pages[best(summary['top_pages'])],
+        })
+        similarity = analyzer.similarity
+        after = pd.DataFrame({
+            'keyword': list(analyzer.keywords),
+            'coverage_after': similarity.max_coverage,
+            'priority_after': similarity.action_priority,
+            'best_page_after': new_pages[best(similarity.top_pages)],
+        })
+        result = before.merge(after, on='keyword', how='outer', indicator=True)
+        result[['best_page_before', 'best_page_after']] = result[['best_page_before', 'best_page_after']].fillna('')
+        result['status'] = result['_merge'].map({'left_only': 'eliminada', 'right_only': 'nueva', 'both': 'cambio'}).astype(str)
+        result['coverage_change'] = result['coverage_after'].fillna(0) - result['coverage_before'].fillna(0)
+        result['priority_change'] = result['priority_after'].fillna(0) - result['priority_before'].fillna(0)
+        moved = (
+            (result['status'] != 'cambio')
+            | (result['coverage_change'].abs() > min_change)
+            | (result['priority_change'].abs() > min_change)
+            | (result['best_page_before'] != result['best_page_after'])
+        )
+        result = result[moved]
+        # Primero lo que se movió en keywords existentes; luego nuevas y eliminadas, cada grupo por magnitud
+        group = result['status'].map({'cambio': 0, 'nueva': 1, 'eliminada': 2}).to_numpy()
+        result = result.iloc[np.lexsort((-result['priority_change'].abs().to_numpy(), group))].reset_index(drop=True)
+        counts = result['status'].value_counts()
+        print(f"   [Delta] Qué se movió: {counts.get('cambio', 0)} keywords con cambios, "
+              f"{counts.get('nueva', 0)} nuevas, {counts.get('eliminada', 0)} eliminadas")
+        return result[MOVED_COLUMNS]
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+
+from modules import metrics
+from modules.checkpoint import load_arrays, save_arrays
+
+FORMAT_VERSION = 1
+EXTRACTED_COLUMNS = ['hash', 'title', 'h1', 'h2', 'meta_desc', 'content_sample', 'word_count']
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class AnalyzedDocStore:
+    """
+    Documentos ya analizados, indexados por hash de contenido: un texto se
+    tokeniza, filtra y expande a n-gramas una sola vez en su vida. Cada
+    documento se guarda como dos arreglos int32 (ids de n-grama ordenados
+    contra un vocabulario compartido y sus conteos); las matrices TF-IDF de
+    páginas, keywords y competencia se arman desde ahí.
+
+    Con path, el estado persiste entre corridas: docs-<firma>.npz sin
+    comprimir (se mapea a memoria, los documentos viejos no ocupan RAM hasta
+    que se usan) y vocab-<firma>.json. La firma resume stop words y n-gramas:
+    clientes con distintas stop words de marca comparten la carpeta sin
+    pisarse los análisis. Se conservan a lo sumo max_docs documentos, desalojando
+    los usados hace más tiempo (LRU).
+
+    También memoriza la extracción de HTML (texto limpio y metadatos) por
+    hash del documento: una página que no cambió no se vuelve a parsear.
+
+    Seguro entre hilos (el servicio lo comparte entre la auditoría en curso y
+    los re-análisis de página): los ids sólo son válidos dentro de una misma
+    llamada, porque save() compacta y renumera el vocabulario.
+    """
+    def __init__(self, path=None, stop_words=None, ngram_range=(1, 3), max_docs=200_000, max_extracted=50_000):
+        self.path = path
+        self.ngram_range = tuple(ngram_range)
+        self.max_docs = max_docs
+        self.max_extracted = max_extracted
+        self.analyzer = TfidfVectorizer(stop_words=stop_words, ngram_range=self.ngram_range).build_analyzer()
+        # Si cambian las stop words o el rango de n-gramas, lo guardado no sirve
+        self.signature = content_hash(json.dumps([FORMAT_VERSION, sorted(stop_words or []), self.ngram_range]))[:16]
+        self.terms = []
+        self.vocabulary = {}
+        self.hits = 0
+        self.misses = 0
+        self.extract_hits = 0
+        self.extract_misses = 0
+        self._docs = OrderedDict()
+        self._extracted = OrderedDict()
+        self._docs_loaded = self._extracted_loaded = path is None
+        self._docs_dirty = self._extracted_dirty = False
+        self._lock = threading.RLock()
+
+    # --- PERSISTENCIA ---
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _analyzed_file(self, name, ext):
+        return self._file(f"{name}-{self.signature}.{ext}")
+
+    def _load_docs(self):
+        self._docs_loaded = True
+        vocab_path, docs_path = self._analyzed_file("vocab", "json"), self._analyzed_file("docs", "npz")
+        if not (os.path.exists(vocab_path) and os.path.exists(docs_path)):
+            return
+        with open(vocab_path, 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        arrays = load_arrays(docs_path, mmap=True)
+        if vocab.get('signature') != self.signature or int(arrays['generation'][0]) != vocab.get('generation'):
+            print("   [DocStore] Análisis guardado con otra configuración: se descarta.")
+            return
+        self.terms = vocab['terms']
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        offsets, ids, counts = arrays['offsets'], arrays['ids'], arrays['counts']
+        # Rebanadas del memmap: sin copias; el orden del archivo es el orden LRU
+        for i, key in enumerate(arrays['hashes']):
+            start, end = offsets[i], offsets[i + 1]
+            self._docs[key.decode('ascii')] = (ids[start:end], counts[start:end])
+
+    def _load_extracted(self):
+        self._extracted_loaded = True
+        path = self._file("extracted.parquet")
+        if not os.path.exists(path):
+            return
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, memory_map=True).to_pandas()
+        for row in table.itertuples(index=False):
+            self._extracted[row.hash] = {
+                'title': row.title, 'h1': list(row.h1), 'h2': list(row.h2), 'meta_desc': row.meta_desc,
+                'content_sample': row.content_sample, 'word_count': int(row.word_count),
+            }
+
+    def save(self):
+        """Persiste lo que cambió (análisis y/o extracciones). Sin path no hace nada."""
+        if self.path is None:
+            return
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            if self._docs_dirty:
+                self._save_docs()
+            if self._extracted_dirty:
+                self._save_extracted()
+
+    def _save_docs(self):
+        keys = list(self._docs)
+        docs = [self._docs[k] for k in keys]
+        lengths = np.fromiter((len(ids) for ids, _ in docs), dtype=np.int64, count=len(docs))
+        ids = np.concatenate([d[0] for d in docs]) if docs else np.zeros(0, dtype=np.int32)
+        counts = np.concatenate([d[1] for d in docs]) if docs else np.zeros(0, dtype=np.int32)
+        # Compactación: el vocabulario guardado sólo conserva los n-gramas en uso (los ids se renumeran
+        # respetando el orden, así cada documento sigue ordenado)
+        used, ids = np.unique(ids, return_inverse=True)
+        terms = [self.terms[i] for i in used]
+        # Token aleatorio y no un contador: dos procesos del lote que guarden a la vez no pueden dejar
+        # un vocab.json y un docs.npz de escrituras distintas que parezcan coincidir
+        generation = int.from_bytes(os.urandom(7), 'little')
+        save_arrays(
+            self._analyzed_file("docs", "npz"), hashes=np.array(keys, dtype='S40'), offsets=np.concatenate([[0], np.cumsum(lengths)]),
+            ids=ids.astype(np.int32), counts=counts.astype(np.int32), generation=np.array([generation]),
+        )
+        tmp = self._analyzed_file("vocab", "json.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'signature': self.signature, 'generation': generation, 'terms': terms}, f, ensure_ascii=False)
+        os.replace(tmp, self._analyzed_file("vocab", "json"))
+        # Reabrimos desde el archivo: lo recién analizado deja la RAM y queda mapeado
+        self._docs = OrderedDict()
+        self._load_docs()
+        self._docs_dirty = False
+        print(f"   [DocStore] {len(keys)} documentos analizados | vocabulario {len(terms)} n-gramas")
+
+    def _save_extracted(self):
+        import pandas as pd
+
+        frame = pd.DataFrame([{'hash': key, **data} for key, data in self._extracted.items()], columns=EXTRACTED_COLUMNS)
+        tmp = self._file("extracted.parquet.tmp")
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, self._file("extracted.parquet"))
+        self._extracted_dirty = False
+
+    # --- ANÁLISIS ---
+    def _term_id(self, term):
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def analyze(self, text):
+        """(ids, conteos) de los n-gramas del texto; sólo se calcula si el contenido es nuevo."""
+        with self._lock:
+            if not self._docs_loaded:
+                self._load_docs()
+            key = content_hash(text)
+            doc = self._docs.get(key)
+            if doc is not None:
+                self._docs.move_to_end(key)
+                self.hits += 1
+                return doc
+            self.misses += 1
+            grams = Counter(self.analyzer(text))
+            ids = np.fromiter((self._term_id(g) for g in grams), dtype=np.int32, count=len(grams))
+            counts = np.fromiter(grams.values(), dtype=np.int32, count=len(grams))
+            order = np.argsort(ids)
+            doc = (ids[order], counts[order])
+            self._docs[key] = doc
+            self._docs_dirty = True
+            while len(self._docs) > self.max_docs:
+                self._docs.popitem(last=False)
+            return doc
+
+    def count_matrix(self, texts):
+        """Conteos (documentos × vocabulario compartido) en CSR."""
+        with self._lock:
+            docs = [self.analyze(text) for text in texts]
+            n_terms = len(self.terms)
+        indptr = np.concatenate([[0], np.cumsum([len(ids) for ids, _ in docs])]).astype(np.int64)
+        indices = np.concatenate([ids for ids, _ in docs]) if docs else np.zeros(0, dtype=np.int32)
+        data = np.concatenate([counts for _, counts in docs]) if docs else np.zeros(0, dtype=np.int32)
+        return sp.csr_matrix((data, indices, indptr), shape=(len(docs), n_terms))
+
+    def term_counts(self, texts):
+        """
+        Conteos (documentos × n-gramas presentes) con las columnas en orden
+        alfabético, como CountVectorizer; retorna (matriz CSR, términos).
+        Lanza ValueError si no hay vocabulario.
+        """
+        with self._lock:
+            counts = self.count_matrix(texts)
+            used = np.flatnonzero(np.bincount(counts.indices, minlength=counts.shape[1]))
+            if not len(used):
+                raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+            terms = np.array([self.terms[i] for i in used], dtype=str)
+        order = np.argsort(terms, kind='stable')
+        return counts[:, used[order]], terms[order]
+
+    def tfidf(self, texts, max_features=None):
+        """
+        Mismo resultado que TfidfVectorizer(stop_words, ngram_range,
+        max_features).fit_transform(texts), pero desde los conteos guardados.
+        Retorna (matriz CSR, términos, idf); lanza ValueError si no hay
+        vocabulario.
+        """
+        with metrics.timer("docstore_counts"):
+            counts, terms = self.term_counts(texts)
+        if max_features is not None and len(terms) > max_features:
+            # Mismo desempate que sklearn (argsort por defecto sobre los totales): mismas columnas elegidas
+            frequency = np.asarray(counts.sum(axis=0)).ravel().astype(np.int64)
+            keep = np.sort((-frequency).argsort()[:max_features])
+            counts, terms = counts[:, keep], terms[keep]
+        transformer = TfidfTransformer()
+        return transformer.fit_transform(counts.astype(np.float64)), terms, transformer.idf_
+
+    def transform(self, texts, terms, idf):
+        """
+        TF-IDF de texts en un espacio ya ajustado (terms en el orden que
+        retorna tfidf() y su idf). Los n-gramas fuera de terms no tienen
+        columna, pero pesan en la norma con el IDF máximo (en un reajuste
+        aparecerían en un solo documento). Retorna (matriz CSR, residual,
+        oov): residual es el peso de lo que quedó fuera por fila (matriz y
+        residual juntos tienen norma 1) y oov la fracción de n-gramas fuera
+        del espacio.
+        """
+        if not len(texts):
+            return sp.csr_matrix((0, len(terms))), np.zeros(0), 0.0
+        try:
+            counts, local_terms = self.term_counts(texts)
+        except ValueError:
+            return sp.csr_matrix((len(texts), len(terms))), np.zeros(len(texts)), 0.0
+        position = np.minimum(np.searchsorted(terms, local_terms), len(terms) - 1)
+        known = terms[position] == local_terms
+        counts = counts.tocoo()
+        inside = known[counts.col]
+        total = counts.data.sum()
+        oov = 1 - counts.data[inside].sum() / total if total else 0.0
+        columns = position[counts.col[inside]]
+        weights = counts.data[inside] * idf[columns]
+        outside = np.bincount(counts.row[~inside], weights=(counts.data[~inside] * idf.max()) ** 2, minlength=len(texts))
+        norms = np.sqrt(np.bincount(counts.row[inside], weights=weights ** 2, minlength=len(texts)) + outside)
+        norms[norms == 0] = 1
+        matrix = sp.csr_matrix((weights / norms[counts.row[inside]], (counts.row[inside], columns)),
+                               shape=(len(texts), len(terms)))
+        return matrix, np.sqrt(outside) / norms, float(oov)
+
+    # --- EXTRACCIÓN ---
+    def extracted(self, html, extract, backend=""):
+        """Resultado de extract(html), memorizado por backend y hash del HTML (se retorna una copia)."""
+        key = f"{backend}:{content_hash(html)}"
+        with self._lock:
+            if not self._extracted_loaded:
+                self._load_extracted()
+            data = self._extracted.get(key)
+            if data is not None:
+                self.extract_hits += 1
+                self._extracted.move_to_end(key)
+                return dict(data)
+            self.extract_misses += 1
+        data = extract(html)  # Fuera del lock: el parsing de otros hilos no espera
+        with self._lock:
+            self._extracted[key] = {k: data[k] for k in EXTRACTED_COLUMNS[1:]}
+            self._extracted_dirty = True
+            while len(self._extracted) > self.max_extracted:
+                self._extracted.popitem(last=False)
+        return dict(data)
+
+    def report(self):
+        """Imprime (y registra) lo reutilizado desde el último reporte y reinicia contadores."""
+        if self.extract_hits or self.extract_misses:
+            print(f"   [DocStore] Extracciones reutilizadas: {self.extract_hits} | nuevas: {self.extract_misses}")
+            metrics.incr("docstore_requests", self.extract_hits, kind="extract", result="hit")
+            metrics.incr("docstore_requests", self.extract_misses, kind="extract", result="miss")
+        if self.hits or self.misses:
+            print(f"   [DocStore] Análisis reutilizados: {self.hits} | nuevos: {self.misses}")
+            metrics.incr("docstore_requests", self.hits, kind="analyze", result="hit")
+            metrics.incr("docstore_requests", self.misses, kind="analyze", result="miss")
+        self.hits = self.misses = self.extract_hits = self.extract_misses = 0
@@ -0,0 +1,181 @@
+import datetime
+import html
+import os
+
+import numpy as np
+import pandas as pd
+
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él la matriz se exporta a CSV
+    pa = pq = None
+
+# Columnas de metadatos del DataFrame de resultados (no son páginas)
+META_COLUMNS = ['max_relevance', 'search_intent', 'intent', 'market_interest', 'max_coverage', 'action_priority']
+LOW_DENSITY = 0.05
+
+
+def page_columns(df):
+    """Columnas de página: numéricas y fuera de la lista de metadatos."""
+    return [c for c in df.columns if c not in META_COLUMNS and pd.api.types.is_numeric_dtype(df[c])]
+
+
+def coverage_sections(df, chunk_size=50, top_optimized=5):
+    """
+    Clasifica cada keyword por página con máscaras de NumPy (faltante,
+    baja densidad, optimizada) y produce una sección por página:
+    (pagina, faltantes, baja_densidad, [(kw, score) mejores primero]).
+    Las páginas se procesan en bloques de chunk_size columnas para acotar memoria.
+    """
+    pages = page_columns(df)
+    keywords = np.asarray(df.index, dtype=object)
+    for start in range(0, len(pages), chunk_size):
+        block_pages = pages[start:start + chunk_size]
+        values = df[block_pages].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        missing = valid & (values == 0.0)
+        low = valid & (values > 0.0) & (values < LOW_DENSITY)
+        optimized = valid & (values >= LOW_DENSITY)
+        for j, page in enumerate(block_pages):
+            opt_idx = np.flatnonzero(optimized[:, j])
+            if len(opt_idx) > top_optimized:
+                opt_idx = opt_idx[np.argpartition(-values[opt_idx, j], top_optimized - 1)[:top_optimized]]
+            opt_idx = opt_idx[np.argsort(-values[opt_idx, j], kind='stable')]
+            yield (
+                page,
+                keywords[missing[:, j]].tolist(),
+                keywords[low[:, j]].tolist(),
+                [(keywords[i], values[i, j]) for i in opt_idx],
+            )
+
+
+def export_matrix(path, keyword_vectors, page_vectors, keywords, page_names, similarity=None,
+                  chunk_bytes=64 * 1024 * 1024):
+    """
+    Exporta la matriz keyword×página completa en streaming, bloque a bloque,
+    a Parquet (si pyarrow está instalado y la extensión es .parquet) o CSV.
+    Si se pasa el SimilarityResult se agregan max_coverage y action_priority.
+    """
+    from modules.similarity import iter_similarity_chunks  # sklearn: sólo al exportar, no al generar reportes
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    use_parquet = path.endswith('.parquet')
+    if use_parquet and pq is None:
+        path = path[:-len('.parquet')] + '.csv'
+        use_parquet = False
+        print(f"   [Export] pyarrow no está instalado: exportando a {path}")
+
+    writer = None
+    rows = 0
+    try:
+        for start, block in iter_similarity_chunks(keyword_vectors, page_vectors, chunk_bytes):
+            end = start + block.shape[0]
+            frame = pd.DataFrame(block, columns=[str(p) for p in page_names])
+            frame.insert(0, 'keyword', keywords[start:end])
+            if similarity is not None:
+                frame['max_coverage'] = similarity.max_coverage[start:end]
+                frame['action_priority'] = similarity.action_priority[start:end]
+            if use_parquet:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                frame.to_csv(path, mode='w' if start == 0 else 'a', header=(start == 0), index=False)
+            rows = end
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"   [Export] Matriz completa ({rows} keywords × {len(page_names)} páginas): {path}")
+    return path
+
+
+class HTMLReportWriter:
+    """
+    Reporte HTML escrito en streaming: cada sección se vuelca al archivo en
+    cuanto se genera, así un sitio con miles de páginas no pasa por el
+    renderizador de PDF ni se acumula completo en memoria.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    @staticmethod
+    def _e(text):
+        return html.escape(str(text))
+
+    def generate(self, df_results, competitor_data=None, chart_path=None, cannibalization=None, moved=None):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            fecha = datetime.datetime.now().strftime("%d-%m-%Y")
+            f.write(
+                "<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'>"
+                "<title>Auditoría de Densidad Semántica</title>"
+                "<style>body{font-family:Arial,sans-serif;color:#334155;max-width:1000px;margin:auto}"
+                "h2{color:#0f172a}h3{background:#475569;color:#fff;padding:6px}"
+                ".miss{color:#b91c1c}.low{color:#c2410c}.ok{color:#15803d}"
+                "table{border-collapse:collapse}td,th{border:1px solid #cbd5e1;padding:4px 8px}</style></head><body>"
+                f"<h1>AUDITORÍA DE DENSIDAD SEMÁNTICA</h1><p>Fecha corte: {fecha}</p>\n"
+            )
+            if hasattr(chart_path, 'result'):
+                # HeatmapJob en curso: esperamos el render sólo al incrustar la imagen
+                try:
+                    chart_path = chart_path.result()
+                except Exception as e:
+                    print(f"   [Reporter Error] Falló el render del heatmap: {e}")
+                    chart_path = None
+            if chart_path and os.path.exists(chart_path):
+                f.write(f"<h2>Matriz de Cobertura (Heatmap)</h2><img src='{self._e(os.path.abspath(chart_path))}' width='100%'>\n")
+
+            if competitor_data is not None and len(competitor_data):
+                f.write("<h2>Benchmarking de Competencia</h2><table><tr><th>Término</th><th>Score</th>"
+                        "<th>Competidores</th><th>Intención</th></tr>\n")
+                for row in competitor_data.itertuples(index=False):
+                    f.write(f"<tr><td>{self._e(row.term)}</td><td>{row.score:.3f}</td>"
+                            f"<td>{row.doc_freq}</td><td>{self._e(row.intent)}</td></tr>\n")
+                f.write("</table>\n")
+
+            if cannibalization is not None:
+                f.write("<h2>Canibalización de Contenido</h2>\n")
+                if len(cannibalization):
+                    f.write("<table><tr><th>#</th><th>Páginas</th><th>Similitud</th><th>Acción</th></tr>\n")
+                    for row in cannibalization.itertuples(index=False):
+                        f.write(f"<tr><td>{row.cluster}</td><td>{'<br>'.join(self._e(p) for p in row.pages)}</td>"
+                                f"<td>{row.max_similarity:.2f}</td><td>{self._e(row.recommendation)}</td></tr>\n")
+                    f.write("</table>\n")
+                else:
+                    f.write("<p class='ok'>No se detectaron páginas canibalizadas.</p>\n")
+
+            f.write("<h2>Hoja de Ruta: Optimización On-Page</h2>\n")
+            for page, missing, low, optimized in coverage_sections(df_results):
+                parts = [f"<h3>URL OBJETIVO: {self._e(page)}</h3>"]
+                if missing:
+                    parts.append("<p class='miss'><b>[!] CONTENIDO FALTANTE (Prioridad Alta):</b> "
+                                 + ", ".join(self._e(k) for k in missing) + "</p>")
+                if low:
+                    parts.append("<p class='low'><b>[+] AUMENTAR DENSIDAD:</b> "
+                                 + ", ".join(self._e(k) for k in low) + "</p>")
+                if optimized:
+                    parts.append("<p class='ok'><b>[OK] Términos bien posicionados:</b> "
+                                 + ", ".join(f"{self._e(k)} ({s:.2f})" for k, s in optimized) + "</p>")
+                f.write("\n".join(parts) + "\n")
+
+            if moved is not None:
+                previous = moved.attrs.get('previous_run')
+                f.write(f"<h2>Cambios desde la Auditoría Anterior{f' ({self._e(previous)})' if previous else ''}</h2>\n")
+                if len(moved):
+                    f.write("<table><tr><th>Keyword</th><th>Estado</th><th>Cobertura</th><th>Δ</th>"
+                            "<th>Prioridad</th><th>Δ</th><th>Mejor página</th></tr>\n")
+                    for row in moved.itertuples(index=False):
+                        css = 'ok' if row.priority_change < 0 else 'miss' if row.priority_change > 0 else ''
+                        page = self._e(row.best_page_after) if row.best_page_before == row.best_page_after else \
+                            f"{self._e(row.best_page_before)} &rarr; {self._e(row.best_page_after)}"
+                        f.write(f"<tr class='{css}'><td>{self._e(row.keyword)}</td><td>{self._e(row.status)}</td>"
+                                f"<td>{'-' if row.status == 'eliminada' else f'{row.coverage_after:.2f}'}</td><td>{row.coverage_change:+.2f}</td>"
+                                f"<td>{'-' if row.status == 'eliminada' else f'{row.priority_after:.1f}'}</td><td>{row.priority_change:+.1f}</td><td>{page}</td></tr>\n")
+                    f.write("</table>\n")
+                else:
+                    f.write("<p class='ok'>Sin cambios desde la auditoría anterior.</p>\n")
+            f.write("</body></html>\n")
+        print(f"   [Reporter] Reporte HTML generado: {self.filename}")
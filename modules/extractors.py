@@ -0,0 +1,231 @@
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml es opcional: sin él se usa BeautifulSoup
+    etree = lxml_html = None
+
+# Ruido que no debe contaminar el análisis: menú, footer, sidebar, popups y scripts
+NOISE_SELECTORS = [
+    'nav', 'footer', 'script', 'style', 'noscript', 'iframe', 'svg',
+    '.navbar', '.menu', '.footer', '.sidebar', '#cookie-banner',
+    '.modal', '.popup', '#header', '.top-bar'
+]
+NOISE_TAGS = frozenset(s for s in NOISE_SELECTORS if s[0] not in '.#')
+NOISE_CLASSES = frozenset(s[1:] for s in NOISE_SELECTORS if s[0] == '.')
+NOISE_IDS = frozenset(s[1:] for s in NOISE_SELECTORS if s[0] == '#')
+
+WHITESPACE_RE = re.compile(r'\s+')
+# Primer <body> real según html.parser: se saltan comentarios y el contenido de script/style (sus únicos CDATA)
+BODY_SCAN_RE = re.compile(
+    r'<!--.*?(?:--\s*>|\Z)|<(script|style)(?=[\s/>])[^>]*>.*?(?:</\s*\1\s*>|\Z)|<body[\s>/]',
+    re.IGNORECASE | re.DOTALL
+)
+# libxml2 guarda el contenido de estos elementos como texto crudo; html.parser ve ahí etiquetas y comentarios
+RAW_TEXT_TAGS = frozenset(['title', 'textarea', 'xmp', 'noembed', 'noframes', 'plaintext'])
+
+
+def clean_text(text):
+    """Limpia espacios dobles, tabulaciones y saltos de línea basura."""
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def _has_body_tag(html):
+    """True si html.parser encontraría una etiqueta <body> (sin ella no crea ninguna)."""
+    for match in BODY_SCAN_RE.finditer(html):
+        if match.group(0)[1:5].lower() == 'body':
+            return True
+    return False
+
+
+def _build_data(title, h1, h2, meta_desc, clean_body):
+    return {
+        'title': title,
+        'h1': h1,
+        'h2': h2,
+        'meta_desc': meta_desc,
+        'content_sample': clean_body, # Aquí va el texto puro, sin menús
+        'word_count': len(clean_body.split())
+    }
+
+
+class BeautifulSoupExtractor:
+    """Backend de referencia: árbol completo de BeautifulSoup con html.parser."""
+    name = "bs4"
+
+    def extract(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # --- FASE 1: CIRUGÍA (Eliminación de Ruido) ---
+        for selector in NOISE_SELECTORS:
+            for element in soup.select(selector):
+                element.decompose() # Destruye el elemento del árbol HTML
+
+        # --- FASE 2: EXTRACCIÓN INTELIGENTE ---
+        # Buscamos el contenedor principal de Odoo o HTML5 estándar
+        main_content = soup.find('main') or soup.find('div', id='wrap') or soup.find('div', class_='page-content') or soup.body
+
+        if not main_content:
+            main_content = soup
+
+        raw_text = main_content.get_text(separator=' ', strip=True)
+        clean_body = clean_text(raw_text)
+
+        # --- FASE 3: METADATOS TÉCNICOS ---
+        title = "SIN TÍTULO"
+        if soup.title:
+            title = str(soup.title.string) if soup.title.string is not None else None
+        meta_desc = "NO ENCONTRADA"
+        meta = soup.find("meta", attrs={"name": "description"})
+        if meta:
+            meta_desc = meta.get("content")
+
+        return _build_data(
+            title,
+            [clean_text(h.get_text()) for h in soup.find_all('h1')],
+            [clean_text(h.get_text()) for h in soup.find_all('h2')],
+            meta_desc,
+            clean_body
+        )
+
+
+class LxmlExtractor:
+    """
+    Backend rápido sobre lxml. Un único recorrido (iterwalk) salta los
+    subárboles de ruido y, en la misma pasada, recoge título, encabezados,
+    meta description y el texto de cada contenedor candidato. Produce el
+    mismo dict que BeautifulSoupExtractor; los documentos con marcado dentro
+    de un elemento de texto crudo (RAW_TEXT_TAGS), raros, van al de referencia.
+    """
+    name = "lxml"
+
+    def __init__(self):
+        self._parser = lxml_html.HTMLParser(encoding='utf-8', remove_comments=False)
+        self._fallback = BeautifulSoupExtractor()
+
+    @staticmethod
+    def _is_noise(el):
+        if el.tag in NOISE_TAGS:
+            return True
+        if NOISE_IDS and el.get('id') in NOISE_IDS:
+            return True
+        classes = el.get('class')
+        return bool(classes) and not NOISE_CLASSES.isdisjoint(classes.split())
+
+    @staticmethod
+    def _string_of(title, noise):
+        # Equivalente a Tag.string: un único hijo de texto (descendiendo por hijos únicos)
+        node = title
+        while True:
+            children = [c for c in node if c not in noise]
+            if not children:
+                return node.text
+            if node.text or len(children) != 1 or children[0].tail or not isinstance(children[0].tag, str):
+                return None
+            node = children[0]
+
+    def extract(self, html):
+        try:
+            root = lxml_html.document_fromstring(html.encode('utf-8', 'replace'), parser=self._parser)
+        except (etree.ParserError, ValueError):
+            return self._fallback.extract(html)
+
+        # Colectores activos: [elemento, rol, fragmentos]; el texto se reparte a todos los abiertos
+        collectors = []
+        done = {}
+        headings = {'h1': [], 'h2': []}
+        noise = set()
+        title_el = None
+        meta_desc = "NO ENCONTRADA"
+        meta_found = False
+        # Sin <body> en el origen, html.parser no lo crea y el contenedor final es el documento completo
+        has_body = _has_body_tag(html)
+
+        walker = etree.iterwalk(root, events=('start', 'end', 'comment', 'pi'))
+        for event, el in walker:
+            if event == 'start':
+                tag = el.tag
+                if self._is_noise(el):
+                    noise.add(el)
+                    walker.skip_subtree()
+                    continue
+                if tag == 'template':
+                    # BeautifulSoup excluye el contenido de <template> de get_text()
+                    walker.skip_subtree()
+                    continue
+                if tag in RAW_TEXT_TAGS and el.text and '<' in el.text:
+                    # p.ej. <textarea><b>x</b></textarea>: bs4 arma elementos (texto, encabezados, .string
+                    # del título) con lo que aquí es texto literal; no se imita, se delega el documento
+                    return self._fallback.extract(html)
+
+                role = None
+                if tag == 'main' and 'main' not in done:
+                    role = 'main'
+                elif tag == 'div' and 'wrap' not in done and el.get('id') == 'wrap':
+                    role = 'wrap'
+                elif tag == 'div' and 'page' not in done and 'page-content' in (el.get('class') or '').split():
+                    role = 'page'
+                elif tag == 'body' and 'body' not in done and has_body:
+                    role = 'body'
+                elif tag == 'html' and 'doc' not in done:
+                    role = 'doc'
+                elif tag in headings:
+                    role = tag
+                if role:
+                    buf = []
+                    collectors.append((el, role, buf))
+                    if role in headings:
+                        headings[role].append(buf)
+                    else:
+                        done[role] = buf
+
+                if tag == 'title' and title_el is None:
+                    title_el = el
+                elif tag == 'meta' and not meta_found and el.get('name') == 'description':
+                    meta_found = True
+                    meta_desc = el.get('content')
+
+                if el.text:
+                    for _, _, buf in collectors:
+                        buf.append(el.text)
+            else:
+                # 'end', 'comment' o 'pi': cerramos el colector propio y el tail pertenece al padre
+                if event == 'end' and collectors and collectors[-1][0] is el:
+                    collectors.pop()
+                if el.tail and el.getparent() is not None:
+                    for _, _, buf in collectors:
+                        buf.append(el.tail)
+
+        # Mismo orden de preferencia que BeautifulSoupExtractor (un <main> vacío también cuenta)
+        container = next((done[role] for role in ('main', 'wrap', 'page', 'body', 'doc') if role in done), [])
+        clean_body = clean_text(' '.join(s.strip() for s in container if s.strip()))
+
+        title = "SIN TÍTULO"
+        if title_el is not None:
+            title = self._string_of(title_el, noise)
+
+        return _build_data(
+            title,
+            [clean_text(''.join(buf)) for buf in headings['h1']],
+            [clean_text(''.join(buf)) for buf in headings['h2']],
+            meta_desc,
+            clean_body
+        )
+
+
+EXTRACTORS = {
+    'bs4': BeautifulSoupExtractor,
+    'lxml': LxmlExtractor,
+}
+
+
+def get_extractor(name="auto"):
+    """Instancia un backend por nombre; 'auto' usa lxml si está instalado."""
+    if name == "auto":
+        name = "lxml" if lxml_html is not None else "bs4"
+    if name == "lxml" and lxml_html is None:
+        print("   [Extractor] lxml no está instalado, usando BeautifulSoup.")
+        name = "bs4"
+    return EXTRACTORS[name]()
@@ -0,0 +1,46 @@
+import builtins
+import sys
+import time
+
+
+class ImportProfiler:
+    """
+    Mide el costo de importación por paquete de primer nivel mientras está
+    activo (envuelve builtins.__import__). Cada import nuevo de terceros se
+    atribuye al paquete raíz del import más externo que lo disparó, así
+    'pandas' incluye numpy, dateutil, etc.
+    """
+    def __init__(self, own_package='modules'):
+        self.own_package = own_package
+        self.timings = {}
+        self._active = False
+        self._original = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        root = name.split('.')[0]
+        # Imports relativos, ya cargados, anidados o del propio paquete pasan directo
+        if level or self._active or root == self.own_package or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        self._active = True
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._active = False
+            self.timings[root] = self.timings.get(root, 0.0) + time.perf_counter() - start
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._timed_import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+    def report(self, top=15):
+        total = sum(self.timings.values())
+        print("\n   [Import Profile] Tiempo de importación por paquete:")
+        for root, elapsed in sorted(self.timings.items(), key=lambda x: x[1], reverse=True)[:top]:
+            print(f"      {root:<24} {elapsed * 1000:>9.1f} ms")
+        print(f"      {'TOTAL':<24} {total * 1000:>9.1f} ms")
@@ -0,0 +1,79 @@
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "intents.json")
+
+
+def fold_accents(text):
+    """'Matrícula' -> 'matricula': minúsculas y sin tildes."""
+    return unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+
+
+class IntentClassifier:
+    """
+    Clasificador de intención por lotes. Los léxicos (config/intents.json) se
+    compilan una sola vez a expresiones con límites de palabra, así 'vs' ya no
+    coincide dentro de otras palabras. Una regex combinada descarta de una
+    pasada las keywords sin ningún término; sólo las restantes se evalúan por
+    intención, en orden de prioridad. Los resultados se cachean por keyword.
+    """
+    def __init__(self, lexicon_path=DEFAULT_LEXICON_PATH, max_cache=500_000):
+        with open(lexicon_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self.default = config.get('default', 'INFORMACIONAL')
+        self.labels = [intent['name'] for intent in config['intents']]
+        self.patterns = [self._compile(intent['terms']) for intent in config['intents']]
+        self.any_pattern = self._compile([t for intent in config['intents'] for t in intent['terms']])
+        self.max_cache = max_cache
+        self._cache = {}
+
+    @staticmethod
+    def _compile(terms):
+        alternatives = '|'.join(sorted((re.escape(fold_accents(t)) for t in terms), key=len, reverse=True))
+        return re.compile(rf"\b(?:{alternatives})(?:s|es)?\b")
+
+    def classify(self, keyword):
+        """Intención de una sola keyword."""
+        cached = self._cache.get(keyword)
+        if cached is not None:
+            return cached
+        folded = fold_accents(keyword)
+        intent = self.default
+        if self.any_pattern.search(folded):
+            for label, pattern in zip(self.labels, self.patterns):
+                if pattern.search(folded):
+                    intent = label
+                    break
+        self._remember({keyword: intent})
+        return intent
+
+    def classify_many(self, keywords):
+        """
+        Clasifica una Serie de pandas, array de NumPy o lista en una llamada
+        vectorizada. Retorna una Serie alineada con la entrada.
+        """
+        series = keywords if isinstance(keywords, pd.Series) else pd.Series(np.asarray(keywords, dtype=object))
+        result = series.map(self._cache)
+        pending = pd.Series(pd.unique(series[result.isna()]))
+        if len(pending):
+            folded = pending.str.normalize('NFKD').str.lower().str.encode('ascii', 'ignore').str.decode('ascii')
+            intents = np.full(len(pending), self.default, dtype=object)
+            candidates = folded.str.contains(self.any_pattern).to_numpy(dtype=bool)
+            if candidates.any():
+                subset = folded[candidates]
+                masks = [subset.str.contains(p).to_numpy(dtype=bool) for p in self.patterns]
+                intents[candidates] = np.select(masks, self.labels, default=self.default)
+            learned = dict(zip(pending, intents))
+            self._remember(learned)
+            result = result.fillna(series.map(learned))
+        return result
+
+    def _remember(self, mapping):
+        if len(self._cache) + len(mapping) > self.max_cache:
+            self._cache.clear()
+        self._cache.update(mapping)
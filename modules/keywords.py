@@ -0,0 +1,152 @@
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from modules import metrics
+from modules.intent import fold_accents
+
+try:
+    from nltk.stem.snowball import SnowballStemmer
+except ImportError:  # nltk es opcional: sin él se usa el stemmer liviano de abajo
+    SnowballStemmer = None
+
+TOKEN_RE = re.compile(r"\w+")
+# Sólo artículos y preposiciones: 'como', 'donde', 'mejor'... cambian la intención y se conservan
+STOP_WORDS = frozenset([
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los', 'para', 'por', 'un', 'una', 'unos', 'unas', 'y',
+])
+COLUMNS = ['keyword', 'is_seed', 'trend_interest', 'variants', 'n_variants']
+
+
+def light_stem(token):
+    """Stemmer mínimo para español: quita plural y vocal de género ('clases'/'clase' -> 'clas')."""
+    if len(token) > 4 and token.endswith('es') and token[-3] not in 'aeiou':
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith('s'):
+        token = token[:-1]
+    if len(token) > 3 and token[-1] in 'aeo':
+        token = token[:-1]
+    return token
+
+
+class KeywordNormalizer:
+    """
+    Colapsa variantes de una misma búsqueda antes de vectorizar:
+
+    1. Cada keyword pasa a minúsculas sin tildes, sin artículos ni
+       preposiciones, y cada token a su raíz (Snowball de nltk si está
+       instalado, si no light_stem).
+    2. Las raíces del vocabulario se agrupan por similitud coseno de
+       n-gramas de caracteres (char_wb) con un producto disperso por bloques:
+       'bilingu'/'biling' o 'universidad'/'unversidad' quedan en la raíz más
+       frecuente. El vocabulario de raíces crece mucho más lento que el de
+       keywords, así el costo no es cuadrático en el número de keywords.
+    3. La clave canónica es el conjunto ordenado de raíces: 'Enseñanza de
+       inglés', 'ingles ensenanza' e 'inglés enseñansa' comparten clave.
+
+    Cada clave queda en un solo representante, que toma el mayor interés de
+    Trends de sus variantes: queda en la escala 0-100 y un grupo no sube de
+    prioridad sólo por tener más formas de escribirse.
+    """
+    def __init__(self, threshold=0.65, ngram_range=(2, 3), min_stem_length=5, block_size=4096, stemmer="auto"):
+        self.threshold = threshold
+        self.ngram_range = ngram_range
+        self.min_stem_length = min_stem_length  # Raíces cortas ('plan'/'pan') nunca se fusionan
+        self.block_size = block_size
+        if stemmer == "auto":
+            stemmer = "snowball" if SnowballStemmer is not None else "light"
+        self.stemmer = stemmer
+        self.stem = SnowballStemmer("spanish").stem if stemmer == "snowball" else light_stem
+        self._stems = {}
+
+    def stems(self, keyword):
+        """Raíces de una keyword, en orden y sin artículos/preposiciones."""
+        result = []
+        for token in TOKEN_RE.findall(fold_accents(keyword)):
+            if token in STOP_WORDS:
+                continue
+            stem = self._stems.get(token)
+            if stem is None:
+                stem = self._stems[token] = self.stem(token)
+            result.append(stem)
+        return result
+
+    def cluster_stems(self, frequency):
+        """
+        frequency: {raíz: número de keywords que la usan}. Retorna {raíz:
+        representante} para las raíces que se fusionan con otra más frecuente.
+        Además del coseno, la diferencia de largo debe ser de a lo sumo un
+        carácter (typos y tildes), lo que deja fuera derivadas como
+        'colegi'/'colegial' o 'deport'/'deportiv'.
+        """
+        candidates = sorted((s for s in frequency if len(s) >= self.min_stem_length and not s.isdigit()),
+                            key=lambda s: (-frequency[s], -len(s), s))  # A igual uso, la más larga: el typo típico omite una letra
+        if len(candidates) < 2:
+            return {}
+        vectors = TfidfVectorizer(analyzer='char_wb', ngram_range=self.ngram_range, dtype=np.float32).fit_transform(candidates)
+        lengths = np.array([len(s) for s in candidates])
+        transposed = vectors.T.tocsr()
+        leader = np.full(len(candidates), -1, dtype=np.int64)
+        # Orden por frecuencia: cada raíz libre lidera y absorbe a sus vecinos libres (sin encadenar)
+        for start in range(0, len(candidates), self.block_size):
+            sims = (vectors[start:start + self.block_size] @ transposed).tocsr()
+            sims.data[sims.data < self.threshold] = 0
+            sims.eliminate_zeros()
+            for row in range(sims.shape[0]):
+                i = start + row
+                if leader[i] >= 0:
+                    continue
+                leader[i] = i
+                linked = sims.indices[sims.indptr[row]:sims.indptr[row + 1]]
+                free = linked[(leader[linked] < 0) & (np.abs(lengths[linked] - lengths[i]) <= 1)]
+                leader[free] = i
+        return {candidates[i]: candidates[j] for i, j in enumerate(leader) if i != j}
+
+    def collapse(self, keywords, trend_data=None, seeds=()):
+        """
+        Retorna un DataFrame con un representante por grupo: keyword, is_seed,
+        trend_interest (máximo de las variantes con dato; NaN si ninguna tiene),
+        variants y n_variants. Ordenado por prioridad (semillas e interés).
+        """
+        trend_data = trend_data or {}
+        seeds = set(seeds)
+        keywords = list(dict.fromkeys(keywords))
+        with metrics.timer("keyword_normalization"):
+            stems = [self.stems(k) for k in keywords]
+            frequency = Counter(s for kw_stems in stems for s in set(kw_stems))
+            merged = self.cluster_stems(frequency)
+            frame = pd.DataFrame({'keyword': keywords})
+            frame['key'] = [" ".join(sorted({merged.get(s, s) for s in kw_stems})) or fold_accents(k).strip()
+                            for k, kw_stems in zip(keywords, stems)]
+            frame['is_seed'] = frame['keyword'].isin(seeds)
+            frame['trend_interest'] = pd.Series([trend_data.get(k) for k in keywords], dtype=float)
+            # Entre variantes preferimos la semilla, la que tiene dato y la mejor escrita (sin raíces
+            # fusionadas, que suelen ser typos, y con más tildes/eñes)
+            frame['typos'] = [sum(s in merged for s in kw_stems) for kw_stems in stems]
+            frame['accents'] = frame['keyword'].str.count(r'[^\x00-\x7f]')
+            frame['length'] = frame['keyword'].str.len()
+            frame = frame.sort_values(
+                ['is_seed', 'trend_interest', 'typos', 'accents', 'length', 'keyword'],
+                ascending=[False, False, True, False, True, True], na_position='last', kind='stable'
+            )
+
+            groups = frame.groupby('key', sort=False)
+            result = pd.DataFrame({
+                'keyword': groups['keyword'].first(),
+                'is_seed': groups['is_seed'].any(),
+                'trend_interest': groups['trend_interest'].max(),
+                'variants': groups['keyword'].agg(list),
+            })
+            result['n_variants'] = result['variants'].str.len()
+            result = result.sort_values(['is_seed', 'trend_interest', 'n_variants'], ascending=False,
+                                        na_position='last', kind='stable').reset_index(drop=True)
+
+        metrics.gauge("keywords_raw", len(keywords))
+        metrics.gauge("keywords_collapsed", len(result))
+        metrics.gauge("keyword_stems_merged", len(merged))
+        result.attrs['n_raw'] = len(keywords)
+        result.attrs['n_stems_merged'] = len(merged)
+        return result[COLUMNS]
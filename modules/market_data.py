@@ -1,66 +1,189 @@
 import requests
 import json
+import os
+import sqlite3
+import string
+import threading
 import time
-import pandas as pd
-from pytrends.request import TrendReq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from modules import metrics
+from modules.trends import DEFAULT_ANCHOR, TrendsNormalizer
+
+SUGGEST_URL = "http://suggestqueries.google.com/complete/search"
+
+
+class TokenBucket:
+    """Rate limiter de cubeta de tokens, seguro entre hilos."""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate                      # Tokens repuestos por segundo
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SuggestCache:
+    """Caché persistente (SQLite) de respuestas de Suggest por consulta, con TTL."""
+    def __init__(self, path=".cache/suggest_cache.sqlite", ttl=30 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS suggestions (query TEXT PRIMARY KEY, results TEXT, fetched_at REAL)")
+        self._db.commit()
+
+    def get(self, query):
+        with self._lock:
+            row = self._db.execute("SELECT results, fetched_at FROM suggestions WHERE query = ?", (query,)).fetchone()
+            if row is None or (time.time() - row[1]) >= self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, query, results):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO suggestions VALUES (?, ?, ?)",
+                (query, json.dumps(results, ensure_ascii=False), time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
 
 class MarketData:
-    def __init__(self):
-        # Conectamos con Google Trends (hl='es-EC' para español de Ecuador)
-        self.pytrends = TrendReq(hl='es-EC', tz=300)
+    def __init__(self, suggest_url=SUGGEST_URL, workers=8, rate=5.0, cache=None,
+                 trends_client=None, trend_store=None, trend_anchor=DEFAULT_ANCHOR, follow_redirects=True):
+        # Google Trends se conecta al primer uso: TrendReq hace una petición al instanciarse.
+        # trends_client permite inyectar un cliente fake con la interfaz de pytrends.
+        self._pytrends = trends_client
+        self.trend_store = trend_store
+        self.trend_anchor = trend_anchor
+
+        # Suggest: sesión con pool keep-alive, pool de hilos acotado y rate limit global
+        self.suggest_url = suggest_url  # Configurable para apuntar a un servidor stub local
+        self.follow_redirects = follow_redirects  # El servicio no las sigue: sólo se validó suggest_url
+        self.workers = workers
+        self.rate_limiter = TokenBucket(rate)
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def pytrends(self):
+        if self._pytrends is None:
+            from pytrends.request import TrendReq  # Importa pandas: sólo se paga si se consulta Trends
+            # Conectamos con Google Trends (hl='es-EC' para español de Ecuador)
+            self._pytrends = TrendReq(hl='es-EC', tz=300)
+        return self._pytrends
 
     def get_real_trends(self, seeds):
         """
         Consulta el Índice de Interés (0-100) en Google Trends para las palabras clave.
+        Todos los lotes comparten un ancla, por lo que los scores son comparables entre sí.
         Retorna un diccionario {keyword: interest_score}.
         """
         print(f"   [Market] Consultando Google Trends para {len(seeds)} términos...")
-        trend_scores = {}
-        
-        # Google Trends permite máximo 5 palabras por petición
-        chunks = [seeds[i:i + 5] for i in range(0, len(seeds), 5)]
-        
-        for chunk in chunks:
-            try:
-                # Payload para Ecuador (geo='EC') y últimos 12 meses
-                self.pytrends.build_payload(chunk, cat=0, timeframe='today 12-m', geo='EC')
-                data = self.pytrends.interest_over_time()
-                
-                if not data.empty:
-                    # Calculamos el promedio de interés anual
-                    means = data.mean()
-                    for kw, score in means.items():
-                        trend_scores[kw] = round(score, 2)
-                        print(f"      > {kw}: Interés {score:.1f}/100")
-                
-                # Pausa para no ser bloqueados por Google
-                time.sleep(2) 
-                
-            except Exception as e:
-                print(f"      [!] Error con Google Trends para {chunk}: {e}")
-                # Fallback: Asignamos un score bajo por defecto si falla
-                for kw in chunk:
-                    trend_scores[kw] = 0
-
+        try:
+            client = self.pytrends
+        except Exception as e:
+            # Sin conexión a Trends el analizador usa su interés por defecto
+            print(f"      [!] No se pudo conectar con Google Trends: {e}")
+            return {}
+        normalizer = TrendsNormalizer(client, store=self.trend_store, anchor=self.trend_anchor)
+        with metrics.timer("trends"):
+            trend_scores = normalizer.get_scores(seeds)
+        metrics.gauge("trends_keywords", len(trend_scores))
+        for kw, score in sorted(trend_scores.items(), key=lambda x: x[1], reverse=True)[:10]:
+            print(f"      > {kw}: Interés {score:.1f}/100")
         return trend_scores
 
-    def get_suggestions(self, seed_keywords):
+    def _fetch_suggestions(self, query):
+        """Sugerencias de una consulta (caché primero, luego red con rate limit)."""
+        if self.cache:
+            cached = self.cache.get(query)
+            if cached is not None:
+                metrics.incr("suggest_requests", cache="hit", status="200")
+                return cached
+        self.rate_limiter.acquire()
+        params = {'client': 'firefox', 'hl': 'es', 'gl': 'ec', 'q': query}
+        with metrics.timer("suggest"):
+            r = self.session.get(self.suggest_url, params=params, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10,
+                                 allow_redirects=self.follow_redirects)
+        metrics.incr("suggest_requests", cache="miss", status=str(r.status_code))
+        metrics.incr("suggest_bytes", len(r.content))
+        if r.status_code != 200:
+            return []
+        results = json.loads(r.text)[1]
+        if self.cache:
+            self.cache.put(query, results)
+        return results
+
+    def get_suggestions(self, seed_keywords, depth=1, alphabet=False, max_keywords=5000):
         """
         Expande las semillas usando Autocomplete (Long tail keywords).
+        depth=1 consulta sólo las semillas; depth>1 consulta también las
+        sugerencias obtenidas (sugerencias de sugerencias). Con alphabet=True
+        cada consulta se expande además con 'consulta a' ... 'consulta z'.
         """
-        print(f"   [Market] Expandiendo lista con Google Suggest...")
+        print(f"   [Market] Expandiendo lista con Google Suggest (profundidad {depth})...")
         found_keywords = set(seed_keywords)
-        base_url = "http://suggestqueries.google.com/complete/search?client=firefox&hl=es&gl=ec&q="
-        
-        for seed in seed_keywords:
-            try:
-                r = requests.get(base_url + seed.replace(' ', '+'), headers={'User-Agent': 'Mozilla/5.0'})
-                if r.status_code == 200:
-                    results = json.loads(r.text)[1]
+        queried = set()
+        level = list(dict.fromkeys(seed_keywords))
+
+        # Los hilos del pool registran en el mismo registro de métricas que quien los lanza
+        with ThreadPoolExecutor(max_workers=self.workers, initializer=metrics.use, initargs=(metrics.current(),)) as pool:
+            for current_depth in range(depth):
+                queries = []
+                for kw in level:
+                    queries.append(kw)
+                    if alphabet:
+                        queries.extend(f"{kw} {letter}" for letter in string.ascii_lowercase)
+                queries = [q for q in dict.fromkeys(queries) if q not in queried]
+                queried.update(queries)
+                if not queries:
+                    break
+
+                futures = {pool.submit(self._fetch_suggestions, q): q for q in queries}
+                next_level = []
+                for future in as_completed(futures):
+                    try:
+                        results = future.result()
+                    except Exception:
+                        continue
                     for kw in results:
-                        found_keywords.add(kw)
-                time.sleep(0.2)
-            except:
-                continue
-                
-        return list(found_keywords)
\ No newline at end of file
+                        if kw not in found_keywords and len(found_keywords) < max_keywords:
+                            found_keywords.add(kw)
+                            next_level.append(kw)
+                print(f"      > Nivel {current_depth + 1}: {len(queries)} consultas, {len(next_level)} términos nuevos")
+                metrics.event("suggest_level", depth=current_depth + 1, queries=len(queries), new_keywords=len(next_level))
+
+                if len(found_keywords) >= max_keywords:
+                    print(f"      [!] Límite de {max_keywords} términos alcanzado.")
+                    break
+                level = next_level
+
+        return list(found_keywords)
@@ -0,0 +1,347 @@
+"""
+Instrumentación de la auditoría: timers, contadores y gauges en memoria,
+eventos en JSON lines y un resumen en formato textfile de Prometheus.
+
+Los módulos registran con los atajos del módulo (`metrics.observe`,
+`metrics.incr`, ...), que van al registro activo: el global o el que fijó
+scoped() para el contexto en curso (el servicio da uno propio a cada
+auditoría; las descargas lo heredan porque las tareas del event loop copian
+el contexto de quien las lanza). Los eventos individuales (p.ej. una
+descarga) sólo se escriben si se configuró un archivo JSONL; sin configurar,
+el costo es un lock y una suma por medición.
+"""
+import contextlib
+import contextvars
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage
+    resource = None
+
+PREFIX = "seo_audit"
+
+
+# --- MEMORIA RESIDENTE ---
+def _status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reinicia el pico de RSS del proceso (Linux >= 4.0). Retorna False si no es posible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes():
+    """Pico de memoria residente: VmHWM en Linux, ru_maxrss en otros sistemas (sólo crece)."""
+    peak = _status_kb("VmHWM")
+    if peak is not None:
+        return peak * 1024
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS reporta bytes, Linux KB
+
+
+def current_rss_bytes():
+    rss = _status_kb("VmRSS")
+    return rss * 1024 if rss is not None else peak_rss_bytes()
+
+
+# --- REGISTRO ---
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "start", "seconds")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        self.registry.observe(self.name, self.seconds, **self.labels)
+
+
+class MetricsRegistry:
+    """
+    Agregados por (nombre, etiquetas): contadores, gauges y resúmenes de
+    duración (count/sum/max). Seguro entre hilos: el motor de descargas
+    registra desde su event loop y el pipeline desde el hilo principal.
+
+    exclusive=False indica que el proceso hace otros trabajos a la vez (el
+    servicio): el pico de RSS es del proceso entero, así que las fases no lo
+    reinician ni lo reportan como suyo.
+    """
+    def __init__(self, exclusive=True):
+        self.exclusive = exclusive
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.summaries = {}
+        self.jsonl_path = None
+        self.textfile_path = None
+        self.profile_phase = None
+        self.profiler = "cprofile"
+        self.profile_dir = "."
+        self.context = {}
+        self._jsonl = None
+
+    def configure(self, jsonl_path=None, textfile_path=None, profile_phase=None, profiler="cprofile",
+                  profile_dir=None, **context):
+        """Destinos de salida y perfilado opcional de una fase; context se agrega a cada evento (p.ej. run=...)."""
+        self.close()
+        self.jsonl_path = jsonl_path
+        self.textfile_path = textfile_path
+        self.profile_phase = profile_phase
+        self.profiler = profiler
+        self.profile_dir = profile_dir or os.path.dirname(jsonl_path or textfile_path or "") or "."
+        self.context = context
+        if jsonl_path:
+            os.makedirs(os.path.dirname(jsonl_path) or '.', exist_ok=True)
+            self._jsonl = open(jsonl_path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    # --- REGISTRO DE VALORES ---
+    def incr(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self.summaries.get(key)
+            if summary is None:
+                self.summaries[key] = [1, seconds, seconds]
+            else:
+                summary[0] += 1
+                summary[1] += seconds
+                if seconds > summary[2]:
+                    summary[2] = seconds
+
+    def timer(self, name, **labels):
+        """Context manager que registra la duración del bloque en el resumen `name`."""
+        return _Timer(self, name, labels)
+
+    def event(self, kind, **fields):
+        """Evento individual a JSON lines (sólo si hay archivo configurado)."""
+        if self._jsonl is None:
+            return
+        line = json.dumps({'ts': round(time.time(), 3), 'event': kind, **self.context, **fields}, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._jsonl is not None:  # close() desde otro hilo (servicio) entre el chequeo y la escritura
+                self._jsonl.write(line + "\n")
+
+    # --- FASES ---
+    def phase(self, name):
+        return _Phase(self, name)
+
+    # --- SALIDAS ---
+    def snapshot(self):
+        """Agregados actuales como dict serializable."""
+        fmt = lambda key: key[0] + ("{" + ",".join(f"{k}={v}" for k, v in key[1]) + "}" if key[1] else "")
+        with self._lock:
+            return {
+                'counters': {fmt(k): v for k, v in self.counters.items()},
+                'gauges': {fmt(k): v for k, v in self.gauges.items()},
+                'summaries': {fmt(k): {'count': c, 'sum': round(s, 6), 'max': round(m, 6)}
+                              for k, (c, s, m) in self.summaries.items()},
+            }
+
+    def write_textfile(self, path=None):
+        """
+        Resumen en formato de exposición de Prometheus (para el textfile
+        collector de node_exporter). Se escribe a un temporal y se renombra:
+        el collector nunca lee un archivo a medias.
+        """
+        path = path or self.textfile_path
+        if not path:
+            return None
+        label_str = lambda labels: "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}" if labels else ""
+        lines = []
+        with self._lock:
+            for kind, store in (("counter", self.counters), ("gauge", self.gauges)):
+                by_name = {}
+                for (name, labels), value in store.items():
+                    by_name.setdefault(name, []).append((labels, value))
+                for name in sorted(by_name):
+                    metric = f"{PREFIX}_{name}" + ("_total" if kind == "counter" else "")
+                    lines.append(f"# TYPE {metric} {kind}")
+                    lines.extend(f"{metric}{label_str(labels)} {value}" for labels, value in by_name[name])
+            by_name = {}
+            for (name, labels), summary in self.summaries.items():
+                by_name.setdefault(name, []).append((labels, summary))
+            for name in sorted(by_name):
+                metric = f"{PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                for labels, (count, total, peak) in by_name[name]:
+                    lines.append(f"{metric}_count{label_str(labels)} {count}")
+                    lines.append(f"{metric}_sum{label_str(labels)} {total:.6f}")
+                lines.append(f"# TYPE {metric}_max gauge")
+                lines.extend(f"{metric}_max{label_str(labels)} {peak:.6f}" for labels, (_, _, peak) in by_name[name])
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+        return path
+
+    def flush(self):
+        """Escribe el resumen agregado al JSONL y el textfile de Prometheus."""
+        self.event("summary", **self.snapshot())
+        if self._jsonl is not None:
+            self._jsonl.flush()
+        return self.write_textfile()
+
+    def close(self):
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.summaries.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Phase:
+    """
+    Fase del pipeline: duración, pico de RSS durante la fase (sólo con un
+    registro exclusive) y, si es la fase elegida para perfilar, un perfil de
+    cProfile (.pstats) o pyinstrument (.html). El perfil cubre el hilo
+    principal; las descargas del event loop se ven en los eventos 'fetch' del JSONL.
+    """
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self._profiler = None
+
+    def __enter__(self):
+        reg = self.registry
+        reg.event("phase_start", phase=self.name)
+        if reg.exclusive:
+            reset_peak_rss()
+        if reg.profile_phase == self.name:
+            self._profiler = _start_profiler(reg.profiler)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        seconds = time.perf_counter() - self.start
+        reg = self.registry
+        if self._profiler is not None:
+            path = _stop_profiler(self._profiler, reg.profiler, os.path.join(reg.profile_dir, f"profile-{self.name}"))
+            print(f"   [Metrics] Perfil de la fase '{self.name}': {path}")
+        peak = peak_rss_bytes() if reg.exclusive else None
+        reg.observe("phase", seconds, phase=self.name)
+        if peak is not None:
+            reg.gauge("phase_peak_rss_bytes", peak, phase=self.name)
+        reg.event("phase_end", phase=self.name, seconds=round(seconds, 4), peak_rss_bytes=peak, ok=exc_type is None)
+
+
+def _start_profiler(kind):
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("   [Metrics] pyinstrument no está instalado: se usa cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler, kind, base_path):
+    os.makedirs(os.path.dirname(base_path) or '.', exist_ok=True)
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        profiler.dump_stats(base_path + ".pstats")
+        return base_path + ".pstats"
+    profiler.stop()
+    with open(base_path + ".html", 'w', encoding='utf-8') as f:
+        f.write(profiler.output_html())
+    return base_path + ".html"
+
+
+# Registro global y atajos de módulo (van al registro activo)
+registry = MetricsRegistry()
+_active = contextvars.ContextVar("metrics_registry", default=None)
+
+
+def current():
+    """Registro activo en este contexto: el de scoped()/use() o el global."""
+    return _active.get() or registry
+
+
+def use(target):
+    """Fija el registro activo del contexto actual (p.ej. initializer de un pool de hilos: use(current()))."""
+    _active.set(target)
+
+
+@contextlib.contextmanager
+def scoped(target):
+    """Todo lo registrado dentro del bloque (y en lo que lance) va a target."""
+    token = _active.set(target)
+    try:
+        yield target
+    finally:
+        _active.reset(token)
+
+
+def _delegate(name):
+    def shortcut(*args, **kwargs):
+        return getattr(current(), name)(*args, **kwargs)
+    shortcut.__name__, shortcut.__doc__ = name, getattr(MetricsRegistry, name).__doc__
+    return shortcut
+
+
+configure, incr, gauge, observe, timer, event, phase, flush = map(
+    _delegate, ("configure", "incr", "gauge", "observe", "timer", "event", "phase", "flush")
+)
+
+
+def record_matrix(name, values, **labels):
+    """Dimensiones y nnz de una matriz (dispersa o densa) como gauges."""
+    rows, cols = values.shape
+    nnz = getattr(values, 'nnz', None)
+    gauge(f"{name}_rows", rows, **labels)
+    gauge(f"{name}_cols", cols, **labels)
+    if nnz is not None:
+        gauge(f"{name}_nnz", nnz, **labels)
+    event("matrix", name=name, rows=rows, cols=cols, nnz=nnz, **labels)
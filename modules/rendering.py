@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Umbrales de la estrategia de dibujo
+ANNOT_MAX_CELLS = 600     # Por encima, los números por celda no aportan y cuestan un objeto de texto cada uno
+MAX_COLUMNS = 40          # Por encima, las páginas se agregan por sección del sitio
+RASTER_MIN_CELLS = 5000   # Por encima, la malla se rasteriza en lugar de dibujar un rectángulo vectorial por celda
+
+_pool = None
+
+
+def page_section(name):
+    """Sección de una página: primer segmento de su ruta ('/admisiones/requisitos' -> '/admisiones')."""
+    name = str(name)
+    if '/' not in name:
+        return name
+    head = name.strip('/').split('/')[0]
+    return '/' + head if head else '/'
+
+
+def aggregate_by_section(df):
+    """Agrupa columnas de página por sección del sitio y resume cada grupo con su máximo de cobertura."""
+    sections = [page_section(c) for c in df.columns]
+    grouped = df.T.groupby(sections, sort=False).max().T
+    counts = {s: sections.count(s) for s in grouped.columns}
+    grouped.columns = [f"{s} ({counts[s]})" if counts[s] > 1 else s for s in grouped.columns]
+    return grouped
+
+
+def render_heatmap(df, path, title='Mapa de Calor: Oportunidades vs Contenido'):
+    """
+    Dibuja el heatmap con backend no interactivo (Agg). Sólo anota celdas
+    cuando la matriz es chica; con muchas páginas agrega por sección y con
+    muchas celdas rasteriza la malla.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    if df.shape[1] > MAX_COLUMNS:
+        df = aggregate_by_section(df)
+        title += ' (páginas agrupadas por sección)'
+        if df.shape[1] > MAX_COLUMNS:
+            # Ni agrupando entra: conservamos las secciones con mayor cobertura total
+            df = df[df.sum().nlargest(MAX_COLUMNS).index]
+
+    cells = df.shape[0] * df.shape[1]
+    annotate = cells <= ANNOT_MAX_CELLS
+    width = min(30, max(10, 0.45 * df.shape[1] + 6))
+    height = min(30, max(6, 0.28 * df.shape[0] + 3))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fig = plt.figure(figsize=(width, height))
+    try:
+        sns.heatmap(
+            df, annot=annotate, fmt=".2f", cmap="RdYlGn",
+            cbar_kws={'label': 'Cobertura Semántica'},
+            rasterized=cells >= RASTER_MIN_CELLS
+        )
+        plt.title(title)
+        plt.tight_layout()
+        plt.savefig(path, dpi=100)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # 'spawn': el proceso hijo no hereda hilos (p.ej. el event loop del scraper)
+        _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+class HeatmapJob:
+    """
+    Renderizado del heatmap en un proceso aparte, en paralelo con el resto
+    del pipeline. result() bloquea sólo cuando se necesita la imagen.
+    """
+    def __init__(self, df, path, background=True):
+        self.path = path
+        if background:
+            self._future = _get_pool().submit(render_heatmap, df, path)
+        else:
+            self._future = None
+            render_heatmap(df, path)
+
+    def result(self, timeout=None):
+        """Espera el render y retorna la ruta de la imagen (propaga errores del proceso hijo)."""
+        if self._future is not None:
+            return self._future.result(timeout=timeout)
+        return self.path
+
+
+def shutdown():
+    """Libera el proceso de renderizado."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
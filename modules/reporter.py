@@ -1,11 +1,16 @@
 from fpdf import FPDF
 import datetime
 import os
-import pandas as pd
+from modules import metrics
+from modules.exporters import coverage_sections
 
 class StrategicReport(FPDF):
-    def __init__(self):
+    TITULO_CANIBALIZACION = "Canibalización de Contenido"
+
+    def __init__(self, client=""):
         super().__init__()
+        self.client = client # Nombre del cliente (config['client']) para el encabezado
+        self.section_no = 0 # Las secciones se numeran al emitirse: las omitidas no dejan huecos
         self.set_auto_page_break(auto=True, margin=15)
         self.page_width = 210 - 30 # A4 width - margins
 
@@ -21,7 +26,10 @@ class StrategicReport(FPDF):
     def header(self):
         self.set_font('Arial', 'B', 9)
         self.set_text_color(150, 150, 150)
-        self.cell(0, 10, self.sanitize('AUDITORÍA TÉCNICA DE CONTENIDOS | REY SABIO SALOMÓN'), 0, 0, 'R')
+        title = 'AUDITORÍA TÉCNICA DE CONTENIDOS'
+        if self.client:
+            title += f' | {self.client.upper()}'
+        self.cell(0, 10, self.sanitize(title), 0, 0, 'R')
         self.ln(12)
 
     def footer(self):
@@ -30,6 +38,12 @@ class StrategicReport(FPDF):
         self.set_text_color(128)
         self.cell(0, 10, f'Pagina {self.page_no()} - Generado por SEO Auditor Pro', 0, 0, 'C')
 
+    def titulo_seccion(self, titulo, size=16):
+        self.section_no += 1
+        self.set_font('Arial', 'B', size)
+        self.set_text_color(15, 23, 42)
+        self.cell(0, 10, self.sanitize(f"{self.section_no}. {titulo}"), 0, 1, 'L')
+
     def portada(self):
         self.add_page()
         self.set_y(80)
@@ -57,15 +71,15 @@ class StrategicReport(FPDF):
         self.cell(0, 8, self.sanitize("ALCANCE: Ecosistema Web Completo"), 0, 1, 'C')
         self.cell(0, 8, self.sanitize("ESTADO: REVISIÓN REQUERIDA"), 0, 1, 'C')
 
-    def resumen_ejecutivo(self):
+    def resumen_ejecutivo(self, con_canibalizacion=True):
         self.add_page()
-        self.set_font('Arial', 'B', 16)
-        self.set_text_color(15, 23, 42)
-        self.cell(0, 10, self.sanitize("1. Diagnóstico Ejecutivo"), 0, 1, 'L')
+        self.titulo_seccion("Diagnóstico Ejecutivo")
         self.ln(5)
         
         self.set_font('Arial', '', 11)
         self.set_text_color(51, 65, 85)
+        # Se cita la sección por título: su número depende de qué secciones se emitan después
+        referencia = f" (ver sección '{self.TITULO_CANIBALIZACION}')" if con_canibalizacion else ""
         texto = (
             "Este reporte analiza el contenido REAL de su sitio web, ignorando menús y pies de página "
             "para determinar la verdadera relevancia de cada URL.\n\n"
@@ -73,22 +87,30 @@ class StrategicReport(FPDF):
             "1. Densidad de Palabras Clave: Se ha medido la frecuencia de términos estratégicos. "
             "Un score de 0.00 indica que la palabra no existe en el cuerpo del texto.\n"
             "2. Enfoque de Página: Cada URL debe atacar un grupo único de palabras. Si 'Básica' y 'Bachillerato' "
-            "tienen los mismos scores, existe canibalización de contenido.\n"
+            f"tienen los mismos scores, existe canibalización de contenido{referencia}.\n"
             "3. Oportunidades: Las tablas a continuación muestran exactamente qué palabras inyectar en cada página "
             "para que Google entienda su temática específica."
         )
         self.multi_cell(0, 7, self.sanitize(texto))
         self.ln(10)
 
-    def agregar_heatmap(self, image_path):
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, self.sanitize("2. Matriz de Cobertura (Heatmap)"), 0, 1, 'L')
+    def agregar_heatmap(self, chart):
+        self.titulo_seccion("Matriz de Cobertura (Heatmap)", size=14)
         self.ln(2)
         self.set_font('Arial', 'I', 10)
         self.cell(0, 10, self.sanitize("Visualización de la densidad de palabras clave por página."), 0, 1)
         self.ln(5)
-        
-        if os.path.exists(image_path):
+
+        # El heatmap puede venir como HeatmapJob aún en curso: sólo aquí esperamos el render
+        image_path = chart
+        if hasattr(chart, 'result'):
+            try:
+                image_path = chart.result()
+            except Exception as e:
+                print(f"   [Reporter Error] Falló el render del heatmap: {e}")
+                image_path = None
+
+        if image_path and os.path.exists(image_path):
             self.image(image_path, x=10, w=190)
         else:
             self.set_text_color(220, 38, 38)
@@ -97,14 +119,13 @@ class StrategicReport(FPDF):
 
     def seccion_competencia(self, competitor_data):
         self.add_page()
-        self.set_font('Arial', 'B', 16)
-        self.set_text_color(15, 23, 42)
-        self.cell(0, 10, self.sanitize("3. Benchmarking de Competencia"), 0, 1, 'L')
+        self.titulo_seccion("Benchmarking de Competencia")
         self.ln(5)
         
         self.set_font('Arial', '', 10)
         self.multi_cell(0, 6, self.sanitize(
             "Análisis de los términos con mayor densidad en las webs de la competencia. "
+            "COMP. indica cuántos competidores usan el término. "
             "Estos son los conceptos que ellos están posicionando agresivamente:"
         ))
         self.ln(5)
@@ -114,54 +135,93 @@ class StrategicReport(FPDF):
         self.set_text_color(255, 255, 255)
         self.set_font('Courier', 'B', 10)
         
-        col_w = [70, 30, 40, 50] # Anchos de columna
+        col_w = [60, 25, 20, 35, 50] # Anchos de columna
         self.cell(col_w[0], 8, "TÉRMINO", 1, 0, 'L', 1)
         self.cell(col_w[1], 8, "SCORE", 1, 0, 'C', 1)
-        self.cell(col_w[2], 8, "INTENCIÓN", 1, 0, 'C', 1)
-        self.cell(col_w[3], 8, "ESTRATEGIA", 1, 1, 'L', 1)
+        self.cell(col_w[2], 8, "COMP.", 1, 0, 'C', 1)
+        self.cell(col_w[3], 8, "INTENCIÓN", 1, 0, 'C', 1)
+        self.cell(col_w[4], 8, "ESTRATEGIA", 1, 1, 'L', 1)
         
         # Datos
         self.set_text_color(0, 0, 0)
         self.set_font('Courier', '', 9)
         
-        if competitor_data:
-            for i, (kw, score, intent) in enumerate(competitor_data[:20]): # Top 20
+        if competitor_data is not None and len(competitor_data):
+            n_comp = competitor_data.attrs.get('n_competitors', 0)
+            for i, row in enumerate(competitor_data.head(20).itertuples(index=False)): # Top 20
                 bg = 255 if i % 2 == 0 else 245 # Filas alternas
                 self.set_fill_color(bg, bg, bg)
                 
                 # Definir acción
                 accion = "Blog / FAQ"
-                if "TRANSACCIONAL" in intent: accion = "Landing Page"
-                elif "COMERCIAL" in intent: accion = "Tabla Comparativa"
+                if "TRANSACCIONAL" in row.intent: accion = "Landing Page"
+                elif "COMERCIAL" in row.intent: accion = "Tabla Comparativa"
                 
-                self.cell(col_w[0], 7, self.sanitize(kw.upper()), 1, 0, 'L', 1)
-                self.cell(col_w[1], 7, f"{score:.3f}", 1, 0, 'C', 1)
-                self.cell(col_w[2], 7, self.sanitize(intent.split(' ')[0]), 1, 0, 'C', 1)
-                self.cell(col_w[3], 7, self.sanitize(accion), 1, 1, 'L', 1)
+                self.cell(col_w[0], 7, self.sanitize(row.term.upper()), 1, 0, 'L', 1)
+                self.cell(col_w[1], 7, f"{row.score:.3f}", 1, 0, 'C', 1)
+                self.cell(col_w[2], 7, f"{row.doc_freq}/{n_comp}", 1, 0, 'C', 1)
+                self.cell(col_w[3], 7, self.sanitize(row.intent.split(' ')[0]), 1, 0, 'C', 1)
+                self.cell(col_w[4], 7, self.sanitize(accion), 1, 1, 'L', 1)
         else:
             self.cell(0, 10, "No se obtuvieron datos suficientes de la competencia.", 1, 1)
             
         self.ln(10)
 
-    def plan_accion(self, df_heatmap):
+    def seccion_canibalizacion(self, clusters, max_clusters=30):
         self.add_page()
-        self.set_font('Arial', 'B', 16)
-        self.set_text_color(15, 23, 42)
-        self.cell(0, 10, self.sanitize("4. Hoja de Ruta: Optimización On-Page"), 0, 1, 'L')
+        self.titulo_seccion(self.TITULO_CANIBALIZACION)
         self.ln(5)
-        
-        # Lista de columnas a ignorar (Metadata)
-        ignore_cols = ['max_relevance', 'search_intent', 'intent', 'market_interest', 'max_coverage', 'action_priority']
 
-        # Iterar páginas
-        for pagina in df_heatmap.columns:
-            # 1. Ignorar si está en la lista negra
-            if pagina in ignore_cols: continue
-            
-            # 2. BLINDAJE: Ignorar si la columna NO es numérica (evita el TypeError)
-            if not pd.api.types.is_numeric_dtype(df_heatmap[pagina]):
-                continue
+        self.set_font('Arial', '', 10)
+        self.set_text_color(51, 65, 85)
+        n_pages = clusters.attrs.get('n_pages')
+        alcance = f" sobre {n_pages} páginas" if n_pages else ""
+        self.multi_cell(0, 6, self.sanitize(
+            f"Grupos de páginas con contenido casi idéntico{alcance} (similitud Jaccard de fragmentos de texto). "
+            "Páginas que compiten entre sí por las mismas búsquedas diluyen la autoridad de ambas."
+        ))
+        self.ln(5)
+
+        if not len(clusters):
+            self.set_font('Arial', 'B', 10)
+            self.set_text_color(21, 128, 61)
+            self.cell(0, 8, self.sanitize("[OK] No se detectaron páginas canibalizadas."), 0, 1)
+            self.ln(5)
+            return
+
+        col_w = [15, 95, 20, 50]
+        self.set_fill_color(30, 41, 59)
+        self.set_text_color(255, 255, 255)
+        self.set_font('Courier', 'B', 10)
+        self.cell(col_w[0], 8, "#", 1, 0, 'C', 1)
+        self.cell(col_w[1], 8, self.sanitize("PÁGINAS"), 1, 0, 'L', 1)
+        self.cell(col_w[2], 8, "SIMIL.", 1, 0, 'C', 1)
+        self.cell(col_w[3], 8, self.sanitize("ACCIÓN"), 1, 1, 'L', 1)
+
+        self.set_text_color(0, 0, 0)
+        self.set_font('Courier', '', 8)
+        for i, row in enumerate(clusters.head(max_clusters).itertuples(index=False)):
+            bg = 255 if i % 2 == 0 else 245
+            self.set_fill_color(bg, bg, bg)
+            pages = list(row.pages)
+            shown = ", ".join(str(p) for p in pages[:4]) + (f" (+{len(pages) - 4})" if len(pages) > 4 else "")
+            self.cell(col_w[0], 7, str(row.cluster), 1, 0, 'C', 1)
+            self.cell(col_w[1], 7, self.sanitize(shown[:60]), 1, 0, 'L', 1)
+            self.cell(col_w[2], 7, f"{row.max_similarity:.2f}", 1, 0, 'C', 1)
+            self.cell(col_w[3], 7, self.sanitize(row.recommendation[:28]), 1, 1, 'L', 1)
+        if len(clusters) > max_clusters:
+            self.set_font('Arial', 'I', 9)
+            self.cell(0, 8, self.sanitize(f"... y {len(clusters) - max_clusters} grupos más."), 0, 1)
+        self.ln(10)
 
+    def plan_accion(self, df_heatmap, chunk_size=50):
+        self.add_page()
+        self.titulo_seccion("Hoja de Ruta: Optimización On-Page")
+        self.ln(5)
+        
+        # Clasificación precalculada con máscaras (faltante / baja densidad / optimizada),
+        # procesando las páginas en bloques de chunk_size columnas
+        for pagina, missing_critical, low_density, optimized in coverage_sections(df_heatmap, chunk_size):
             # Título de Página
             self.set_fill_color(71, 85, 105) # Slate grey
             self.set_text_color(255, 255, 255)
@@ -169,24 +229,6 @@ class StrategicReport(FPDF):
             self.cell(0, 10, self.sanitize(f"  URL OBJETIVO: {pagina}  "), 0, 1, 'L', 1)
             self.ln(2)
 
-            col_data = df_heatmap[pagina]
-            
-            # Clasificación de Keywords
-            missing_critical = [] # No existen y son importantes
-            low_density = []      # Existen pero muy poco
-            optimized = []        # Están bien
-            
-            for kw, score in col_data.items():
-                # Asegurarse que score es número antes de comparar
-                if not isinstance(score, (int, float)): continue
-                
-                if score == 0.0:
-                    missing_critical.append(kw)
-                elif score < 0.05:
-                    low_density.append(kw)
-                else:
-                    optimized.append((kw, score))
-            
             # 1. CRÍTICO (Faltantes)
             if missing_critical:
                 self.set_font('Arial', 'B', 10)
@@ -196,9 +238,8 @@ class StrategicReport(FPDF):
                 self.set_font('Courier', '', 10)
                 self.set_text_color(0, 0, 0)
                 # Mostrar en 2 columnas para ahorrar espacio
-                chunks = [missing_critical[i:i + 2] for i in range(0, len(missing_critical), 2)]
-                for chunk in chunks:
-                    line = "   ".join([f"[ ] {kw.upper()}" for kw in chunk])
+                for i in range(0, len(missing_critical), 2):
+                    line = "   ".join([f"[ ] {kw.upper()}" for kw in missing_critical[i:i + 2]])
                     self.cell(0, 5, self.sanitize(line), 0, 1)
                 self.ln(2)
 
@@ -219,22 +260,88 @@ class StrategicReport(FPDF):
                 self.cell(0, 8, self.sanitize("  [OK] Términos bien posicionados:"), 0, 1)
                 self.set_font('Courier', '', 9)
                 self.set_text_color(100, 100, 100)
-                top_3 = sorted(optimized, key=lambda x: x[1], reverse=True)[:5]
-                text_opt = ", ".join([f"{kw} ({s:.2f})" for kw, s in top_3])
+                text_opt = ", ".join([f"{kw} ({s:.2f})" for kw, s in optimized])
                 self.multi_cell(0, 5, self.sanitize(text_opt))
             
             self.ln(8) # Espacio entre páginas
 
-    def generate(self, df_results, chart_path, competitor_data, filename):
-        self.portada()
-        self.resumen_ejecutivo()
-        self.agregar_heatmap(chart_path)
-        if competitor_data:
-            self.seccion_competencia(competitor_data)
-        self.plan_accion(df_results)
+    def seccion_cambios(self, moved, max_rows=40):
+        self.add_page()
+        self.titulo_seccion("Cambios desde la Auditoría Anterior")
+        self.ln(5)
+
+        self.set_font('Arial', '', 10)
+        self.set_text_color(51, 65, 85)
+        previous = moved.attrs.get('previous_run')
+        referencia = f" (corrida {previous})" if previous else ""
+        self.multi_cell(0, 6, self.sanitize(
+            f"Keywords cuya cobertura o prioridad cambió respecto de la auditoría anterior{referencia}, "
+            "ordenadas por el cambio de prioridad. Prioridad negativa = la brecha se está cerrando."
+        ))
+        self.ln(5)
+
+        if not len(moved):
+            self.set_font('Arial', 'B', 10)
+            self.set_text_color(21, 128, 61)
+            self.cell(0, 8, self.sanitize("[OK] Sin cambios desde la auditoría anterior."), 0, 1)
+            self.ln(5)
+            return
+
+        col_w = [62, 20, 22, 22, 54]
+        self.set_fill_color(30, 41, 59)
+        self.set_text_color(255, 255, 255)
+        self.set_font('Courier', 'B', 10)
+        self.cell(col_w[0], 8, "KEYWORD", 1, 0, 'L', 1)
+        self.cell(col_w[1], 8, "ESTADO", 1, 0, 'C', 1)
+        self.cell(col_w[2], 8, "COBERT.", 1, 0, 'C', 1)
+        self.cell(col_w[3], 8, "PRIOR.", 1, 0, 'C', 1)
+        self.cell(col_w[4], 8, self.sanitize("MEJOR PÁGINA"), 1, 1, 'L', 1)
+
+        self.set_font('Courier', '', 8)
+        for i, row in enumerate(moved.head(max_rows).itertuples(index=False)):
+            bg = 255 if i % 2 == 0 else 245
+            self.set_fill_color(bg, bg, bg)
+            # Verde si la brecha se cierra, rojo si se abre
+            if row.priority_change < 0:
+                self.set_text_color(21, 128, 61)
+            elif row.priority_change > 0:
+                self.set_text_color(185, 28, 28)
+            else:
+                self.set_text_color(0, 0, 0)
+            page = row.best_page_after if row.best_page_before == row.best_page_after else f"{row.best_page_before} -> {row.best_page_after}"
+            self.cell(col_w[0], 7, self.sanitize(str(row.keyword)[:34]), 1, 0, 'L', 1)
+            self.cell(col_w[1], 7, self.sanitize(row.status), 1, 0, 'C', 1)
+            self.cell(col_w[2], 7, f"{row.coverage_change:+.2f}", 1, 0, 'C', 1)
+            self.cell(col_w[3], 7, f"{row.priority_change:+.1f}", 1, 0, 'C', 1)
+            self.cell(col_w[4], 7, self.sanitize(str(page)[:30]), 1, 1, 'L', 1)
+        self.set_text_color(0, 0, 0)
+        if len(moved) > max_rows:
+            self.set_font('Arial', 'I', 9)
+            self.cell(0, 8, self.sanitize(f"... y {len(moved) - max_rows} keywords más (ver moved.parquet en la corrida)."), 0, 1)
+        self.ln(10)
+
+    def generate(self, df_results, chart_path, competitor_data, filename, cannibalization=None, moved=None):
+        with metrics.timer("report_section", section="portada"):
+            self.portada()
+            self.resumen_ejecutivo(con_canibalizacion=cannibalization is not None)
+        with metrics.timer("report_section", section="heatmap"):
+            self.agregar_heatmap(chart_path)
+        if competitor_data is not None and len(competitor_data):
+            with metrics.timer("report_section", section="competencia"):
+                self.seccion_competencia(competitor_data)
+        if cannibalization is not None:
+            with metrics.timer("report_section", section="canibalizacion"):
+                self.seccion_canibalizacion(cannibalization)
+        with metrics.timer("report_section", section="plan_accion"):
+            self.plan_accion(df_results)
+        if moved is not None:
+            with metrics.timer("report_section", section="cambios"):
+                self.seccion_cambios(moved)
         
         try:
-            self.output(filename)
+            with metrics.timer("report_section", section="output"):
+                self.output(filename)
+            metrics.gauge("report_pages", self.page_no())
             print(f"   [Reporter] Reporte profesional generado: {filename}")
         except Exception as e:
             print(f"   [Reporter Error] {e}")
\ No newline at end of file
@@ -1,76 +1,522 @@
-import requests
-from bs4 import BeautifulSoup
-import warnings
+import asyncio
+import codecs
+import ipaddress
+import os
+import queue
 import re
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+import warnings
+from aiohttp.abc import AbstractResolver
+
+from modules import metrics
+from modules.extractors import clean_text, get_extractor
 
 warnings.filterwarnings("ignore")
 
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+CHUNK_BYTES = 64 * 1024
+SNIFF_BYTES = 1024  # Ventana del prescan de HTML5 para <meta charset>
+BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+META_CHARSET_RE = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+MAX_REDIRECTS = 10
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class ContentRejected(Exception):
+    """La respuesta se descartó por sus headers (tipo no HTML o tamaño declarado excesivo)."""
+
+
+class AddressRejected(Exception):
+    """El destino (o un salto de redirección) apunta a una dirección privada o reservada."""
+
+
+def is_public_address(address):
+    """True si la IP es pública (una IPv4 mapeada en IPv6 se evalúa como IPv4)."""
+    address = ipaddress.ip_address(str(address).split('%')[0])
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global
+
+
+class PublicResolver(AbstractResolver):
+    """
+    Resolver que rechaza los nombres con alguna dirección no pública. Corre en
+    cada conexión nueva, así un DNS que cambia después de validar el pedido
+    (rebinding) o una redirección hacia otro host no llegan a la red interna.
+    """
+    def __init__(self):
+        self._resolver = aiohttp.DefaultResolver()
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        hosts = await self._resolver.resolve(host, port, family)
+        for entry in hosts:
+            if not is_public_address(entry['host']):
+                raise AddressRejected(f"{host} resuelve a una dirección privada o reservada ({entry['host']})")
+        return hosts
+
+    async def close(self):
+        await self._resolver.close()
+
+
+def sniff_encoding(declared, head):
+    """
+    Codificación del cuerpo a partir de sus primeros bytes: BOM, charset del
+    header, <meta charset> y, sin declaración, UTF-8 salvo que los bytes no lo
+    sean (en ese caso windows-1252, lo habitual en sitios viejos en español).
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = META_CHARSET_RE.search(head)
+    for candidate in (declared, match and match.group(1).decode('ascii')):
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                pass
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Un carácter multibyte cortado al final del bloque no invalida UTF-8
+        if e.start < len(head) - 3:
+            return "cp1252"
+    return "utf-8"
+
+
+class ResponseCache:
+    """
+    Caché HTTP persistente en SQLite, indexada por URL. Guarda el cuerpo
+    (comprimido), ETag, Last-Modified y la hora de descarga. Dentro del TTL la
+    respuesta se sirve sin red; pasado el TTL se revalida con una petición
+    condicional. El tamaño total se acota con desalojo LRU.
+    """
+    def __init__(self, path=".cache/http_cache.sqlite", ttl=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")  # Lectores de otros procesos (batch) no bloquean al escritor
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, body BLOB, etag TEXT, last_modified TEXT,"
+            " fetched_at REAL, last_access REAL, size INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._db.commit()
+
+    def get(self, url):
+        """Retorna la entrada cacheada como dict (con 'fresh') o None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        body, etag, last_modified, fetched_at = row
+        return {
+            'body': zlib.decompress(body).decode('utf-8'),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': fetched_at,
+            'fresh': (time.time() - fetched_at) < self.ttl
+        }
+
+    def put(self, url, body, etag=None, last_modified=None):
+        blob = zlib.compress(body.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, blob, etag, last_modified, now, now, len(blob))
+            )
+            self._evict()
+            self._db.commit()
+
+    def touch(self, url):
+        """Marca una entrada como revalidada (304): reinicia su TTL."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Desalojamos las entradas usadas hace más tiempo hasta volver bajo el límite
+        for url, size in self._db.execute("SELECT url, size FROM responses ORDER BY last_access ASC").fetchall():
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def report(self, phase=""):
+        """Imprime aciertos/fallos acumulados desde el último reporte y reinicia contadores."""
+        label = f" ({phase})" if phase else ""
+        print(f"   [Cache]{label} Aciertos: {self.hits} | Revalidados (304): {self.revalidated} | Fallos: {self.misses}")
+        self.hits = self.revalidated = self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _record_fetch(url, status, seconds, cache, size=0, error=None, truncated=False):
+    """Latencia y bytes descargados por URL (agregados por host y estado; detalle en el JSONL)."""
+    host = urlsplit(url).netloc
+    metrics.observe("fetch", seconds, host=host, cache=cache)
+    metrics.incr("fetch_requests", host=host, status=str(status or error))
+    metrics.incr("fetch_bytes", size, host=host)
+    if truncated:
+        metrics.incr("fetch_truncated", host=host)
+    metrics.event("fetch", url=url, status=status, seconds=round(seconds, 4), bytes=size, cache=cache, error=error,
+                  truncated=truncated)
+
+
+class FetchEngine:
+    """
+    Motor de descarga asíncrono: pool de conexiones keep-alive, límite global
+    y por host, y deadline por petición. Corre su propio event loop en un hilo
+    para que el código síncrono (parsing) no frene las descargas en curso.
+
+    El cuerpo se lee por bloques hasta max_bytes (lo que sobra se descarta y
+    la respuesta se marca truncada), así la memoria por descarga queda acotada.
+    Las respuestas de otro tipo que `accept` o con un Content-Length mayor al
+    límite se rechazan sólo con los headers, sin leer el cuerpo.
+
+    max_bytes y rate_per_host del constructor son los valores por defecto;
+    fetch()/iter_fetch() aceptan otros por llamada, así quienes comparten el
+    motor (el servicio, el crawler) no se pisan los límites. Con raw=True el
+    cuerpo se entrega en bytes sin decodificar (p.ej. sitemaps .xml.gz) y no
+    pasa por la caché, que guarda texto.
+
+    Con public_only (el servicio) sólo se conecta a direcciones públicas: los
+    nombres se validan al resolverlos para cada conexión (PublicResolver) y
+    las redirecciones se siguen a mano, validando cada salto.
+    """
+    def __init__(self, headers, max_concurrency=20, per_host=4, timeout=20, cache=None, rate_per_host=None,
+                 max_bytes=MAX_PAGE_BYTES, public_only=False):
+        self.headers = headers
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_per_host = rate_per_host  # Peticiones/segundo por host (None = sin límite)
+        self.max_bytes = max_bytes
+        self.public_only = public_only
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._resolver = None
+        self._global_slots = None
+        self._host_slots = {}
+        self._host_next = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="fetch-engine", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _get_session(self):
+        # Se invoca siempre desde el hilo del loop, por lo que no hay carreras
+        if self._session is None or self._session.closed:
+            self._resolver = PublicResolver() if self.public_only else None
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.per_host,
+                ssl=False,  # Equivalente a verify=False de requests
+                keepalive_timeout=30,
+                resolver=self._resolver
+            )
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+            self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    async def _respect_rate(self, url, rate_per_host):
+        """Espacia las peticiones a un mismo host según rate_per_host."""
+        if not rate_per_host:
+            return
+        host = urlsplit(url).netloc.lower()
+        now = asyncio.get_running_loop().time()
+        turn = max(now, self._host_next.get(host, now))
+        self._host_next[host] = turn + 1.0 / rate_per_host
+        if turn > now:
+            await asyncio.sleep(turn - now)
+
+    async def _read_capped(self, response, max_bytes, raw=False):
+        """Lee el cuerpo por bloques hasta max_bytes y lo decodifica de forma incremental (raw: bytes tal cual)."""
+        if raw:
+            parts, size, truncated = [], 0, False
+            async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+                if size + len(chunk) > max_bytes:
+                    chunk, truncated = chunk[:max_bytes - size], True
+                size += len(chunk)
+                parts.append(chunk)
+                if truncated:
+                    break
+            return b"".join(parts), size, truncated
+        decoder = None
+        head = b""
+        parts = []
+        size = 0
+        truncated = False
+        async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+            if size + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - size]
+                truncated = True
+            size += len(chunk)
+            if decoder is None:
+                # La codificación se decide con el primer KB; hasta entonces acumulamos
+                head += chunk
+                if len(head) < SNIFF_BYTES and not truncated:
+                    continue
+                decoder = codecs.getincrementaldecoder(sniff_encoding(response.charset, head))(errors='replace')
+                chunk = head
+            parts.append(decoder.decode(chunk))
+            if truncated:
+                break  # Al salir del contexto se cierra la conexión con el resto sin leer
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(sniff_encoding(response.charset, head))(errors='replace')
+            parts.append(decoder.decode(head))
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), size, truncated
+
+    def _check_headers(self, response, accept, max_bytes):
+        content_type = response.headers.get('Content-Type')
+        # Sin Content-Type declarado se intenta igual: muchos servidores lo omiten en HTML
+        if accept and content_type and response.content_type not in accept:
+            raise ContentRejected(f"Tipo de contenido no aceptado: {response.content_type}")
+        length = response.content_length
+        if length is not None and length > max_bytes:
+            raise ContentRejected(f"Content-Length de {length} bytes supera el límite de {max_bytes}")
+
+    @staticmethod
+    def _check_hop(url):
+        """Valida un salto con public_only. Los nombres los valida PublicResolver; aiohttp no lo consulta para IPs."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise AddressRejected(f"Sólo se siguen URLs http(s): {url}")
+        try:
+            address = ipaddress.ip_address(parts.hostname)
+        except ValueError:
+            return
+        if not is_public_address(address):
+            raise AddressRejected(f"{url} apunta a una dirección privada o reservada")
+
+    async def _download(self, session, url, cached, accept, max_bytes, raw):
+        headers = {}
+        if cached:
+            # Petición condicional: el servidor responde 304 si la página no cambió
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        if not self.public_only:
+            return await self._request(session, url, headers, accept, max_bytes, raw, allow_redirects=True)
+        for _ in range(MAX_REDIRECTS + 1):
+            self._check_hop(url)
+            result = await self._request(session, url, headers, accept, max_bytes, raw, allow_redirects=False)
+            if result[0] != "redirect":
+                return result
+            url = result[1]
+        raise RuntimeError(f"Más de {MAX_REDIRECTS} redirecciones")
+
+    async def _request(self, session, url, headers, accept, max_bytes, raw, allow_redirects):
+        async with session.get(url, headers=headers, allow_redirects=allow_redirects) as response:
+            location = response.headers.get('Location')
+            if not allow_redirects and response.status in REDIRECT_STATUSES and location:
+                return "redirect", urljoin(str(response.url), location)
+            if response.status == 304:
+                return 304, None, None, None, 0, False
+            if response.status != 200:
+                # El cuerpo de una página de error no se usa: ni siquiera lo leemos
+                return response.status, None, None, None, 0, False
+            self._check_headers(response, accept, max_bytes)
+            body, size, truncated = await self._read_capped(response, max_bytes, raw)
+            return response.status, body, response.headers.get('ETag'), response.headers.get('Last-Modified'), size, truncated
+
+    async def fetch(self, url, accept=HTML_TYPES, max_bytes=None, rate_per_host=None, raw=False):
+        """
+        Descarga una URL. Retorna (url, status, html, error, truncated); nunca
+        lanza excepciones. accept: tipos de contenido admitidos (None = cualquiera);
+        max_bytes y rate_per_host en None usan los del motor.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        rate_per_host = rate_per_host or self.rate_per_host
+        cache = None if raw else self.cache
+        cached = cache.get(url) if cache else None
+        if cached and cached['fresh']:
+            cache.hits += 1
+            _record_fetch(url, 200, 0.0, "hit")
+            return url, 200, cached['body'], None, False
+
+        session = self._get_session()
+        start = None
+        try:
+            async with self._global_slots, self._host_slot(url):
+                await self._respect_rate(url, rate_per_host)
+                # El deadline corre desde que obtenemos turno, no desde que entramos a la cola
+                start = time.perf_counter()
+                status, body, etag, last_modified, size, truncated = await asyncio.wait_for(
+                    self._download(session, url, cached, accept, max_bytes, raw), timeout=self.timeout
+                )
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            _record_fetch(url, None, time.perf_counter() - start, "miss", error="timeout")
+            return url, None, None, TimeoutError(f"Deadline de {self.timeout}s excedido"), False
+        except Exception as e:
+            _record_fetch(url, None, time.perf_counter() - start if start else 0.0, "miss", error=type(e).__name__)
+            return url, None, None, e, False
+        elapsed = time.perf_counter() - start
+
+        if cache:
+            if status == 304 and cached:
+                cache.revalidated += 1
+                cache.touch(url)
+                _record_fetch(url, 304, elapsed, "revalidated")
+                return url, 200, cached['body'], None, False
+            cache.misses += 1
+            # Un cuerpo truncado no se cachea: la marca de truncado no sobreviviría al acierto
+            if status == 200 and not truncated:
+                cache.put(url, body, etag, last_modified)
+        _record_fetch(url, status, elapsed, "miss", size, truncated=truncated)
+        return url, status, body, None, truncated
+
+    async def _fetch_into(self, url, results, accept, max_bytes, rate_per_host, raw):
+        results.put(await self.fetch(url, accept, max_bytes, rate_per_host, raw))
+
+    def iter_fetch(self, urls, accept=HTML_TYPES, max_bytes=None, rate_per_host=None, raw=False):
+        """Lanza todas las descargas y produce (url, status, html, error, truncated) conforme terminan."""
+        loop = self._ensure_loop()
+        results = queue.Queue()
+        futures = [asyncio.run_coroutine_threadsafe(self._fetch_into(url, results, accept, max_bytes, rate_per_host, raw), loop)
+                   for url in urls]
+        try:
+            for _ in range(len(futures)):
+                yield results.get()
+        finally:
+            # Si el consumidor abandona el generador, cancelamos lo pendiente
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._session is not None and not self._session.closed:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+            if self._resolver is not None:  # El conector no cierra un resolver que no creó
+                asyncio.run_coroutine_threadsafe(self._resolver.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._session = None
+        self._resolver = None
+        self._host_slots = {}
+        self._host_next = {}
+
+
 class SiteScraper:
-    def __init__(self, url):
+    def __init__(self, url, max_concurrency=20, per_host=4, timeout=20, cache=None, extractor="auto",
+                 max_bytes=MAX_PAGE_BYTES, docstore=None, public_only=False):
         self.url = url
+        # Backend de extracción: 'lxml' (rápido, una pasada) o 'bs4' (referencia)
+        self.extractor = get_extractor(extractor)
+        self.docstore = docstore  # AnalyzedDocStore opcional: las páginas sin cambios no se vuelven a parsear
         # Headers rotativos para parecer humano y evitar bloqueos de Google/Firewalls
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
             'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8'
         }
+        self.engine = FetchEngine(self.headers, max_concurrency=max_concurrency, per_host=per_host, timeout=timeout,
+                                  cache=cache, max_bytes=max_bytes, public_only=public_only)
 
     def clean_text(self, text):
         """Limpia espacios dobles, tabulaciones y saltos de línea basura."""
-        return re.sub(r'\s+', ' ', text).strip()
+        return clean_text(text)
+
+    def parse(self, html):
+        """Extrae texto limpio y metadatos técnicos de un documento HTML."""
+        with metrics.timer("parse", backend=self.extractor.name):
+            if self.docstore is not None:
+                data = self.docstore.extracted(html, self.extractor.extract, self.extractor.name)
+            else:
+                data = self.extractor.extract(html)
+
+        # Debug: Mostrar qué texto único encontró (para que verifiques)
+        print(f"      -> Texto único detectado: '{data['content_sample'][:80]}...'")
+        return data
+
+    def audit_many(self, urls, max_bytes=None):
+        """
+        Audita varias URLs en paralelo. Produce tuplas (url, data) en orden de
+        llegada; data es None si la descarga o el parsing fallaron y
+        data['truncated'] indica si el cuerpo se cortó en max_bytes (None = el
+        límite del motor).
+        """
+        urls = list(urls)
+        max_bytes = max_bytes or self.engine.max_bytes
+        if len(urls) > 1:
+            print(f"   [Scraper] Descargando {len(urls)} URLs en paralelo...")
+        for url, status, html, error, truncated in self.engine.iter_fetch(urls, max_bytes=max_bytes):
+            if isinstance(error, (ContentRejected, AddressRejected)):
+                print(f"   [Scraper] Descartada {url}: {error}")
+                yield url, None
+                continue
+            if error is not None:
+                print(f"   [Error Crítico] Falló el scraping de {url}: {error}")
+                yield url, None
+                continue
+            if status != 200:
+                print(f"   [Error] Status Code: {status} ({url})")
+                yield url, None
+                continue
+            if truncated:
+                print(f"      [!] {url} supera {max_bytes} bytes: se analiza sólo el inicio")
+            try:
+                data = self.parse(html)
+            except Exception as e:
+                print(f"   [Error Crítico] Falló el parsing de {url}: {e}")
+                yield url, None
+                continue
+            data['truncated'] = truncated
+            yield url, data
 
     def audit(self):
         print(f"   [Scraper] Conectando a {self.url}...")
-        try:
-            response = requests.get(self.url, headers=self.headers, verify=False, timeout=20)
-            
-            if response.status_code != 200:
-                print(f"   [Error] Status Code: {response.status_code}")
-                return None
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # --- FASE 1: CIRUGÍA (Eliminación de Ruido) ---
-            # Borramos menú, footer, sidebar, popups y scripts para que no contaminen el análisis
-            noise_selectors = [
-                'nav', 'footer', 'script', 'style', 'noscript', 'iframe', 'svg',
-                '.navbar', '.menu', '.footer', '.sidebar', '#cookie-banner', 
-                '.modal', '.popup', '#header', '.top-bar'
-            ]
-            for selector in noise_selectors:
-                for element in soup.select(selector):
-                    element.decompose() # Destruye el elemento del árbol HTML
-
-            # --- FASE 2: EXTRACCIÓN INTELIGENTE ---
-            # Buscamos el contenedor principal de Odoo o HTML5 estándar
-            main_content = soup.find('main') or soup.find('div', id='wrap') or soup.find('div', class_='page-content') or soup.body
-            
-            if not main_content:
-                main_content = soup
-
-            # Extraemos texto limpio
-            raw_text = main_content.get_text(separator=' ', strip=True)
-            clean_body = self.clean_text(raw_text)
-
-            # Debug: Mostrar qué texto único encontró (para que verifiques)
-            print(f"      -> Texto único detectado: '{clean_body[:80]}...'")
-
-            # --- FASE 3: METADATOS TÉCNICOS ---
-            data = {
-                'title': soup.title.string if soup.title else "SIN TÍTULO",
-                'h1': [self.clean_text(h.get_text()) for h in soup.find_all('h1')],
-                'h2': [self.clean_text(h.get_text()) for h in soup.find_all('h2')],
-                'meta_desc': "NO ENCONTRADA",
-                'content_sample': clean_body, # Aquí va el texto puro, sin menús
-                'word_count': len(clean_body.split())
-            }
-            
-            meta = soup.find("meta", attrs={"name": "description"})
-            if meta:
-                data['meta_desc'] = meta.get("content")
-                
+        for _, data in self.audit_many([self.url]):
             return data
 
-        except Exception as e:
-            print(f"   [Error Crítico] Falló el scraping: {e}")
-            return None
\ No newline at end of file
+    def close(self):
+        """Cierra el pool de conexiones del motor de descarga."""
+        self.engine.close()
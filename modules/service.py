@@ -0,0 +1,569 @@
+"""
+Servicio local de auditorías: un proceso de larga vida que mantiene calientes
+las librerías pesadas, el pool de conexiones, las cachés y el análisis por
+hash de contenido, y atiende una API HTTP (sólo para la red local).
+
+    GET  /health                    estado y profundidad de las colas
+    POST /jobs                      encola una auditoría completa -> 202 {job_id}
+    GET  /jobs                      últimos trabajos
+    GET  /jobs/<id>                 estado de un trabajo
+    GET  /jobs/<id>/report[?format=html]   descarga el reporte
+    POST /pages/analyze             re-análisis de una página contra una corrida
+
+Las auditorías y los re-análisis de página van por colas acotadas distintas
+(una auditoría larga no demora a las páginas); con la cola llena la API
+responde 429 con Retry-After en lugar de acumular trabajo.
+
+Los pedidos sólo leen configuraciones bajo config_root, sólo escriben bajo
+output_root y sólo descargan URLs http(s) públicas (ver AccessPolicy; el
+motor de descarga lo vuelve a exigir en cada conexión y redirección).
+"""
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from modules import metrics
+
+MAX_FINISHED_JOBS = 500
+
+
+class QueueFull(Exception):
+    """La cola del carril está llena: el cliente debe reintentar más tarde."""
+
+
+class AccessPolicy:
+    """
+    Qué puede tocar un pedido de la API: rutas de lectura dentro de
+    config_root, de escritura dentro de output_root (las relativas se
+    resuelven contra la raíz) y URLs http(s) hacia direcciones públicas,
+    salvo allow_private (p.ej. un sitio de staging en la red local).
+
+    url() sólo rechaza temprano (400 al recibir el pedido): la garantía la da
+    el FetchEngine con public_only, que valida al conectar y en cada salto.
+    """
+    def __init__(self, config_root=".", output_root=".", allow_private=False):
+        self.config_root = os.path.realpath(config_root)
+        self.output_root = os.path.realpath(output_root)
+        self.allow_private = allow_private
+
+    @staticmethod
+    def _inside(path, root, what):
+        resolved = os.path.realpath(os.path.join(root, str(path)))
+        if os.path.commonpath([resolved, root]) != root:
+            raise ValueError(f"'{what}' fuera de {root}: {path}")
+        return resolved
+
+    def config_path(self, path, what="config_path"):
+        return self._inside(path, self.config_root, what)
+
+    def output_path(self, path, what="output_dir"):
+        return self._inside(path, self.output_root, what)
+
+    def url(self, url, what="url"):
+        from modules.scraper import is_public_address
+
+        parts = urlsplit(str(url))
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"'{what}' debe ser una URL http(s): {url}")
+        if self.allow_private:
+            return url
+        try:
+            infos = socket.getaddrinfo(parts.hostname, parts.port or None, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise ValueError(f"'{what}': no se pudo resolver {parts.hostname} ({e})")
+        for info in infos:
+            if not is_public_address(info[4][0]):
+                raise ValueError(f"'{what}' apunta a una dirección privada o reservada ({info[4][0]}): {url}")
+        return url
+
+
+class Job:
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.created = time.time()
+        self.started = self.finished = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            'job_id': self.id, 'kind': self.kind, 'status': self.status,
+            'created': self.created, 'started': self.started, 'finished': self.finished,
+            'seconds': round(self.finished - self.started, 3) if self.finished and self.started else None,
+            'result': self.result, 'error': self.error,
+        }
+
+
+class Lane:
+    """Cola acotada + hilos trabajadores. submit() lanza QueueFull si no hay lugar."""
+    def __init__(self, name, handler, workers=1, max_queue=8):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.running = 0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._loop, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job):
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            metrics.incr("service_rejected", lane=self.name)
+            raise QueueFull(f"Cola '{self.name}' llena ({self.queue.maxsize} en espera)")
+        metrics.gauge("service_queue_depth", self.queue.qsize(), lane=self.name)
+
+    def _loop(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self.running += 1
+            job.status, job.started = "running", time.time()
+            try:
+                job.result = self.handler(job)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+            finally:
+                job.finished = time.time()
+                with self._lock:
+                    self.running -= 1
+                metrics.observe("service_job", job.finished - job.started, lane=self.name, status=job.status)
+                job.done.set()
+
+    def stop(self):
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def status(self):
+        return {'workers': self.workers, 'running': self.running, 'queued': self.queue.qsize(), 'max_queue': self.queue.maxsize}
+
+
+class WarmState:
+    """
+    Recursos que sobreviven entre trabajos: caché HTTP, scraper (pool de
+    conexiones keep-alive), análisis por hash de contenido y clasificador de
+    intención ya compilado. Las fases de main.py los toman de args.warm.
+    Con public_only las descargas sólo conectan a direcciones públicas.
+    """
+    def __init__(self, cache_dir, public_only=False):
+        from modules.analyzer import SEOAnalyzer
+        from modules.docstore import AnalyzedDocStore
+        from modules.scraper import ResponseCache, SiteScraper
+
+        self.cache_dir = cache_dir
+        self.public_only = public_only
+        template = SEOAnalyzer({}, [])
+        self.stop_words = template.stop_words
+        self.intents = template.intents
+        self.http_cache = ResponseCache(os.path.join(cache_dir, "http_cache.sqlite"))
+        self.docstore = AnalyzedDocStore(os.path.join(cache_dir, "docstore"), stop_words=self.stop_words)
+        self.scraper = SiteScraper("", cache=self.http_cache, docstore=self.docstore, public_only=public_only)
+        self._docstores = {self.docstore.signature: self.docstore}
+        self._lock = threading.Lock()
+        self.audit_lock = threading.Lock()  # La salida (stdout) y la detección de corrida nueva son globales: de a una
+
+    def docstore_for(self, stop_words):
+        """
+        Análisis con estas stop words (las de marca cambian por cliente). Todos
+        comparten la carpeta de la caché; la extracción de HTML vive en self.docstore.
+        """
+        from modules.docstore import AnalyzedDocStore
+
+        docstore = AnalyzedDocStore(self.docstore.path, stop_words=stop_words)  # Sin E/S hasta que se usa
+        with self._lock:
+            return self._docstores.setdefault(docstore.signature, docstore)
+
+    @staticmethod
+    def preload():
+        """Importa de una vez lo pesado (sklearn, pandas, matplotlib, fpdf) para que el primer trabajo no lo pague."""
+        import modules.exporters  # noqa: F401
+        import modules.rendering  # noqa: F401
+        import modules.reporter  # noqa: F401
+
+    def close(self):
+        from modules import rendering
+
+        self.scraper.close()
+        for docstore in self._docstores.values():
+            docstore.save()
+        self.http_cache.close()
+        rendering.shutdown()
+
+
+class PageScorer:
+    """
+    Espacio TF-IDF guardado por una corrida ya analizada (términos, IDF,
+    vectores de páginas y keywords) y su resumen de similitud por keyword.
+    Puntuar una página nueva o modificada es transformar un solo documento en
+    ese espacio y un producto disperso contra las keywords: no se reajusta
+    nada y las coberturas son las mismas que las del reporte.
+    """
+    def __init__(self, store, warm):
+        import pandas as pd
+
+        try:
+            space = store.read_arrays("tfidf_space.npz")
+        except FileNotFoundError:
+            raise ValueError(f"La corrida {store.run_id} no guardó su espacio TF-IDF (¿analizada con --model-dir --hashing?)")
+        # Mismas stop words que la corrida (incluidas las de marca del cliente)
+        docstore = warm.docstore_for([str(w) for w in space['stop_words']]) if 'stop_words' in space else warm.docstore
+        if str(space['signature'][0]) != docstore.signature:
+            raise ValueError(f"La corrida {store.run_id} usó otras stop words o n-gramas que el servicio")
+        summary = store.read_arrays("similarity.npz")
+        self.run_id = store.run_id
+        self.docstore = docstore
+        self.terms, self.idf = space['terms'], space['idf']
+        self.keywords = [str(k) for k in summary['keywords']]
+        self.page_names = [str(p) for p in summary['page_names']]
+        self.page_vectors = store.read_sparse("tfidf_pages.npz")
+        self.keyword_vectors = store.read_sparse("tfidf_keywords.npz")
+        self.top_pages, self.top_scores = summary['top_pages'], summary['top_scores']
+
+        self.page_index = {name: i for i, name in enumerate(self.page_names)}
+        pages = store.read_table("pages.parquet")
+        site = pages[pages["kind"] == "site"]
+        self.page_index.update({url: self.page_index[name] for name, url in zip(site["name"], site["url"])
+                                if url and name in self.page_index})
+        keywords = store.read_table("keywords.parquet")
+        trend = dict(zip(keywords["keyword"], pd.to_numeric(keywords["trend_interest"], errors='coerce')))
+        # Mismo default que SEOAnalyzer.market_interest para keywords sin dato de Trends
+        self.interest = np.array([10 if pd.isna(trend.get(k)) else trend[k] for k in self.keywords], dtype=float)
+
+    def vector(self, text):
+        """Vector TF-IDF (fila CSR) de un texto en el espacio de la corrida, al ancho de las matrices guardadas."""
+        import scipy.sparse as sp
+
+        matrix, _, _ = self.docstore.transform([text], self.terms, self.idf)
+        # Las corridas delta guardan columnas residuales extra; una página nunca comparte esas columnas con una keyword
+        return sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(1, self.keyword_vectors.shape[1]))
+
+    def score(self, page, text, top=15):
+        """Cobertura de cada keyword en la página antes/después y efecto en la prioridad del sitio."""
+        coverage = np.asarray((self.keyword_vectors @ self.vector(text).T).todense()).ravel()
+        index = self.page_index.get(page)
+        if index is None:
+            previous = np.zeros_like(coverage)
+            best_elsewhere = self.top_scores[:, 0]
+        else:
+            previous = np.asarray((self.keyword_vectors @ self.page_vectors[index].T).todense()).ravel()
+            # Mejor cobertura del resto del sitio: la 2ª del top si esta página era la 1ª
+            second = self.top_scores[:, 1] if self.top_scores.shape[1] > 1 else np.zeros(len(coverage))
+            best_elsewhere = np.where(self.top_pages[:, 0] == index, second, self.top_scores[:, 0])
+        before = self.interest * (1 - np.maximum(best_elsewhere, previous))
+        after = self.interest * (1 - np.maximum(best_elsewhere, coverage))
+        change = coverage - previous
+        gap = self.interest * (1 - coverage)
+
+        def rows(order, values):
+            return [{'keyword': self.keywords[i], 'coverage': round(float(coverage[i]), 4),
+                     'previous': round(float(previous[i]), 4), 'value': round(float(values[i]), 4)} for i in order]
+
+        leads = np.flatnonzero(coverage > best_elsewhere)
+        return {
+            'run_id': self.run_id,
+            'page': page,
+            'known_page': index is not None,
+            'mean_coverage': round(float(coverage.mean()), 4) if len(coverage) else 0.0,
+            'previous_mean_coverage': round(float(previous.mean()), 4) if len(previous) else 0.0,
+            'site_action_priority_delta': round(float(after.sum() - before.sum()), 4),
+            'leads': rows(leads[np.argsort(-coverage[leads], kind='stable')][:top], coverage),
+            'gains': rows([i for i in np.argsort(-change, kind='stable')[:top] if change[i] > 1e-9], change),
+            'losses': rows([i for i in np.argsort(change, kind='stable')[:top] if change[i] < -1e-9], change),
+            'gaps': rows(np.argsort(-gap, kind='stable')[:top], gap),
+        }
+
+
+class AuditService:
+    """
+    runner(config, args) ejecuta una auditoría completa (main.py la provee);
+    job_args(options) arma el Namespace de argumentos del trabajo.
+    """
+    def __init__(self, runner, job_args, load_config, cache_dir=".cache", workers=4, max_queue=16,
+                 max_audits_queued=4, max_scorers=8, policy=None):
+        self.runner = runner
+        self.job_args = job_args
+        self.load_config = load_config
+        self.policy = policy or AccessPolicy()
+        self.warm = WarmState(cache_dir, public_only=not self.policy.allow_private)
+        self.warm.preload()
+        self.jobs = OrderedDict()
+        self.max_scorers = max_scorers
+        self._scorers = OrderedDict()
+        self._lock = threading.Lock()
+        self.audits = Lane("audit", self._run_audit, workers=1, max_queue=max_audits_queued)
+        self.pages = Lane("page", self._run_page, workers=workers, max_queue=max_queue)
+
+    # --- TRABAJOS ---
+    def submit(self, kind, params):
+        """Encola un trabajo; ValueError si los parámetros no sirven, QueueFull si no hay lugar."""
+        job = Job(kind, params)
+        if kind == "audit":
+            # Configuración y opciones se validan al recibir el pedido, no al salir de la cola
+            job.config = self._job_config(params)
+            job.args = self._job_args(params.get('options') or {})
+            job.args.config = params.get('config_path') or "<api>"
+        else:
+            self._check_page(params)
+        (self.audits if kind == "audit" else self.pages).submit(job)
+        with self._lock:
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.done.is_set()]
+            for old in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[old.id]
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _job_config(self, params):
+        policy = self.policy
+        if params.get('config_path'):
+            config = self.load_config(policy.config_path(params['config_path']))
+        elif isinstance(params.get('config'), dict):
+            config = self.load_config(params['config'])
+        else:
+            raise ValueError("Se requiere 'config' (objeto) o 'config_path'")
+        config["cache_dir"] = self.warm.cache_dir  # Las cachés calientes son las del servicio
+        config["output_dir"] = policy.output_path(config["output_dir"])
+        config["seeds_file"] = policy.config_path(config["seeds_file"], "seeds_file")
+        for name, url in dict(config["targets"]).items():
+            policy.url(url, f"targets.{name}")
+        for url in config["competitors"]:
+            policy.url(url, "competitors")
+        if config.get("suggest_url"):
+            policy.url(config["suggest_url"], "suggest_url")
+        return config
+
+    def _job_args(self, options):
+        args = self.job_args(options)
+        if args.hashing and args.model_dir:
+            raise ValueError("'hashing' con 'model_dir' no guarda el espacio TF-IDF que usa /pages/analyze")
+        if args.crawl:
+            self.policy.url(args.crawl, "crawl")
+        for key in ("model_dir", "metrics_textfile"):
+            if getattr(args, key, None):
+                setattr(args, key, self.policy.output_path(getattr(args, key), key))
+        return args
+
+    def _check_page(self, params):
+        if params.get('output_dir'):
+            params['output_dir'] = self.policy.output_path(params['output_dir'])
+        if params.get('url') and params.get('text') is None and params.get('html') is None:
+            self.policy.url(params['url'])
+
+    def _run_audit(self, job):
+        from modules.checkpoint import RunStore
+
+        config, args = job.config, job.args
+        args.warm = self.warm
+        # Registro propio: los re-análisis de página concurrentes y los trabajos anteriores no entran en el
+        # resumen de la corrida, y el pico de RSS (de todo el proceso) no se atribuye a sus fases
+        with self.warm.audit_lock, metrics.scoped(metrics.MetricsRegistry(exclusive=False)):
+            before = RunStore.latest(config["output_dir"])
+            # Una excepción del runner sale tal cual: es el error que reporta el trabajo
+            ok = self.runner(config, args)
+            run_id = RunStore.latest(config["output_dir"])
+        if not ok:
+            # Puede fallar antes de abrir una corrida (sin contenido, sin semillas): no se busca una que no existe
+            where = f"ver la corrida {run_id}" if run_id is not None and run_id != before else "no llegó a abrir una corrida nueva"
+            raise RuntimeError(f"La auditoría no terminó ({where}; detalle en la salida del servicio)")
+        store = RunStore(config["output_dir"], run_id=run_id)
+        report = store.info("report")
+        result = {'ok': True, 'run_id': store.run_id, 'run_dir': store.path, 'output_dir': config["output_dir"],
+                  'pdf': report.get('pdf')}
+        html = os.path.join(config["output_dir"], "Auditoria_SEO_Final.html")
+        if getattr(args, 'html', False) and os.path.exists(html):
+            result['html'] = html
+        return result
+
+    def scorer(self, output_dir, run_id=None):
+        """PageScorer de una corrida (LRU de las últimas max_scorers)."""
+        from modules.checkpoint import RunStore
+
+        store = RunStore(output_dir, run_id=run_id)
+        if not store.is_done("analyze"):
+            raise ValueError(f"La corrida {store.run_id} no tiene la fase 'analyze'")
+        key = (store.path, store.info("analyze").get('at'))  # Un --from-phase analyze invalida el anterior
+        with self._lock:
+            scorer = self._scorers.get(key)
+            if scorer is not None:
+                self._scorers.move_to_end(key)
+                return scorer
+        scorer = PageScorer(store, self.warm)
+        with self._lock:
+            self._scorers[key] = scorer
+            while len(self._scorers) > self.max_scorers:
+                self._scorers.popitem(last=False)
+        return scorer
+
+    def _run_page(self, job):
+        params = job.params
+        if params.get('job_id'):
+            audit = self.get(params['job_id'])
+            if audit is None or audit.status != "done":
+                raise ValueError(f"El trabajo {params['job_id']} no existe o no terminó")
+            output_dir, run_id = audit.result['output_dir'], audit.result['run_id']
+        elif params.get('output_dir'):
+            output_dir, run_id = params['output_dir'], params.get('run')
+        else:
+            raise ValueError("Se requiere 'job_id' u 'output_dir' de la corrida")
+        scorer = self.scorer(output_dir, run_id)
+
+        url = params.get('url')
+        page = params.get('page') or url
+        if params.get('text') is not None:
+            text = params['text']
+        else:
+            html = params.get('html')
+            if html is None:
+                if not url:
+                    raise ValueError("Se requiere 'url', 'html' o 'text'")
+                _, status, html, error, _ = next(self.warm.scraper.engine.iter_fetch([url]))
+                if error is not None or status != 200:
+                    raise RuntimeError(f"No se pudo descargar {url}: {error or status}")
+            text = self.warm.scraper.parse(html)['content_sample']
+        if page is None:
+            raise ValueError("Se requiere 'page' (nombre) o 'url'")
+        return scorer.score(page, text, top=int(params.get('top', 15)))
+
+    def status(self):
+        return {'audit': self.audits.status(), 'page': self.pages.status(), 'jobs': len(self.jobs)}
+
+    def close(self):
+        self.audits.stop()
+        self.pages.stop()
+        self.warm.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > self.server.max_body:
+            raise ValueError(f"Cuerpo de {length} bytes supera el límite de {self.server.max_body}")
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        service = self.server.service
+        parts = urlsplit(self.path)
+        segments = [s for s in parts.path.split('/') if s]
+        if segments == ["health"]:
+            return self._json(200, {'status': 'ok', **service.status()})
+        if segments == ["jobs"]:
+            with service._lock:
+                jobs = [job.to_dict() for job in list(service.jobs.values())[-50:]]
+            return self._json(200, {'jobs': jobs})
+        if len(segments) >= 2 and segments[0] == "jobs":
+            job = service.get(segments[1])
+            if job is None:
+                return self._json(404, {'error': f"Trabajo {segments[1]} no encontrado"})
+            if len(segments) == 2:
+                return self._json(200, job.to_dict())
+            if segments[2:] == ["report"]:
+                return self._send_report(job, parse_qs(parts.query).get('format', ['pdf'])[0])
+        self._json(404, {'error': "Ruta no encontrada"})
+
+    def _send_report(self, job, fmt):
+        if job.status != "done":
+            return self._json(409, {'error': f"El trabajo está en estado '{job.status}'"})
+        path = job.result.get(fmt)
+        if not path or not os.path.exists(path):
+            return self._json(404, {'error': f"El trabajo no tiene reporte {fmt}"})
+        content_type = "application/pdf" if fmt == "pdf" else "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+        self.end_headers()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def do_POST(self):
+        service = self.server.service
+        path = urlsplit(self.path).path.rstrip('/')
+        try:
+            params = self._body()
+            if not isinstance(params, dict):
+                raise ValueError("El cuerpo debe ser un objeto JSON")
+        except ValueError as e:
+            return self._json(400, {'error': str(e)})
+        if path not in ("/jobs", "/pages/analyze"):
+            return self._json(404, {'error': "Ruta no encontrada"})
+        try:
+            job = service.submit("audit" if path == "/jobs" else "page", params)
+        except (ValueError, OSError) as e:
+            return self._json(400, {'error': str(e)})
+        except QueueFull as e:
+            return self._json(429, {'error': str(e)}, headers={'Retry-After': str(self.server.retry_after)})
+        if path == "/jobs":
+            return self._json(202, {'job_id': job.id, 'status_url': f"/jobs/{job.id}"}, headers={'Location': f"/jobs/{job.id}"})
+        # Re-análisis de página: se espera el resultado (sub-segundo con el estado caliente)
+        if not job.done.wait(self.server.page_timeout):
+            return self._json(202, {'job_id': job.id, 'status_url': f"/jobs/{job.id}"})
+        if job.status == "failed":
+            return self._json(422, job.to_dict())
+        self._json(200, job.to_dict())
+
+    def log_message(self, fmt, *args):
+        print(f"   [Servicio] {self.address_string()} {fmt % args}")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def serve(service, host="127.0.0.1", port=8600, page_timeout=10.0, retry_after=5, max_body=16 * 1024 * 1024):
+    """Atiende la API hasta Ctrl+C; al salir espera los trabajos en curso y guarda las cachés."""
+    server = _Server((host, port), _Handler)
+    server.service = service
+    server.page_timeout = page_timeout
+    server.retry_after = retry_after
+    server.max_body = max_body
+    print(f"   [Servicio] Escuchando en http://{host}:{server.server_address[1]} "
+          f"(auditorías: 1 a la vez, páginas: {service.pages.workers} en paralelo)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n   [Servicio] Deteniendo...")
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+# Presupuesto de memoria por bloque denso keyword×página (bytes)
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+_worker_pages = None
+
+
+class SimilarityResult:
+    """Resumen por keyword de la similitud keyword×página, sin la matriz densa completa."""
+    def __init__(self, max_coverage, action_priority, top_pages, top_scores):
+        self.max_coverage = max_coverage        # (n_keywords,)
+        self.action_priority = action_priority  # (n_keywords,)
+        self.top_pages = top_pages              # (n_keywords, k) índices de página, mejor primero
+        self.top_scores = top_scores            # (n_keywords, k)
+
+
+def _rows_per_chunk(n_pages, chunk_bytes):
+    return max(1, chunk_bytes // max(n_pages * 8, 1))
+
+
+def _score_block(keyword_block, page_vectors_t, top_k):
+    """Producto disperso de un bloque; retorna (max, top-k índices, top-k scores)."""
+    block = (keyword_block @ page_vectors_t).toarray()
+    max_cov = block.max(axis=1) if block.shape[1] else np.zeros(block.shape[0])
+    k = min(top_k, block.shape[1])
+    if k == 0:
+        empty = np.zeros((block.shape[0], 0))
+        return max_cov, empty.astype(np.int64), empty
+    # argpartition deja los k mayores al final sin ordenar todo el bloque; luego ordenamos sólo esos k
+    part = np.argpartition(block, -k, axis=1)[:, -k:]
+    part_scores = np.take_along_axis(block, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return max_cov, np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def _init_worker(page_vectors_t):
+    global _worker_pages
+    _worker_pages = page_vectors_t
+
+
+def _score_block_worker(args):
+    keyword_block, top_k = args
+    return _score_block(keyword_block, _worker_pages, top_k)
+
+
+def iter_similarity_chunks(keyword_vectors, page_vectors, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Produce (inicio, bloque_denso) de la matriz keyword×página, un bloque acotado a la vez."""
+    keyword_vectors = normalize(sp.csr_matrix(keyword_vectors))
+    page_vectors_t = normalize(sp.csr_matrix(page_vectors)).T.tocsc()
+    step = _rows_per_chunk(page_vectors.shape[0], chunk_bytes)
+    for start in range(0, keyword_vectors.shape[0], step):
+        yield start, (keyword_vectors[start:start + step] @ page_vectors_t).toarray()
+
+
+def chunked_similarity(keyword_vectors, page_vectors, market_interest, top_k=5,
+                       chunk_bytes=DEFAULT_CHUNK_BYTES, workers=1):
+    """
+    Similitud coseno keyword×página por bloques dispersos de tamaño acotado.
+    Por cada keyword conserva sólo la cobertura máxima, las top_k páginas y la
+    prioridad de acción; la matriz densa completa nunca se materializa.
+    Con workers>1 los bloques se reparten en un pool de procesos.
+    """
+    keyword_vectors = normalize(sp.csr_matrix(keyword_vectors))
+    page_vectors_t = normalize(sp.csr_matrix(page_vectors)).T.tocsc()
+    n_keywords, n_pages = keyword_vectors.shape[0], page_vectors.shape[0]
+    step = _rows_per_chunk(n_pages, chunk_bytes)
+    blocks = [keyword_vectors[i:i + step] for i in range(0, n_keywords, step)]
+
+    if workers and workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(page_vectors_t,)) as pool:
+            partials = list(pool.map(_score_block_worker, [(b, top_k) for b in blocks]))
+    else:
+        partials = [_score_block(b, page_vectors_t, top_k) for b in blocks]
+
+    k = min(top_k, n_pages)
+    if partials:
+        max_coverage = np.concatenate([p[0] for p in partials])
+        top_pages = np.vstack([p[1] for p in partials])
+        top_scores = np.vstack([p[2] for p in partials])
+    else:
+        max_coverage = np.zeros(0)
+        top_pages = np.zeros((0, k), dtype=np.int64)
+        top_scores = np.zeros((0, k))
+
+    # Fórmula: (Interés de Mercado) * (1 - Cobertura Actual)
+    action_priority = np.asarray(market_interest, dtype=float) * (1 - max_coverage)
+    return SimilarityResult(max_coverage, action_priority, top_pages, top_scores)
+
+
+def top_n_indices(values, n):
+    """Índices de los n mayores valores, de mayor a menor (argpartition + orden de sólo n)."""
+    n = min(n, len(values))
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    part = np.argpartition(-values, n - 1)[:n]
+    return part[np.argsort(-values[part], kind='stable')]
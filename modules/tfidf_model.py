@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+
+import joblib
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class IncrementalTfidfModel:
+    """
+    Modelo TF-IDF persistente para el análisis de matriz. Entre ejecuciones
+    guarda el vectorizador ajustado (vocabulario + IDF) y las matrices
+    dispersas de páginas y keywords; en cada corrida sólo transforma los
+    documentos nuevos o modificados. El reajuste completo ocurre únicamente
+    cuando la deriva (documentos cambiados desde el último ajuste completo,
+    acumulados entre corridas, o n-gramas fuera de vocabulario) supera
+    drift_threshold.
+
+    Con hashing=True usa HashingVectorizer + TfidfTransformer: no guarda
+    vocabulario, por lo que la memoria queda acotada por n_features.
+
+    Tras transform(), terms/idf describen el espacio de las matrices (columnas
+    en orden alfabético, como AnalyzedDocStore.tfidf) y fit_docs/changes la
+    deriva acumulada; con hashing terms e idf quedan en None.
+    """
+    def __init__(self, model_dir, stop_words, ngram_range=(1, 3), drift_threshold=0.2,
+                 hashing=False, n_features=2 ** 20):
+        self.model_dir = model_dir
+        self.stop_words = stop_words
+        self.ngram_range = ngram_range
+        self.drift_threshold = drift_threshold
+        self.hashing = hashing
+        self.n_features = n_features
+        self.last_action = None  # 'fit' o 'incremental', útil para métricas
+        self.terms = self.idf = None
+        self.fit_docs = self.changes = 0
+
+    # --- PERSISTENCIA ---
+    def _path(self, name):
+        return os.path.join(self.model_dir, name)
+
+    def _load(self):
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('hashing') != self.hashing or tuple(meta.get('ngram_range', ())) != tuple(self.ngram_range):
+            print("   [Modelo] Configuración distinta a la guardada: se reajusta desde cero.")
+            return None
+        return {
+            'meta': meta,
+            'vectorizer': joblib.load(self._path("vectorizer.joblib")),
+            'pages': sp.load_npz(self._path("pages.npz")).tocsr(),
+            'keywords': sp.load_npz(self._path("keywords.npz")).tocsr(),
+        }
+
+    def _save(self, vectorizer, page_names, page_hashes, page_matrix, keywords, keyword_matrix, fit_docs, changes=0):
+        os.makedirs(self.model_dir, exist_ok=True)
+        joblib.dump(vectorizer, self._path("vectorizer.joblib"))
+        sp.save_npz(self._path("pages.npz"), page_matrix.tocsr())
+        sp.save_npz(self._path("keywords.npz"), keyword_matrix.tocsr())
+        meta = {
+            'hashing': self.hashing,
+            'ngram_range': list(self.ngram_range),
+            'pages': dict(zip(page_names, page_hashes)),
+            'page_order': page_names,
+            'keywords': keywords,
+            'fit_docs': fit_docs,
+            'changes': changes,  # Documentos cambiados desde el último ajuste completo
+        }
+        with open(self._path("meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def _expose(self, vectorizer, fit_docs, changes):
+        """Deja a la vista el espacio y la deriva del vectorizador en uso (la corrida los guarda)."""
+        if not self.hashing:
+            self.terms, self.idf = vectorizer.get_feature_names_out(), vectorizer.idf_
+        self.fit_docs, self.changes = fit_docs, changes
+
+    # --- VECTORIZACIÓN ---
+    def _new_vectorizer(self):
+        if self.hashing:
+            # Pipeline mínimo: conteos hasheados + pesos IDF
+            return _HashingTfidf(self.stop_words, self.ngram_range, self.n_features)
+        return TfidfVectorizer(stop_words=self.stop_words, ngram_range=self.ngram_range)
+
+    def _oov_ratio(self, vectorizer, texts):
+        """Fracción de n-gramas de los textos nuevos que no existen en el vocabulario ajustado."""
+        if self.hashing or not texts:
+            return 0.0
+        analyzer = vectorizer.build_analyzer()
+        vocabulary = vectorizer.vocabulary_
+        total = unknown = 0
+        for text in texts:
+            grams = analyzer(text)
+            total += len(grams)
+            unknown += sum(1 for g in grams if g not in vocabulary)
+        return unknown / total if total else 0.0
+
+    def _full_fit(self, page_names, page_texts, page_hashes, keywords):
+        vectorizer = self._new_vectorizer()
+        matrix = vectorizer.fit_transform(page_texts + keywords)
+        page_matrix = matrix[:len(page_names)]
+        keyword_matrix = matrix[len(page_names):]
+        self._save(vectorizer, page_names, page_hashes, page_matrix, keywords, keyword_matrix,
+                   fit_docs=len(page_texts) + len(keywords))
+        self._expose(vectorizer, len(page_texts) + len(keywords), 0)
+        self.last_action = 'fit'
+        return page_matrix, keyword_matrix
+
+    def transform(self, page_names, page_texts, keywords):
+        """
+        Retorna (page_matrix, keyword_matrix) alineadas con page_names y
+        keywords, reutilizando las filas guardadas de lo que no cambió.
+        """
+        page_hashes = [content_hash(t) for t in page_texts]
+        state = self._load()
+        if state is None:
+            print("   [Modelo] Sin estado previo: ajuste completo del TF-IDF.")
+            return self._full_fit(page_names, page_texts, page_hashes, keywords)
+
+        meta = state['meta']
+        vectorizer = state['vectorizer']
+        stored_rows = {name: i for i, name in enumerate(meta['page_order'])}
+        changed_pages = [i for i, (name, h) in enumerate(zip(page_names, page_hashes)) if meta['pages'].get(name) != h]
+        keyword_rows = {kw: i for i, kw in enumerate(meta['keywords'])}
+        new_keywords = [i for i, kw in enumerate(keywords) if kw not in keyword_rows]
+
+        # Deriva: lo que cambió desde el último ajuste completo (no sólo desde el último guardado)
+        # frente a lo que se usó en ese ajuste + n-gramas desconocidos
+        removed = len(set(meta['pages']) - set(page_names))
+        changes = meta.get('changes', 0) + len(changed_pages) + len(new_keywords) + removed
+        changed_fraction = changes / max(meta['fit_docs'], 1)
+        oov = self._oov_ratio(vectorizer, [page_texts[i] for i in changed_pages] + [keywords[i] for i in new_keywords])
+        drift = max(changed_fraction, oov)
+        print(f"   [Modelo] {len(changed_pages)} páginas y {len(new_keywords)} keywords nuevas/cambiadas | deriva {drift:.2f}")
+
+        if drift > self.drift_threshold:
+            print(f"   [Modelo] Deriva sobre el umbral ({self.drift_threshold}): reajuste completo.")
+            return self._full_fit(page_names, page_texts, page_hashes, keywords)
+
+        page_matrix = self._assemble(
+            vectorizer, state['pages'], page_texts,
+            [stored_rows.get(name) for name in page_names], set(changed_pages)
+        )
+        keyword_matrix = self._assemble(
+            vectorizer, state['keywords'], keywords,
+            [keyword_rows.get(kw) for kw in keywords], set(new_keywords)
+        )
+        self._save(vectorizer, page_names, page_hashes, page_matrix, keywords, keyword_matrix,
+                   fit_docs=meta['fit_docs'], changes=changes)
+        self._expose(vectorizer, meta['fit_docs'], changes)
+        self.last_action = 'incremental'
+        return page_matrix, keyword_matrix
+
+    @staticmethod
+    def _assemble(vectorizer, stored, texts, stored_index, dirty):
+        """Arma la matriz final: filas guardadas para lo intacto, transform() sólo para lo sucio."""
+        dirty = sorted(dirty)
+        if not dirty:
+            return stored[stored_index] if texts else stored[:0]
+        fresh = vectorizer.transform([texts[i] for i in dirty])
+        fresh_pos = {doc: stored.shape[0] + n for n, doc in enumerate(dirty)}
+        combined = sp.vstack([stored, fresh], format='csr')
+        return combined[[fresh_pos[i] if i in fresh_pos else stored_index[i] for i in range(len(texts))]]
+
+
+class _HashingTfidf:
+    """HashingVectorizer + TfidfTransformer con la interfaz fit_transform/transform de TfidfVectorizer."""
+    def __init__(self, stop_words, ngram_range, n_features):
+        self.hasher = HashingVectorizer(
+            stop_words=stop_words, ngram_range=ngram_range, n_features=n_features,
+            alternate_sign=False, norm=None
+        )
+        self.idf = TfidfTransformer()
+
+    def fit_transform(self, texts):
+        return self.idf.fit_transform(self.hasher.transform(texts))
+
+    def transform(self, texts):
+        return self.idf.transform(self.hasher.transform(texts))
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Keyword ancla: se incluye en cada lote para llevar todos los scores a la misma escala
+DEFAULT_ANCHOR = "colegios quito"
+
+
+class TrendStore:
+    """
+    Almacén SQLite de interés de Google Trends por (keyword, geo, timeframe).
+    Guarda el interés relativo al ancla (ratio), que es comparable entre lotes
+    y entre ejecuciones.
+    """
+    def __init__(self, path=".cache/trends.sqlite", ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS trends ("
+            " keyword TEXT, geo TEXT, timeframe TEXT, anchor TEXT, ratio REAL, fetched_at REAL,"
+            " PRIMARY KEY (keyword, geo, timeframe))"
+        )
+        self._db.commit()
+
+    def get_many(self, keywords, geo, timeframe, anchor):
+        """Retorna {keyword: ratio} sólo para entradas vigentes medidas contra el mismo ancla."""
+        fresh = {}
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for kw in keywords:
+                row = self._db.execute(
+                    "SELECT ratio, fetched_at, anchor FROM trends WHERE keyword = ? AND geo = ? AND timeframe = ?",
+                    (kw, geo, timeframe)
+                ).fetchone()
+                if row and row[1] >= cutoff and row[2] == anchor:
+                    fresh[kw] = row[0]
+        return fresh
+
+    def put_many(self, ratios, geo, timeframe, anchor):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO trends VALUES (?, ?, ?, ?, ?, ?)",
+                [(kw, geo, timeframe, anchor, ratio, now) for kw, ratio in ratios.items()]
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TrendsNormalizer:
+    """
+    Consulta Google Trends en lotes de 4 keywords + el ancla. Cada interés se
+    divide por el del ancla en su propio lote, así todos los lotes quedan en
+    la misma escala. Sólo se consultan keywords ausentes o vencidas en el
+    store. El cliente puede ser cualquier objeto con la interfaz de pytrends
+    (build_payload / interest_over_time), p.ej. un fake local en pruebas.
+    """
+    BATCH = 4  # Google Trends admite 5 términos por consulta: 4 + ancla
+
+    def __init__(self, client, store=None, anchor=DEFAULT_ANCHOR, geo='EC', timeframe='today 12-m', pause=2.0):
+        self.client = client
+        self.store = store
+        self.anchor = anchor
+        self.geo = geo
+        self.timeframe = timeframe
+        self.pause = pause
+
+    def _fetch_ratios(self, keywords):
+        ratios = {}
+        batches = [keywords[i:i + self.BATCH] for i in range(0, len(keywords), self.BATCH)]
+        for n, batch in enumerate(batches):
+            try:
+                self.client.build_payload(batch + [self.anchor], cat=0, timeframe=self.timeframe, geo=self.geo)
+                data = self.client.interest_over_time()
+                if data.empty:
+                    # Sin datos para ningún término: interés nulo, también se persiste
+                    ratios.update({kw: 0.0 for kw in batch})
+                else:
+                    means = data.mean(numeric_only=True)
+                    anchor_mean = float(means.get(self.anchor, 0))
+                    if anchor_mean <= 0:
+                        print(f"      [!] Ancla '{self.anchor}' sin interés en el lote {batch}; se omite")
+                    else:
+                        for kw in batch:
+                            ratios[kw] = float(means.get(kw, 0)) / anchor_mean
+            except Exception as e:
+                print(f"      [!] Error con Google Trends para {batch}: {e}")
+
+            # Pausa para no ser bloqueados por Google
+            if self.pause and n < len(batches) - 1:
+                time.sleep(self.pause)
+        return ratios
+
+    def get_scores(self, keywords):
+        """
+        Retorna {keyword: interés 0-100} en una única escala común. Las keywords
+        que no pudieron medirse reciben 0 (igual que el comportamiento previo).
+        Si el ancla está entre las keywords no se consulta aparte: su ratio es 1.
+        """
+        requested = list(dict.fromkeys(keywords))
+        keywords = [kw for kw in requested if kw != self.anchor]
+        known = self.store.get_many(keywords, self.geo, self.timeframe, self.anchor) if self.store else {}
+        missing = [kw for kw in keywords if kw not in known]
+        print(f"   [Trends] {len(known)} en caché, {len(missing)} por consultar (ancla: '{self.anchor}')")
+
+        if missing:
+            fetched = self._fetch_ratios(missing)
+            if self.store and fetched:
+                self.store.put_many(fetched, self.geo, self.timeframe, self.anchor)
+            known.update(fetched)
+        # El ancla va en cada lote: su ratio contra sí misma es 1 (si algún lote la midió con interés)
+        if self.anchor in requested and any(known.values()):
+            known[self.anchor] = 1.0
+
+        # Reescalamos los ratios (interés / ancla) a 0-100 sobre el máximo del conjunto
+        peak = max(known.values(), default=0)
+        scores = {}
+        for kw in requested:
+            ratio = known.get(kw, 0)
+            scores[kw] = round(100 * ratio / peak, 2) if peak > 0 else 0
+        return scores